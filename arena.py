@@ -0,0 +1,211 @@
+# Description: Flat arena representation of the AST
+#
+# Nodes are stored in typed parallel arrays and addressed by integer ids
+# instead of pointing at each other.  Children always get smaller ids than
+# their parents, so a linear scan over the ids visits every node after its
+# children, and the whole tree can be rebuilt or serialized without recursion.
+
+from array import array
+import gc
+import parser
+from parser import AST
+
+# Every node class defined in parser.py, in definition order; the index is the
+# node's kind id
+NODE_TYPES = tuple(cls for cls in vars(parser).values()
+                   if isinstance(cls, type) and issubclass(cls, AST)
+                   and cls is not AST and cls.__module__ == parser.__name__)
+KIND_IDS = {cls: kind for kind, cls in enumerate(NODE_TYPES)}
+ARITY = [len(cls.__match_args__) for cls in NODE_TYPES]
+
+# Field values are packed into one int: payload << 3 | tag
+NONE, NODE, STR, LIST, TUPLE, INT = range(6)
+TAG_BITS = 3
+TAG_MASK = (1 << TAG_BITS) - 1
+
+MAGIC = b"YAPA"
+
+
+def schema():
+    """Node layout the arena encoding depends on; changes whenever a node does"""
+    return ";".join(f"{cls.__name__}({','.join(cls.__match_args__)})" for cls in NODE_TYPES)
+
+
+def _children(value, out):
+    if isinstance(value, AST):
+        out.append(value)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _children(item, out)
+
+
+class Arena:
+    """AST stored as columns: `kinds[id]` is an index into NODE_TYPES and
+    `starts[id]` is where the node's field words begin in `data`.  Strings are
+    interned in `strings`; lists and tuples are laid out in `data` as a length
+    followed by their items.
+    """
+    __slots__ = ("kinds", "starts", "data", "strings", "ids")
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.data = array('q')
+        self.strings = []
+        self.ids = {}
+
+    # ---- building -------------------------------------------------------
+
+    @classmethod
+    def from_ast(cls, tree):
+        arena = cls()
+        # pre-order walk; reversed, every node comes after all of its children
+        order = []
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            for name in node.__match_args__:
+                _children(getattr(node, name), stack)
+
+        node_ids = {}
+        for node in reversed(order):
+            words = [arena._encode(getattr(node, name), node_ids) for name in node.__match_args__]
+            node_ids[id(node)] = len(arena.kinds)
+            arena.kinds.append(KIND_IDS[type(node)])
+            arena.starts.append(len(arena.data))
+            arena.data.extend(words)
+        return arena
+
+    def _intern(self, text):
+        string_id = self.ids.setdefault(text, len(self.strings))
+        if string_id == len(self.strings):
+            self.strings.append(text)
+        return string_id
+
+    def _encode(self, value, node_ids):
+        if value is None:
+            return NONE
+        if isinstance(value, AST):
+            return node_ids[id(value)] << TAG_BITS | NODE
+        if isinstance(value, str):
+            return self._intern(value) << TAG_BITS | STR
+        if isinstance(value, int):
+            return value << TAG_BITS | INT
+        if isinstance(value, (list, tuple)):
+            words = [self._encode(item, node_ids) for item in value]
+            start = len(self.data)
+            self.data.append(len(words))
+            self.data.extend(words)
+            return start << TAG_BITS | (LIST if isinstance(value, list) else TUPLE)
+        raise TypeError(f"Cannot store {type(value).__name__} in the AST arena")
+
+    # ---- traversal ------------------------------------------------------
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @property
+    def root(self):
+        return len(self.kinds) - 1
+
+    def kind(self, node_id):
+        return NODE_TYPES[self.kinds[node_id]]
+
+    def fields(self, node_id):
+        """Field values of a node, with child nodes given as ids"""
+        start = self.starts[node_id]
+        count = len(NODE_TYPES[self.kinds[node_id]].__match_args__)
+        return [self._decode(word, None) for word in self.data[start:start + count]]
+
+    def children(self, node_id):
+        """Ids of the direct children of a node, in field order"""
+        start = self.starts[node_id]
+        count = len(NODE_TYPES[self.kinds[node_id]].__match_args__)
+        out = []
+        stack = list(reversed(self.data[start:start + count]))
+        while stack:
+            word = stack.pop()
+            tag, payload = word & TAG_MASK, word >> TAG_BITS
+            if tag == NODE:
+                out.append(payload)
+            elif tag == LIST or tag == TUPLE:
+                stack.extend(reversed(self.data[payload + 1:payload + 1 + self.data[payload]]))
+        return out
+
+    def nodes_of(self, cls):
+        """Ids of every node of the given class, children before parents"""
+        kind = KIND_IDS[cls]
+        return [node_id for node_id, k in enumerate(self.kinds) if k == kind]
+
+    def _decode(self, word, nodes):
+        tag, payload = word & TAG_MASK, word >> TAG_BITS
+        if tag == NODE:
+            return payload if nodes is None else nodes[payload]
+        if tag == STR:
+            return self.strings[payload]
+        if tag == NONE:
+            return None
+        if tag == INT:
+            return payload
+        items = [self._decode(item, nodes) for item in self.data[payload + 1:payload + 1 + self.data[payload]]]
+        return items if tag == LIST else tuple(items)
+
+    def to_ast(self):
+        """Rebuild the pointer-based tree"""
+        # the rebuilt tree has no cycles, so keep the collector from rescanning
+        # it over and over while it grows
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            nodes = []
+            strings, data, decode = self.strings, self.data, self._decode
+            for kind, start in zip(self.kinds, self.starts):
+                args = []
+                for word in data[start:start + ARITY[kind]]:
+                    # node and string fields are by far the most common
+                    tag = word & TAG_MASK
+                    if tag == NODE:
+                        args.append(nodes[word >> TAG_BITS])
+                    elif tag == STR:
+                        args.append(strings[word >> TAG_BITS])
+                    else:
+                        args.append(decode(word, nodes))
+                nodes.append(NODE_TYPES[kind](*args))
+        finally:
+            if enabled:
+                gc.enable()
+        return nodes[-1] if nodes else None
+
+    # ---- serialization --------------------------------------------------
+
+    def to_bytes(self):
+        encoded = [text.encode("utf-8") for text in self.strings]
+        lengths = array('I', map(len, encoded))
+        header = array('I', [len(self.kinds), len(self.data), len(self.strings)])
+        return (MAGIC + header.tobytes() + self.kinds.tobytes() + self.starts.tobytes()
+                + self.data.tobytes() + lengths.tobytes() + b"".join(encoded))
+
+    @classmethod
+    def from_bytes(cls, blob):
+        blob = memoryview(blob)
+        if blob[:4] != MAGIC:
+            raise ValueError("Not an AST arena")
+        arena = cls()
+        header = array('I')
+        pos = 4 + 3 * header.itemsize
+        header.frombytes(blob[4:pos])
+        count, words, nstrings = header
+        for column, length in ((arena.kinds, count), (arena.starts, count), (arena.data, words)):
+            end = pos + length * column.itemsize
+            column.frombytes(blob[pos:end])
+            pos = end
+        lengths = array('I')
+        end = pos + nstrings * lengths.itemsize
+        lengths.frombytes(blob[pos:end])
+        pos = end
+        for length in lengths:
+            arena.strings.append(str(blob[pos:pos + length], "utf-8"))
+            pos += length
+        arena.ids = {text: i for i, text in enumerate(arena.strings)}
+        return arena
@@ -0,0 +1,610 @@
+# Description: Array values
+#
+# YAP arrays are Python lists.  The ones the engines create are TypedArrays,
+# which remember the element type they were checked against, so binding one
+# to a variable of that type again is a single comparison; elements stored
+# into them afterwards are checked on the way in instead.
+#
+# Arrays declared int[] or float[] from a literal or spill() are
+# PackedArrays: a separate sequence type, not a list, that behaves like a
+# TypedArray but keeps the numbers unboxed in an `array('q')` / `array('d')`
+# buffer.  A value the buffer cannot hold (an int outside 64 bits, a bool)
+# moves the elements to a plain list for good.  Code that accepts any array
+# tests isinstance(val, ARRAYS) rather than isinstance(val, list).
+#
+# The bulk operations at the end (sum, min, max, fill, range and elementwise
+# + and * of two arrays, sorting, reversing and binary search) each go
+# through the whole array in one builtin call over its buffer, instead of one
+# YAP loop iteration per element.
+
+import bisect
+import operator
+from array import array
+from keywords import Array, datatypes
+from parser import Function
+
+# element type -> (array typecode, the exact Python type it holds)
+PACKED = {"int": ("q", int), "float": ("d", float)}
+
+
+def element_class(element_type):
+    return Function if element_type == "fn" else datatypes[element_type]
+
+
+def check_array(val, var_type, var_name):
+    """Check `val` for a variable of array type `var_type`, tagging it with
+    its element type the first time
+    """
+    if not isinstance(val, ARRAYS):
+        raise TypeError(f"Variable '{var_name}' must be of type {var_type}")
+    element_type = var_type[:-2]
+    tagged = isinstance(val, TYPED_ARRAYS)
+    if tagged and val.element_type == element_type:
+        return
+    cls = element_class(element_type)
+    if not all(isinstance(x, cls) for x in val):
+        if element_type == "fn":
+            raise TypeError(f"All elements in array '{var_name}' must be functions")
+        raise TypeError(f"All elements in array '{var_name}' must be of type {element_type}")
+    # an array already tagged with another type (say an empty int[] stored in
+    # a float[]) keeps its tag: the first variable still relies on it.  Arrays
+    # of arrays are left untagged, since appending a scalar to the outer array
+    # has always been allowed at run time.
+    if tagged and val.element_type is None and not element_type.endswith("[]"):
+        val.element_type = element_type
+
+
+def packed(val, var_type):
+    """A freshly built array `val`, already checked as `var_type`, in packed
+    storage when its element type has one and every element fits
+    """
+    element_type = var_type[:-2]
+    if element_type not in PACKED or isinstance(val, PackedArray):
+        return val
+    typecode, exact = PACKED[element_type]
+    if not all(type(x) is exact for x in val):
+        return val
+    try:
+        items = array(typecode, val)
+    except OverflowError:
+        return val
+    return PackedArray(items, element_type)
+
+
+class TypedArray(list):
+    """Array value that remembers the element type it was checked against"""
+    __slots__ = ("element_type",)
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.element_type = None  # not checked yet
+
+    def check(self, value):
+        """Check a value about to be stored in the array"""
+        element_type = self.element_type
+        if element_type is not None and not isinstance(value, element_class(element_type)):
+            raise TypeError(f"Cannot store {type(value).__name__} in array of {element_type}")
+
+
+@Array.register
+class PackedArray:
+    """Array value whose elements live in `items`, an `array` buffer (or a
+    list once something did not fit).  It has the list operations the
+    engines use and the element type of a TypedArray, but it is not a list:
+    list storage is never left empty behind its back, so copy, pickle and
+    C code that wants a real list see either the elements or a TypeError.
+    """
+    __slots__ = ("items", "element_type", "exact")
+
+    def __init__(self, items, element_type):
+        self.items = items
+        self.element_type = element_type
+        self.exact = PACKED[element_type][1]
+
+    check = TypedArray.check
+
+    def unpack(self):
+        """Move the elements to a list, for values the buffer cannot hold"""
+        if type(self.items) is array:
+            self.items = self.items.tolist()
+        return self.items
+
+    def fits(self, value):
+        return type(self.items) is not array or type(value) is self.exact
+
+    def append(self, value):
+        items = self.items if self.fits(value) else self.unpack()
+        try:
+            items.append(value)
+        except OverflowError:
+            self.unpack().append(value)
+
+    def extend(self, values):
+        for value in list(values):
+            self.append(value)
+
+    def insert(self, index, value):
+        items = self.items if self.fits(value) else self.unpack()
+        try:
+            items.insert(index, value)
+        except OverflowError:
+            self.unpack().insert(index, value)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self.unpack()[index] = value
+            return
+        items = self.items if self.fits(value) else self.unpack()
+        try:
+            items[index] = value
+        except OverflowError:
+            self.unpack()[index] = value
+
+    def __getitem__(self, index):
+        try:
+            value = self.items[index]
+        except IndexError:
+            raise IndexError("list index out of range") from None
+        except TypeError:
+            raise TypeError(f"list indices must be integers or slices, not {type(index).__name__}") from None
+        return TypedArray(value) if type(index) is slice else value
+
+    def __delitem__(self, index):
+        del self.items[index]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __reversed__(self):
+        return reversed(self.items)
+
+    def __contains__(self, value):
+        return value in self.items
+
+    def pop(self, index=-1):
+        return self.items.pop(index)
+
+    def remove(self, value):
+        self.items.remove(value)
+
+    def index(self, value, *bounds):
+        return self.items.index(value, *bounds)
+
+    def count(self, value):
+        return self.items.count(value)
+
+    def clear(self):
+        del self.items[:]
+
+    def reverse(self):
+        self.items.reverse()
+
+    def sort(self, *, key=None, reverse=False):
+        values = sorted(self.items, key=key, reverse=reverse)
+        self.items[:] = array(self.items.typecode, values) if type(self.items) is array else values
+
+    def copy(self):
+        return PackedArray(self.items[:], self.element_type)
+
+    __copy__ = copy
+
+    def __reduce__(self):
+        # pickle and deepcopy rebuild from the buffer (deepcopy copies it)
+        return PackedArray, (self.items, self.element_type)
+
+    def tolist(self):
+        return list(self.items)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    __str__ = __repr__
+
+    # comparisons and arithmetic see the elements as a list
+    def __eq__(self, other):
+        return self.tolist() == list(other) if isinstance(other, ARRAYS) else NotImplemented
+
+    def __ne__(self, other):
+        return self.tolist() != list(other) if isinstance(other, ARRAYS) else NotImplemented
+
+    def __lt__(self, other):
+        return self.tolist() < list(other) if isinstance(other, ARRAYS) else NotImplemented
+
+    def __le__(self, other):
+        return self.tolist() <= list(other) if isinstance(other, ARRAYS) else NotImplemented
+
+    def __gt__(self, other):
+        return self.tolist() > list(other) if isinstance(other, ARRAYS) else NotImplemented
+
+    def __ge__(self, other):
+        return self.tolist() >= list(other) if isinstance(other, ARRAYS) else NotImplemented
+
+    def __add__(self, other):
+        return self.tolist() + list(other) if isinstance(other, ARRAYS) else NotImplemented
+
+    def __radd__(self, other):
+        return list(other) + self.tolist() if isinstance(other, ARRAYS) else NotImplemented
+
+    def __mul__(self, count):
+        return self.tolist() * count
+
+    __rmul__ = __mul__
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, count):
+        self.items *= count
+        return self
+
+    def __bool__(self):
+        return len(self.items) > 0
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.items.__sizeof__()
+
+    __hash__ = None
+
+
+# Python types of YAP array values (Matrix and MatrixRow are lists), and of
+# the ones that check stored elements
+ARRAYS = (list, PackedArray)
+TYPED_ARRAYS = (TypedArray, PackedArray)
+
+
+# Python type of a value -> YAP element type, for matrix(n, m, fill)
+ELEMENT_TYPES = {int: "int", float: "float", bool: "bool", str: "string"}
+
+
+class Matrix(TypedArray):
+    """rows x cols table in one flat buffer, the value of matrix(n, m, fill).
+    Element [i][j] lives at i * cols + j; `get` and `set` take both indexes at
+    once, and `m[i]` is a MatrixRow view onto the buffer.  The shape is fixed.
+    """
+    __slots__ = ("rows", "cols", "data", "cell_type")
+
+    def __init__(self, rows, cols, fill):
+        super().__init__()
+        if type(rows) is not int or type(cols) is not int:
+            raise TypeError("matrix() size must be integers")
+        if rows < 0 or cols < 0:
+            raise ValueError(f"Invalid matrix size {rows}x{cols}")
+        cell_type = ELEMENT_TYPES.get(type(fill))
+        if cell_type is None:
+            raise TypeError(f"Cannot make a matrix of {type(fill).__name__}")
+        self.rows, self.cols = rows, cols
+        self.cell_type = cell_type
+        self.element_type = cell_type + "[]"
+        size = rows * cols
+        if cell_type in PACKED:
+            try:
+                self.data = array(PACKED[cell_type][0], [fill]) * size
+                return
+            except OverflowError:
+                pass
+        self.data = [fill] * size
+
+    @classmethod
+    def from_data(cls, rows, cols, cell_type, data):
+        """Matrix over an existing flat buffer `data`"""
+        matrix = cls.__new__(cls)
+        TypedArray.__init__(matrix)
+        matrix.rows, matrix.cols = rows, cols
+        matrix.cell_type = cell_type
+        matrix.element_type = cell_type + "[]"
+        matrix.data = data
+        return matrix
+
+    # the list storage of a Matrix is empty, so copies are made from `data`
+    def __copy__(self):
+        return Matrix.from_data(self.rows, self.cols, self.cell_type, self.data[:])
+
+    def __reduce__(self):
+        return Matrix.from_data, (self.rows, self.cols, self.cell_type, self.data)
+
+    def offset(self, i, j):
+        rows, cols = self.rows, self.cols
+        if i < 0:
+            i += rows
+        if j < 0:
+            j += cols
+        if not (0 <= i < rows and 0 <= j < cols):
+            raise IndexError("list index out of range")
+        return i * cols + j
+
+    def get(self, i, j):
+        return self.data[self.offset(i, j)]
+
+    def set(self, i, j, value):
+        if not isinstance(value, element_class(self.cell_type)):
+            raise TypeError(f"Cannot store {type(value).__name__} in array of {self.cell_type}")
+        self.store(self.offset(i, j), value)
+
+    def store(self, position, value):
+        data = self.data
+        if type(data) is array and type(value) is not PACKED[self.cell_type][1]:
+            data = self.unpack()
+        try:
+            data[position] = value
+        except OverflowError:
+            self.unpack()[position] = value
+
+    def unpack(self):
+        """Move the elements to a list, for values the buffer cannot hold"""
+        if type(self.data) is array:
+            self.data = self.data.tolist()
+        return self.data
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, i):
+        if type(i) is slice:
+            return TypedArray(self[k] for k in range(self.rows)[i])
+        if i < 0:
+            i += self.rows
+        if not 0 <= i < self.rows:
+            raise IndexError("list index out of range")
+        return MatrixRow(self, i * self.cols)
+
+    def __setitem__(self, i, row):
+        """m[i] = row copies `row` into the table"""
+        if not isinstance(row, ARRAYS) or len(row) != self.cols:
+            raise TypeError(f"Matrix row must be an array of {self.cols} elements")
+        start = self.offset(i, 0) if self.cols else 0
+        for j, value in enumerate(list(row)):
+            if not isinstance(value, element_class(self.cell_type)):
+                raise TypeError(f"Cannot store {type(value).__name__} in array of {self.cell_type}")
+            self.store(start + j, value)
+
+    def check(self, row):
+        pass  # __setitem__ checks the row as it copies it
+
+    def fixed(self, *args):
+        raise TypeError("Cannot add or remove rows of a matrix")
+
+    append = extend = insert = pop = remove = clear = __delitem__ = fixed
+
+    def __iter__(self):
+        return (MatrixRow(self, i * self.cols) for i in range(self.rows))
+
+    def tolist(self):
+        cols, data = self.cols, list(self.data)
+        return [data[start:start + cols] for start in range(0, len(data), cols)] if cols else [[] for _ in range(self.rows)]
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    __str__ = __repr__
+
+    def __eq__(self, other):
+        return self.tolist() == [list(row) for row in other] if isinstance(other, ARRAYS) else NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __bool__(self):
+        return self.rows > 0
+
+    def __sizeof__(self):
+        return super().__sizeof__() + self.data.__sizeof__()
+
+    __hash__ = None
+
+
+class MatrixRow(TypedArray):
+    """Row of a Matrix: a fixed-length view onto its buffer"""
+    __slots__ = ("matrix", "start")
+
+    def __init__(self, matrix, start):
+        super().__init__()
+        self.matrix, self.start = matrix, start
+        self.element_type = matrix.cell_type
+
+    def position(self, j):
+        cols = self.matrix.cols
+        if j < 0:
+            j += cols
+        if not 0 <= j < cols:
+            raise IndexError("list index out of range")
+        return self.start + j
+
+    def __getitem__(self, j):
+        if type(j) is slice:
+            return TypedArray(self.tolist()[j])
+        return self.matrix.data[self.position(j)]
+
+    def __setitem__(self, j, value):
+        self.matrix.store(self.position(j), value)
+
+    def __len__(self):
+        return self.matrix.cols
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def fixed(self, *args):
+        raise TypeError("Cannot add or remove elements of a matrix row")
+
+    def __reduce__(self):
+        # a copy of a row is an array of its values, not another view
+        return TypedArray, (self.tolist(),)
+
+    append = extend = insert = pop = remove = clear = __delitem__ = fixed
+
+    def tolist(self):
+        return list(self.matrix.data[self.start:self.start + self.matrix.cols])
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    __str__ = __repr__
+
+    def __eq__(self, other):
+        return self.tolist() == list(other) if isinstance(other, ARRAYS) else NotImplemented
+
+    def __ne__(self, other):
+        return self.tolist() != list(other) if isinstance(other, ARRAYS) else NotImplemented
+
+    def __lt__(self, other):
+        return self.tolist() < list(other) if isinstance(other, ARRAYS) else NotImplemented
+
+    def __bool__(self):
+        return self.matrix.cols > 0
+
+    __hash__ = None
+
+
+# ---- bulk operations -------------------------------------------------------
+
+ELEMENTWISE = {"+": operator.add, "*": operator.mul}
+
+
+def elements(val):
+    """The elements of array `val` as a flat sequence: its buffer if it is
+    packed, else the array itself
+    """
+    if type(val) is PackedArray:
+        return val.items
+    if type(val) is MatrixRow:
+        return val.tolist()
+    return val
+
+
+def numbers(val, what):
+    """Elements of `val` for `what`, which needs an array of numbers"""
+    if not isinstance(val, ARRAYS):
+        raise TypeError(f"{what} can only be used on arrays")
+    items = elements(val)
+    element_type = getattr(val, "element_type", None)
+    if type(items) is array or element_type in PACKED:
+        return items
+    if element_type is None and all(type(x) is int or type(x) is float for x in items):
+        return items
+    raise TypeError(f"{what} can only be used on arrays of numbers")
+
+
+def array_sum(val):
+    total = sum(numbers(val, "sum()"))
+    return float(total) if getattr(val, "element_type", None) == "float" else total
+
+
+def array_min(val):
+    items = numbers(val, "min()")
+    if not items:
+        raise ValueError("min() of an empty array")
+    return min(items)
+
+
+def array_max(val):
+    items = numbers(val, "max()")
+    if not items:
+        raise ValueError("max() of an empty array")
+    return max(items)
+
+
+REDUCTIONS = {"sum": array_sum, "min": array_min, "max": array_max}
+
+
+def fill_array(val, value):
+    """Set every element of array `val` to `value` (a copy of it, for an
+    array of arrays) and return `val`
+    """
+    if not isinstance(val, ARRAYS):
+        raise TypeError("fill() can only be used on arrays")
+    if isinstance(val, TYPED_ARRAYS):
+        val.check(value)
+    size = len(val)
+    if type(val) is PackedArray and type(val.items) is array and type(value) is val.exact:
+        try:
+            val.items = array(val.items.typecode, [value]) * size
+            return val
+        except OverflowError:
+            pass
+    if isinstance(val, (Matrix, MatrixRow)):
+        for i in range(size):  # rows are copied in, cells stored in place
+            val[i] = value
+    elif isinstance(value, ARRAYS):
+        val[:] = [TypedArray(value) for _ in range(size)]
+    else:
+        val[:] = [value] * size
+    return val
+
+
+def new_range(count):
+    """range(n): the int[] 0, 1, ..., n - 1"""
+    if type(count) is not int:
+        raise TypeError("range() size must be an integer")
+    return PackedArray(array("q", range(count)), "int")
+
+
+def elementwise(op, left, right):
+    """left + right or left * right element by element, into a new array"""
+    what = f"'{op}'"
+    a, b = numbers(left, what), numbers(right, what)
+    if len(a) != len(b):
+        raise ValueError(f"Cannot apply {what} to arrays of lengths {len(a)} and {len(b)}")
+    fn = ELEMENTWISE[op]
+    element_type = getattr(left, "element_type", None)
+    if element_type != getattr(right, "element_type", None):
+        element_type = None
+    if element_type in PACKED:
+        try:
+            return PackedArray(array(PACKED[element_type][0], map(fn, a, b)), element_type)
+        except (OverflowError, TypeError):
+            pass  # an int result too big for the buffer
+    result = TypedArray(map(fn, a, b))
+    result.element_type = element_type
+    return result
+
+
+def sort_array(val, descending=False):
+    """Sort array `val` in place with list.sort and return it"""
+    if not isinstance(val, ARRAYS):
+        raise TypeError("sort() can only be used on arrays")
+    if isinstance(val, (Matrix, MatrixRow)):
+        for i, value in enumerate(sorted(val.tolist(), reverse=descending)):
+            val[i] = value
+    else:
+        val.sort(reverse=descending)
+    return val
+
+
+def reverse_array(val):
+    if not isinstance(val, ARRAYS):
+        raise TypeError("reverse() can only be used on arrays")
+    if isinstance(val, (Matrix, MatrixRow)):
+        for i, value in enumerate(val.tolist()[::-1]):
+            val[i] = value
+    else:
+        val.reverse()
+    return val
+
+
+REORDERS = {
+    "sort": sort_array,
+    "sort_desc": lambda val: sort_array(val, descending=True),
+    "reverse": reverse_array,
+}
+
+
+def lower_bound(val, value):
+    """Index of the first element of sorted array `val` not less than `value`"""
+    if not isinstance(val, ARRAYS):
+        raise TypeError("lower_bound() can only be used on arrays")
+    return bisect.bisect_left(elements(val), value)
+
+
+def upper_bound(val, value):
+    """Index of the first element of sorted array `val` greater than `value`"""
+    if not isinstance(val, ARRAYS):
+        raise TypeError("upper_bound() can only be used on arrays")
+    return bisect.bisect_right(elements(val), value)
+
+
+SEARCHES = {"lower_bound": lower_bound, "upper_bound": upper_bound}
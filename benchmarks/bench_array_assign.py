@@ -0,0 +1,53 @@
+# Times reassigning an n-element int[] (b = a;) in a loop under both engines.
+# An array checked once carries its element type, so the time per assignment
+# should not grow with n; "untagged" checks a plain list every time, which is
+# what every assignment cost before.
+# Usage: python benchmarks/bench_array_assign.py [max_n]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from evaluator import e, check_array
+import closures
+
+REPEAT = 1000
+
+
+def program(n):
+    return f"""
+    int[] a = [];
+    for (int i = 0; i < {n}; i = i + 1) {{ a.append(i); }}
+    int[] b = a;
+    for (int k = 0; k < {REPEAT}; k = k + 1) {{ b = a; }}
+    """
+
+
+def per_assignment(run, n):
+    # subtract the same program without the assignment loop
+    empty = program(n).replace(f"k < {REPEAT}", "k < 0")
+    start = time.perf_counter()
+    run(parse(program(n)))
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    run(parse(empty))
+    return max(full - (time.perf_counter() - start), 0) / REPEAT
+
+
+def untagged(n):
+    values = list(range(n))
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        check_array(values, "int[]", "b")
+    return (time.perf_counter() - start) / REPEAT
+
+
+if __name__ == "__main__":
+    max_n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    print(f"{'n':>8} {'tree us':>9} {'closure us':>11} {'untagged us':>12}")
+    n = 10
+    while n <= max_n:
+        print(f"{n:8d} {per_assignment(e, n) * 1e6:9.2f} {per_assignment(closures.run, n) * 1e6:11.2f} {untagged(n) * 1e6:12.2f}")
+        n *= 10
@@ -0,0 +1,47 @@
+# Measures the memory held by the AST of a large generated program, as a
+# pointer-based tree and as a flat arena.
+# Usage: python benchmarks/bench_ast_memory.py [statements]
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lexer import lex
+from parser import parse
+from arena import Arena
+
+STATEMENTS = [
+    "int v{i} = {i} * 2 + (x - 1) % 7;",
+    "x = x + v{i} ^ 2;",
+    "yap(\"value\", v{i}, a[{i} % 3]);",
+    "if (x > {i}) {{ x = x - 1; }} else {{ x = x + 1; }}",
+    "a[{i} % 3] = f(x, {i});",
+]
+
+
+def make_source(statements):
+    lines = ["int x = 0;", "int[] a = [1, 2, 3];", "def f(int p, int q) -> int { yeet p + q }"]
+    lines += [STATEMENTS[i % len(STATEMENTS)].format(i=i) for i in range(statements)]
+    return "\n".join(lines)
+
+
+def retained(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+if __name__ == "__main__":
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    source = make_source(statements)
+    tokens = list(lex(source))
+    tree, tree_size = retained(lambda: parse(tokens))
+    del tokens
+    arena, arena_size = retained(lambda: Arena.from_ast(tree))
+    mb = 1024 * 1024
+    print(f"{statements} statements, {len(arena)} nodes")
+    print(f"  AST objects: {tree_size / mb:.1f} MB ({tree_size / len(arena):.1f} bytes/node)")
+    print(f"  arena:       {arena_size / mb:.1f} MB ({arena_size / len(arena):.1f} bytes/node)")
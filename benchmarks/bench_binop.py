@@ -0,0 +1,40 @@
+# Times evaluation of nested arithmetic at increasing depths.  Each BinOp
+# evaluates its operands once, so the time per level should stay flat as the
+# nesting grows.
+# Usage: python benchmarks/bench_binop.py [max_depth]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from evaluator import e
+
+
+def nested(depth):
+    """int x = (((1 + 1) * 1) + 1) ... with `depth` operators"""
+    expr = "1"
+    for i in range(depth):
+        expr = f"({expr} {'+*'[i % 2]} 1)"
+    return f"int x = {expr};"
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    sys.setrecursionlimit(100_000)
+    max_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    depth = 1
+    while depth <= max_depth:
+        tree = parse(nested(depth))
+        elapsed = best_of(lambda: e(tree, {}, {}, []))
+        print(f"depth {depth:5d}: {elapsed * 1000:9.3f} ms ({elapsed / depth * 1e6:.2f} us/level)")
+        depth *= 2 if depth < 8 else 4
@@ -0,0 +1,61 @@
+# Times summing, taking the maximum of, adding and filling an n-element array
+# with explicit for loops against the bulk builtins (xs.sum(), xs.max(),
+# xs + ys, xs.fill(v)), on the closure engine and the stack VM.
+# Usage: python benchmarks/bench_bulk.py [n]
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from bytecode import AssemblyGenerator
+from stack_vm import StackVM
+from yapio import output
+import closures
+
+LOOPS = """
+    int[] xs = [];
+    for (int i = 0; i < {n}; i = i + 1) {{ xs.append(i); }}
+    int total = 0;
+    int best = xs[0];
+    for (int i = 0; i < {n}; i = i + 1) {{
+        total = total + xs[i];
+        if (xs[i] > best) {{ best = xs[i]; }}
+    }}
+    int[] ys = [];
+    for (int i = 0; i < {n}; i = i + 1) {{ ys.append(xs[i] + xs[i]); }}
+    for (int i = 0; i < {n}; i = i + 1) {{ xs[i] = 0; }}
+    yap(total, best, ys[{n} - 1]);
+"""
+BULK = """
+    int[] xs = range({n});
+    int total = xs.sum();
+    int best = xs.max();
+    int[] ys = xs + xs;
+    xs.fill(0);
+    yap(total, best, ys[{n} - 1]);
+"""
+
+
+def timed(run):
+    output.redirect(io.StringIO())
+    try:
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
+    finally:
+        output.redirect(None)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{n} elements, seconds")
+    print(f"{'':>8} {'closure':>8} {'vm':>8}")
+    for name, source in [("loops", LOOPS), ("bulk", BULK)]:
+        tree = parse(source.format(n=n))
+        instructions, function_table, constants = AssemblyGenerator().generate(tree)
+        closure_time = timed(closures.compile_program(tree))
+        vm_time = timed(lambda: StackVM(instructions, function_table, constants).run())
+        print(f"{name:>8} {closure_time:8.3f} {vm_time:8.3f}")
@@ -0,0 +1,42 @@
+# Times function calls in programs with a growing number of globals.  Calls
+# get a fresh frame instead of a copy of the caller's variables, so the time
+# per call should stay flat as the globals grow.
+# Usage: python benchmarks/bench_calls.py [calls]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from evaluator import e
+import closures
+
+
+def program(globals_count, calls):
+    """`globals_count` int globals, then a loop making `calls` calls"""
+    lines = [f"int g{i} = {i};" for i in range(globals_count)]
+    lines.append("def add(int a, int b) -> int { yeet a + b }")
+    lines.append("int total = 0;")
+    lines.append(f"for (int i = 0; i < {calls}; i = i + 1) {{ total = add(total, i); }}")
+    return "\n".join(lines)
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{'globals':>8} {'tree us/call':>14} {'closure us/call':>16}")
+    for globals_count in (0, 10, 100, 1000, 10000):
+        tree = parse(program(globals_count, calls))
+        run = closures.compile_program(tree)
+        tree_time = best_of(lambda: e(tree, {}, {}, []))
+        closure_time = best_of(run)
+        print(f"{globals_count:8d} {tree_time / calls * 1e6:14.2f} {closure_time / calls * 1e6:16.2f}")
@@ -0,0 +1,132 @@
+# Compares the stack VM's direct-threaded core (StackVM.execute: a closure per
+# instruction) with the if/elif chain over the opcodes it replaced (ChainVM in
+# chain_vm.py).
+#
+# Per opcode: a probe, such as LOAD 0; LOAD 0; ADD; POP for ADD, is repeated
+# inside a counted loop written directly in bytecode.  The time of the same
+# loop with no probes is subtracted, which leaves nanoseconds per probe.
+#
+# End to end: the sample programs in cp_problems/ and project-euler-tests/
+# that the VM runs in well under a second (problem5, 7 and 9 run for minutes),
+# counting construction and threading as well as execution.
+# Usage: python benchmarks/bench_dispatch.py [iterations]
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from parser import parse
+from bytecode import AssemblyGenerator, Opcode
+from stack_vm import StackVM
+from chain_vm import ChainVM
+from yapio import output
+
+O = Opcode
+THREE, ONE, ITERATIONS = 0, 1, 2  # constant pool indexes
+X, XS, MAP, MAT, COUNTER = range(5)  # global slots
+NEXT = "next"  # jump to the following instruction
+COPIES = 20
+
+SETUP = [
+    (O.PUSH_CONST, THREE), (O.STORE, X),
+    (O.PUSH_CONST, THREE), (O.PUSH_CONST, THREE), (O.PUSH_CONST, THREE), (O.CREATE_LIST, 3), (O.STORE, XS),
+    (O.NEWHASH,), (O.STORE, MAP), (O.PUSH_CONST, THREE), (O.PUSH_CONST, ONE), (O.STORE_INDEX, MAP),
+    (O.PUSH_CONST, THREE), (O.PUSH_CONST, THREE), (O.PUSH_CONST, ONE), (O.NEWMATRIX,), (O.STORE, MAT),
+]
+
+
+def binary(op):
+    return [(O.LOAD, X), (O.LOAD, X), (op,), (O.POP,)]
+
+
+PROBES = {
+    "PUSH_CONST": [(O.PUSH_CONST, THREE), (O.POP,)],
+    "LOAD": [(O.LOAD, X), (O.POP,)],
+    "STORE": [(O.PUSH_CONST, THREE), (O.STORE, X)],
+    "DUP": [(O.LOAD, X), (O.DUP,), (O.POP,), (O.POP,)],
+    "ADD": binary(O.ADD),
+    "SUB": binary(O.SUB),
+    "MUL": binary(O.MUL),
+    "DIV": binary(O.DIV),
+    "MOD": binary(O.MOD),
+    "FLR_DIV": binary(O.FLR_DIV),
+    "CMP_LT": binary(O.CMP_LT),
+    "CMP_EQ": binary(O.CMP_EQ),
+    "CMP_NEQ": binary(O.CMP_NEQ),
+    "NEG": [(O.LOAD, X), (O.NEG,), (O.POP,)],
+    "LNOT": [(O.LOAD, X), (O.LNOT,), (O.POP,)],
+    "JMP": [(O.JMP, NEXT)],
+    "JZ": [(O.LOAD, X), (O.JZ, NEXT)],
+    "JNZ": [(O.LOAD, X), (O.JNZ, NEXT)],
+    "CALL+RETURN": [(O.CALL, "f"), (O.POP,)],
+    "CREATE_LIST": [(O.LOAD, X), (O.LOAD, X), (O.CREATE_LIST, 2), (O.POP,)],
+    "LOAD_INDEX": [(O.PUSH_CONST, ONE), (O.LOAD_INDEX, XS), (O.POP,)],
+    "STORE_INDEX": [(O.PUSH_CONST, ONE), (O.LOAD, X), (O.STORE_INDEX, XS)],
+    "APPEND+DELETE": [(O.LOAD, X), (O.APPEND_INDEX, XS), (O.PUSH_CONST, THREE), (O.DELETE_INDEX, XS)],
+    "LEN": [(O.LEN, XS), (O.POP,)],
+    "LOAD_INDEX2": [(O.PUSH_CONST, ONE), (O.PUSH_CONST, ONE), (O.LOAD_INDEX2, MAT), (O.POP,)],
+    "STORE_INDEX2": [(O.PUSH_CONST, ONE), (O.PUSH_CONST, ONE), (O.LOAD, X), (O.STORE_INDEX2, MAT)],
+    "NEWHASH": [(O.NEWHASH,), (O.POP,)],
+    "CONTAINS": [(O.LOAD, MAP), (O.LOAD, X), (O.CONTAINS,), (O.POP,)],
+    "MAP_GET": [(O.LOAD, MAP), (O.LOAD, X), (O.PUSH_CONST, ONE), (O.MAP_GET,), (O.POP,)],
+}
+
+PROGRAMS = ["cp_problems/p.yap", "cp_problems/q7_22110165.yap", "cp_problems/q12_22110165.yap",
+            "cp_problems/q18_22110165.yap", "cp_problems/q19_22110165.yap",
+            "project-euler-tests/problem1.yap", "project-euler-tests/problem2.yap",
+            "project-euler-tests/problem3.yap", "project-euler-tests/problem6.yap"]
+
+
+def loop(probe, iterations):
+    """Linked instructions running `probe` COPIES times per iteration"""
+    ops = list(SETUP) + [(O.PUSH_CONST, ITERATIONS), (O.STORE, COUNTER)]
+    top = len(ops)
+    ops += probe * COPIES
+    ops += [(O.LOAD, COUNTER), (O.PUSH_CONST, ONE), (O.SUB,), (O.DUP,), (O.STORE, COUNTER), (O.JNZ, top), (O.EXIT,)]
+    function = len(ops)
+    ops += [(O.PUSH_CONST, THREE), (O.RETURN,)]  # f() returns 3
+
+    instructions = []
+    for i, (op, *args) in enumerate(ops):
+        if args == [NEXT]:
+            args = [i + 1]
+        elif args == ["f"]:
+            args = [function, 0, 1]
+        instructions.append(((i, op.name, op.value), tuple(args)))
+    return instructions, {}, [3, 1, iterations]
+
+
+def timed(program, vm_class, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        output.redirect(io.StringIO())
+        try:
+            start = time.perf_counter()
+            vm_class(*program).run()
+            best = min(best, time.perf_counter() - start)
+        finally:
+            output.redirect(None)
+    return best
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cores = [ChainVM, StackVM]
+    print(f"ns per probe ({iterations} iterations x {COPIES} copies)")
+    print(f"{'probe':>16} {'chain':>8} {'threaded':>9}")
+    empty = {core: timed(loop([], iterations), core) for core in cores}
+    for name, probe in PROBES.items():
+        program = loop(probe, iterations)
+        ns = [(timed(program, core) - empty[core]) / (iterations * COPIES) * 1e9 for core in cores]
+        print(f"{name:>16} {ns[0]:8.0f} {ns[1]:9.0f}")
+
+    print("\nms per run of each sample program")
+    print(f"{'program':>28} {'chain':>8} {'threaded':>9}")
+    for path in PROGRAMS:
+        with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+            program = AssemblyGenerator().generate(parse(f.read()))
+        ms = [timed(program, core, repeat=10) * 1000 for core in cores]
+        print(f"{os.path.basename(path):>28} {ms[0]:8.3f} {ms[1]:9.3f}")
@@ -0,0 +1,80 @@
+# Times the tree-walking evaluator against the closure engine on the Project
+# Euler programs and checks that both print the same thing.
+# Usage: python benchmarks/bench_engines.py [--limit SECONDS] [file.yap ...]
+import argparse
+import glob
+import io
+import os
+import signal
+import sys
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from parser import parse
+from evaluator import e
+import closures
+
+
+class TimeLimit(Exception):
+    pass
+
+
+def _expire(signum, frame):
+    raise TimeLimit()
+
+
+def timed(engine, tree, limit):
+    out = io.StringIO()
+    signal.signal(signal.SIGALRM, _expire)
+    signal.setitimer(signal.ITIMER_REAL, limit)
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(out):
+            engine(tree)
+    except TimeLimit:
+        return None, out.getvalue()
+    except Exception as error:
+        out.write(f"Error : {error}\n")
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def tree_walk(tree):
+    # e keeps its environment and call stack in its default arguments
+    for default in e.__defaults__:
+        default.clear()
+    e(tree)
+
+
+ENGINES = {
+    "tree": tree_walk,
+    "closure": closures.run,
+}
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser()
+    cli.add_argument("files", nargs="*")
+    cli.add_argument("--limit", type=float, default=120, help="seconds allowed per run")
+    cli.add_argument("--engines", default="tree,closure")
+    args = cli.parse_args()
+    engines = args.engines.split(",")
+    files = args.files or sorted(glob.glob(os.path.join(ROOT, "project-euler-tests", "*.yap")))
+    sys.setrecursionlimit(20_000)
+
+    print(f"{'program':<14}" + "".join(f"{name:>12}" for name in engines))
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            tree = parse(f.read())
+        row, outputs = [], []
+        for name in engines:
+            elapsed, output = timed(ENGINES[name], tree, args.limit)
+            row.append(f"{elapsed * 1000:10.1f}ms" if elapsed is not None else f"{'>' + str(int(args.limit)) + 's':>12}")
+            if elapsed is not None:
+                outputs.append(output)
+        same = "" if len(set(outputs)) <= 1 else "  OUTPUT DIFFERS"
+        print(f"{os.path.basename(path):<14}" + "".join(row) + same, flush=True)
@@ -0,0 +1,54 @@
+# Times repeatedly taking the smallest of n pending items, the inner loop of
+# Dijkstra or event simulation.  heap<int> does it with heapq in O(log n) per
+# pop; the linear scan of an int[] a YAP program needed before takes O(n).
+# Usage: python benchmarks/bench_heap.py [max_n]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+import closures
+
+
+def heap_program(n):
+    return f"""
+    heap<int> h;
+    for (int i = 0; i < {n}; i = i + 1) {{ h.heapPush((i * 7919) % {n}); }}
+    int total = 0;
+    while (h.len() > 0) {{ total = total + h.heapPop(); }}
+    """
+
+
+def scan_program(n):
+    return f"""
+    int[] pending = [];
+    for (int i = 0; i < {n}; i = i + 1) {{ pending.append((i * 7919) % {n}); }}
+    int total = 0;
+    while (pending.len() > 0) {{
+        int best = 0;
+        for (int j = 1; j < pending.len(); j = j + 1) {{
+            if (pending[j] < pending[best]) {{ best = j; }}
+        }}
+        total = total + pending[best];
+        pending.delete(best);
+    }}
+    """
+
+
+def timed(source):
+    run = closures.compile_program(parse(source))
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    max_n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    print(f"{'n':>8} {'heap us/pop':>12} {'scan us/pop':>12}")
+    n = 100
+    while n <= max_n:
+        scan_cell = f"{timed(scan_program(n)) / n * 1e6:12.1f}" if n <= 10 ** 3 else f"{'skipped':>12}"
+        print(f"{n:8d} {timed(heap_program(n)) / n * 1e6:12.1f} {scan_cell}")
+        n *= 10
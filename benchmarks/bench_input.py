@@ -0,0 +1,60 @@
+# Times reading n integers.  "input()" is what spill() did before: one line
+# per value through the input() builtin and parse_input.  The others go
+# through yapio.reader: a word at a time (int n = spill();) and a whole line
+# at once (int[] xs = spill();), the last one also as a YAP program.
+# Usage: python benchmarks/bench_input.py [n]
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from evaluator import parse_input
+from yapio import Reader, reader, read_value
+import closures
+
+
+def with_input_builtin(n):
+    saved = sys.stdin
+    sys.stdin = io.StringIO("".join(f"{i}\n" for i in range(n)))
+    try:
+        start = time.perf_counter()
+        for _ in range(n):
+            parse_input(input())
+        return time.perf_counter() - start
+    finally:
+        sys.stdin = saved
+
+
+def with_words(n):
+    source = Reader(io.BytesIO(" ".join(map(str, range(n))).encode()))
+    start = time.perf_counter()
+    for _ in range(n):
+        int(source.word())
+    return time.perf_counter() - start
+
+
+def with_line(n):
+    reader.redirect(io.BytesIO((" ".join(map(str, range(n))) + "\n").encode()))
+    start = time.perf_counter()
+    read_value("int[]")
+    return time.perf_counter() - start
+
+
+def with_program(n):
+    run = closures.compile_program(parse("int[] xs = spill(); yap(xs.len());"))
+    reader.redirect(io.BytesIO((" ".join(map(str, range(n))) + "\n").encode()))
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    print(f"{n} integers, ns per value")
+    for name, bench in [("input()", with_input_builtin), ("words", with_words),
+                        ("line", with_line), ("yap int[]", with_program)]:
+        print(f"{name:>10} {bench(n) / n * 1e9:8.0f}")
+    reader.redirect(None)
@@ -0,0 +1,55 @@
+# Measures lexer throughput and token memory on a large generated source.
+# Usage: python benchmarks/bench_lexer.py [size_in_MB]
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lexer import lex, lex_compact
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def make_source(size_mb):
+    # Concatenate the sample programs until the source reaches the target size
+    programs = []
+    for pattern in ("project-euler-tests/*.yap", "cp_problems/*.yap", "*.yap"):
+        for path in sorted(glob.glob(os.path.join(ROOT, pattern))):
+            with open(path, "r", encoding="utf-8") as file:
+                programs.append(file.read())
+    chunk = "\n".join(programs) + "\n"
+    return chunk * max(1, int(size_mb * 1024 * 1024 / len(chunk)))
+
+
+def bench(source, repeat=3):
+    best = float("inf")
+    tokens = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = sum(1 for _ in lex(source))
+        best = min(best, time.perf_counter() - start)
+    return best, tokens
+
+
+def bench_memory(build, source):
+    # Memory retained by a fully materialised token stream
+    tracemalloc.start()
+    tokens = build(source)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tokens
+    return size
+
+
+if __name__ == "__main__":
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    source = make_source(size_mb)
+    mb = len(source.encode("utf-8")) / (1024 * 1024)
+    seconds, tokens = bench(source)
+    print(f"lexed {mb:.1f} MB ({tokens} tokens) in {seconds:.3f}s: {mb / seconds:.2f} MB/s")
+    for name, build in (("list(lex())", lambda src: list(lex(src))), ("lex_compact()", lex_compact)):
+        size = bench_memory(build, source)
+        print(f"{name:>14}: {size / (1024 * 1024):.1f} MB retained, {size / tokens:.1f} bytes/token")
@@ -0,0 +1,58 @@
+# Times an n x n DP table built row by row with append (an int[][] of rows)
+# against one allocated with matrix(n, n, 0), on the closure engine and the
+# stack VM.  Matrix elements are read and written with one flat index.
+# Usage: python benchmarks/bench_matrix.py [n]
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from bytecode import AssemblyGenerator
+from stack_vm import StackVM
+from yapio import output
+import closures
+
+ROWS = """
+    int[][] mat = [];
+    for (int i = 0; i < {n}; i = i + 1) {{
+        int[] x = [];
+        for (int j = 0; j < {n}; j = j + 1) {{ x.append(1); }}
+        mat.append(x);
+    }}
+"""
+MATRIX = """
+    int[][] mat = matrix({n}, {n}, 1);
+"""
+DP = """
+    for (int i = 1; i < {n}; i = i + 1) {{
+        for (int j = 1; j < {n}; j = j + 1) {{
+            mat[i][j] = (mat[i - 1][j] + mat[i][j - 1]) % 1000003;
+        }}
+    }}
+    yap(mat[{n} - 1][{n} - 1]);
+"""
+
+
+def timed(run):
+    output.redirect(io.StringIO())
+    try:
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
+    finally:
+        output.redirect(None)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{n} x {n} table, seconds")
+    print(f"{'':>8} {'closure':>8} {'vm':>8}")
+    for name, build in [("rows", ROWS), ("matrix", MATRIX)]:
+        tree = parse((build + DP).format(n=n))
+        instructions, function_table, constants = AssemblyGenerator().generate(tree)
+        closure_time = timed(closures.compile_program(tree))
+        vm_time = timed(lambda: StackVM(instructions, function_table, constants).run())
+        print(f"{name:>8} {closure_time:8.3f} {vm_time:8.3f}")
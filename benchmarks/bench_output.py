@@ -0,0 +1,39 @@
+# Times a program that prints n lines with yap().  "per line" writes every
+# line to the stream as soon as it is printed, as yap() did before; "buffered"
+# uses the default output buffer.  The stream is os.devnull opened line
+# buffered, which costs a write syscall per flush like a terminal does.
+# Usage: python benchmarks/bench_output.py [n]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from evaluator import e
+from yapio import output, DEFAULT_LIMIT
+import closures
+
+
+def program(n):
+    return f'for (int i = 0; i < {n}; i = i + 1) {{ yap("line ", i); }}'
+
+
+def timed(run, limit):
+    with open(os.devnull, "w", buffering=1) as devnull:
+        output.redirect(devnull, limit)
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        output.redirect(None)
+    return elapsed
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    tree = parse(program(n))
+    engines = {"tree": lambda: e(tree), "closure": closures.compile_program(tree)}
+    print(f"{n} lines")
+    print(f"{'engine':>8} {'per line s':>11} {'buffered s':>11}")
+    for name, run in engines.items():
+        print(f"{name:>8} {timed(run, 0):11.3f} {timed(run, DEFAULT_LIMIT):11.3f}")
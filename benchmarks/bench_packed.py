@@ -0,0 +1,57 @@
+# Builds an n x n int[][] DP table (each row declared int[] x = [];) and
+# fills it with large values, once with packed rows and once with the rows
+# as plain lists, and reports peak memory and run time.
+# Usage: python benchmarks/bench_packed.py [n]
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+import arrays
+import closures
+
+
+def program(n):
+    return f"""
+    int[][] mat = [];
+    for (int i = 0; i < {n}; i = i + 1) {{
+        int[] x = [];
+        for (int j = 0; j < {n}; j = j + 1) {{ x.append(1000 + i * j); }}
+        mat.append(x);
+    }}
+    int total = 0;
+    for (int i = 1; i < {n}; i = i + 1) {{
+        for (int j = 1; j < {n}; j = j + 1) {{
+            mat[i][j] = (mat[i - 1][j] + mat[i][j - 1]) % 1000003;
+            total = total + mat[i][j] % 7;
+        }}
+    }}
+    """
+
+
+def measure(n):
+    run = closures.compile_program(parse(program(n)))
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print(f"{n} x {n} table")
+    packed_memory, packed_time = measure(n)
+    saved, arrays.PACKED = arrays.PACKED, {}
+    try:
+        boxed_memory, boxed_time = measure(n)
+    finally:
+        arrays.PACKED = saved
+    print(f"{'':>8} {'peak MB':>8} {'time s':>7}")
+    print(f"{'packed':>8} {packed_memory / 2 ** 20:8.2f} {packed_time:7.2f}")
+    print(f"{'boxed':>8} {boxed_memory / 2 ** 20:8.2f} {boxed_time:7.2f}")
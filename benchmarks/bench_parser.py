@@ -0,0 +1,53 @@
+# Times parsing of an expression-heavy generated source, from the source text
+# and from tokens already lexed into a TokenBuffer or a list, and checks that
+# deeply nested expressions parse without hitting the recursion limit.
+# Usage: python benchmarks/bench_parser.py [statements]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lexer import lex, lex_compact
+from parser import parse
+
+OPERATORS = ["+", "-", "*", "/", "%", "<", "==", "and", "^"]
+
+
+def make_source(statements, terms=20):
+    random.seed(3)
+    lines = []
+    for _ in range(statements):
+        expr = " ".join(random.choice(["x", "1", "2.5", "y"]) + " " + random.choice(OPERATORS)
+                        for _ in range(terms))
+        lines.append(f"yap({expr} 7);")
+    return "\n".join(lines)
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    source = make_source(statements)
+    tokens = lex_compact(source)
+    token_list = list(lex(source))
+    print(f"{statements} statements, {len(tokens)} tokens")
+    print(f"  lex + parse:          {best_of(lambda: parse(source)):.3f}s")
+    print(f"  parse a TokenBuffer:  {best_of(lambda: parse(tokens)):.3f}s")
+    print(f"  parse a Token list:   {best_of(lambda: parse(token_list)):.3f}s")
+    for depth in (100, 1000, 10000):
+        source = "yap(" + "(" * depth + "1" + ")" * depth + ");"
+        try:
+            parse(source)
+            result = "ok"
+        except RecursionError:
+            result = "RecursionError"
+        print(f"  nesting depth {depth}: {result}")
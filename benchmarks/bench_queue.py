@@ -0,0 +1,59 @@
+# Times filling a queue with n elements and popping them all again, at sizes
+# up to 10^6.  Queue is backed by collections.deque, so the time per element
+# should stay flat; the old list-backed queue (pop(0)) is shown for comparison
+# up to the size where it is still bearable.
+# Usage: python benchmarks/bench_queue.py [max_n]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from evaluator import Queue
+import closures
+
+
+class ListQueue(Queue):
+    """The queue as it was before: a list popped from the front"""
+    def __init__(self):
+        self.items = []
+
+    def pop(self):
+        return self.items.pop(0)
+
+
+def fill_and_drain(cls, n):
+    queue = cls()
+    for i in range(n):
+        queue.push(i)
+    for _ in range(n):
+        queue.pop()
+
+
+def program(n):
+    """The same in YAP, run with the closure engine"""
+    return f"""
+    queue<int> q;
+    for (int i = 0; i < {n}; i = i + 1) {{ q.queuePush(i); }}
+    for (int i = 0; i < {n}; i = i + 1) {{ q.queuePop(); }}
+    """
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    max_n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    print(f"{'n':>8} {'Queue ns/elem':>14} {'list ns/elem':>13} {'yap ns/elem':>12}")
+    n = 1000
+    while n <= max_n:
+        deque_time = timed(lambda: fill_and_drain(Queue, n))
+        list_cell = f"{timed(lambda: fill_and_drain(ListQueue, n)) / n * 1e9:13.0f}" if n <= 10 ** 5 else f"{'skipped':>13}"
+        run = closures.compile_program(parse(program(n)))
+        yap_time = timed(run)
+        print(f"{n:8d} {deque_time / n * 1e9:14.0f} {list_cell} {yap_time / n * 1e9:12.0f}")
+        n *= 10
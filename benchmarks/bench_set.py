@@ -0,0 +1,62 @@
+# Times n membership tests against n distinct values kept in an array and
+# searched with a loop, against the same values in a set<int> tested with
+# contains(), on the closure engine and the stack VM.
+# Usage: python benchmarks/bench_set.py [n]
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from bytecode import AssemblyGenerator
+from stack_vm import StackVM
+from yapio import output
+import closures
+
+ARRAY = """
+    int[] seen = [];
+    for (int i = 0; i < {n}; i = i + 1) {{ seen.append(i * 3); }}
+    int hits = 0;
+    for (int v = 0; v < {n}; v = v + 1) {{
+        for (int j = 0; j < seen.len(); j = j + 1) {{
+            if (seen[j] == v) {{
+                hits = hits + 1;
+                break;
+            }}
+        }}
+    }}
+    yap(hits);
+"""
+SET = """
+    set<int> seen;
+    for (int i = 0; i < {n}; i = i + 1) {{ seen.add(i * 3); }}
+    int hits = 0;
+    for (int v = 0; v < {n}; v = v + 1) {{
+        if (seen.contains(v)) {{ hits = hits + 1; }}
+    }}
+    yap(hits);
+"""
+
+
+def timed(run):
+    output.redirect(io.StringIO())
+    try:
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
+    finally:
+        output.redirect(None)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"{n} lookups in {n} values, seconds")
+    print(f"{'':>8} {'closure':>8} {'vm':>8}")
+    for name, source in [("array", ARRAY), ("set", SET)]:
+        tree = parse(source.format(n=n))
+        instructions, function_table, constants = AssemblyGenerator().generate(tree)
+        closure_time = timed(closures.compile_program(tree))
+        vm_time = timed(lambda: StackVM(instructions, function_table, constants).run())
+        print(f"{name:>8} {closure_time:8.3f} {vm_time:8.3f}")
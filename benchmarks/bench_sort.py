@@ -0,0 +1,78 @@
+# Times sorting n pseudo-random ints with the hand-written exchange sort
+# project-euler-tests/problem3.yap used to have against xs.sort(), and n
+# binary searches written as a YAP loop against xs.lower_bound(v), on the
+# closure engine and the stack VM.
+# Usage: python benchmarks/bench_sort.py [n]
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from bytecode import AssemblyGenerator
+from stack_vm import StackVM
+from yapio import output
+import closures
+
+FILL = """
+    int[] xs = [];
+    int seed = 7;
+    for (int i = 0; i < {n}; i = i + 1) {{
+        seed = (seed * 1103515245 + 12345) % 2147483648;
+        xs.append(seed % 100000);
+    }}
+"""
+LOOPS = FILL + """
+    for (int i = 0; i < xs.len(); i = i + 1) {{
+        for (int j = i; j < xs.len(); j = j + 1) {{
+            if (xs[j] < xs[i]) {{
+                int t = xs[i];
+                xs[i] = xs[j];
+                xs[j] = t;
+            }}
+        }}
+    }}
+    int found = 0;
+    for (int v = 0; v < {n}; v = v + 1) {{
+        int lo = 0;
+        int hi = xs.len();
+        while (lo < hi) {{
+            int mid = (lo + hi) // 2;
+            if (xs[mid] < v * {step}) {{ lo = mid + 1; }} else {{ hi = mid; }}
+        }}
+        found = found + lo;
+    }}
+    yap(xs[0], found);
+"""
+BUILTIN = FILL + """
+    xs.sort();
+    int found = 0;
+    for (int v = 0; v < {n}; v = v + 1) {{
+        found = found + xs.lower_bound(v * {step});
+    }}
+    yap(xs[0], found);
+"""
+
+
+def timed(run):
+    output.redirect(io.StringIO())
+    try:
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
+    finally:
+        output.redirect(None)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"{n} elements, seconds")
+    print(f"{'':>8} {'closure':>8} {'vm':>8}")
+    for name, source in [("loops", LOOPS), ("builtin", BUILTIN)]:
+        tree = parse(source.format(n=n, step=100000 // n))
+        instructions, function_table, constants = AssemblyGenerator().generate(tree)
+        closure_time = timed(closures.compile_program(tree))
+        vm_time = timed(lambda: StackVM(instructions, function_table, constants).run())
+        print(f"{name:>8} {closure_time:8.3f} {vm_time:8.3f}")
@@ -0,0 +1,73 @@
+# Times the stack VM on branch-heavy code: the sections of bytecode_tests.txt
+# (each run `repeat` times) and a Collatz loop that is almost all compares
+# and conditional jumps.  The "while loops" section is skipped, since its
+# last loop never ends, and so is "inputs", which reads stdin.
+# Usage: python benchmarks/bench_vm_branches.py [repeat]
+import io
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from parser import parse
+from bytecode import AssemblyGenerator
+from stack_vm import StackVM
+from yapio import output
+
+SKIP = {"while loops", "inputs"}
+
+COLLATZ = """
+    int longest = 0;
+    for (int n = 1; n < 3000; n = n + 1) {
+        int x = n;
+        int steps = 0;
+        while (x != 1) {
+            if (x % 2 == 0) { x = x // 2; } else { x = 3 * x + 1; }
+            steps = steps + 1;
+        }
+        if (steps > longest) { longest = steps; }
+    }
+    yap(longest);
+"""
+
+
+def sections():
+    """(name, source) of each section of bytecode_tests.txt"""
+    with open(os.path.join(ROOT, "bytecode_tests.txt"), encoding="utf-8") as f:
+        parts = re.split(r"(?m)^#{4,}(.*)$", f.read())
+    # parts: text before the first header, then name, body, name, body, ...
+    for i in range(1, len(parts) - 1, 2):
+        name = parts[i].strip() or f"section {i // 2 + 1}"
+        if name not in SKIP:
+            yield name, parts[i + 1]
+
+
+def timed(program, repeat):
+    output.redirect(io.StringIO())
+    try:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            StackVM(*program).run()
+        return time.perf_counter() - start
+    finally:
+        output.redirect(None)
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"seconds for {repeat} runs of each bytecode_tests.txt section")
+    total = 0.0
+    for name, source in sections():
+        try:
+            program = AssemblyGenerator().generate(parse(source))
+        except Exception as e:  # the generator does not cover every section
+            print(f"{name:>24}  (no bytecode: {type(e).__name__})")
+            continue
+        seconds = timed(program, repeat)
+        total += seconds
+        print(f"{name:>24} {seconds:8.3f}")
+    print(f"{'total':>24} {total:8.3f}")
+    print(f"{'collatz (1 run)':>24} {timed(AssemblyGenerator().generate(parse(COLLATZ)), 1):8.3f}")
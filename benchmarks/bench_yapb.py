@@ -0,0 +1,58 @@
+# Times getting each sample program ready to run on the stack VM: from source
+# (parse, type-check, generate and assemble bytecode) against loading the
+# .yapb file written for it, whose code section is used straight from a
+# memory map.  Programs that do not type-check or that the bytecode generator
+# does not cover are skipped.
+# Usage: python benchmarks/bench_yapb.py [repeat]
+import glob
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from parser import parse
+from typechecker import TypeChecker
+from bytecode import AssemblyGenerator
+from stack_vm import StackVM
+
+
+def from_source(source):
+    ast = parse(source)
+    TypeChecker().visit(ast)
+    return StackVM(*AssemblyGenerator().generate(ast))
+
+
+def best(start, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        start()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    paths = sorted(glob.glob(os.path.join(ROOT, "project-euler-tests", "*.yap")) +
+                   glob.glob(os.path.join(ROOT, "cp_problems", "*.yap")))
+    print(f"{'program':>28} {'source ms':>10} {'.yapb ms':>10} {'bytes':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                source = f.read()
+            generator = AssemblyGenerator()
+            try:
+                ast = parse(source)
+                TypeChecker().visit(ast)
+                generator.generate(ast)
+            except Exception:
+                continue
+            binary = os.path.join(tmp, os.path.basename(path) + "b")
+            generator.write(binary)
+            compiled = best(lambda: from_source(source), repeat)
+            loaded = best(lambda: StackVM.load(binary), repeat)
+            print(f"{os.path.basename(path):>28} {compiled * 1000:10.3f} {loaded * 1000:10.3f} "
+                  f"{os.path.getsize(binary):7}")
@@ -0,0 +1,258 @@
+# The stack VM as it ran before StackVM.execute was direct-threaded: one
+# if/elif chain over the opcodes, with pc and the stack on the instance.
+# bench_dispatch.py times it against the threaded core and
+# tests/test_vm_dispatch.py checks that both print the same for a few sample
+# programs.  It is a frozen reference and does not run opcodes added since.
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from arrays import Matrix, TypedArray, ARRAYS, fill_array, new_range, elementwise, sort_array, reverse_array, REDUCTIONS, SEARCHES
+from stack_vm import StackVM, get_true_val
+from yapb import WIDTHS
+from yapio import output, reader, read_value
+
+
+class ChainVM(StackVM):
+    def execute(self):
+        code = self.code
+        while self.pc < len(code):
+            op = code[self.pc]
+            width = WIDTHS[op]
+            arg = code[self.pc + 1] if width else None  # first operand
+
+            if op == 0x34:  # PUSH_CONST
+                self.stack.append(self.constants[arg])
+
+            elif op == 0x02:  # POP
+                self.stack.pop()
+
+            elif op == 0x18:  # DUP
+                self.stack.append(self.stack[-1])
+
+            elif op == 0x04:  # ADD
+                b, a = self.stack.pop(), self.stack.pop()
+                if isinstance(a, ARRAYS) and isinstance(b, ARRAYS):
+                    self.stack.append(elementwise("+", a, b))
+                else:
+                    self.stack.append(a + b)
+
+            elif op == 0x05:  # SUB
+                b, a = self.stack.pop(), self.stack.pop()
+                self.stack.append(a - b)
+
+            elif op == 0x06:  # MUL
+                b, a = self.stack.pop(), self.stack.pop()
+                if isinstance(a, ARRAYS) and isinstance(b, ARRAYS):
+                    self.stack.append(elementwise("*", a, b))
+                else:
+                    self.stack.append(a * b)
+
+            elif op == 0x07:  # DIV
+                b, a = self.stack.pop(), self.stack.pop()
+                self.stack.append(a / b)
+
+            elif op == 0x09:  # NEG
+                self.stack.append(-self.stack.pop())
+
+            elif op == 0x08:  # POW
+                b, a = self.stack.pop(), self.stack.pop()
+                self.stack.append(a ** b)
+            elif op == 0x16: #MODULO
+                b, a = self.stack.pop(), self.stack.pop()
+                self.stack.append(a % b)
+            elif op == 0x21: #Floor division
+                b, a = self.stack.pop(), self.stack.pop()
+                self.stack.append(a // b)
+            elif op == 0x17: #LNOT
+                self.stack.append(not self.stack.pop())
+
+            elif op == 0x0C:  # CMP_EQ
+                b, a = self.stack.pop(), self.stack.pop()
+                self.stack.append(a == b)
+
+            elif op == 0x0A:  # CMP_LT
+                b, a = self.stack.pop(), self.stack.pop()
+                self.stack.append(a < b)
+
+            elif op == 0x0B:  # CMP_GT
+                b, a = self.stack.pop(), self.stack.pop()
+                self.stack.append(a > b)
+
+            elif op == 0x0D:  # CMP_NEQ
+                b, a = self.stack.pop(), self.stack.pop()
+                self.stack.append(a != b)
+
+            elif op == 0x1B:  # LOAD
+                index = arg
+                self.stack.append(self.get_var(index))
+
+            elif op == 0x24:  # LOAD_GLOBAL
+                self.stack.append(self.env_stack[0][arg])
+
+            elif op == 0x03:  # STORE
+                index = arg
+                self.set_var(index, self.stack.pop())
+
+            elif op == 0x0E:  # JMP
+                self.pc = arg
+                continue
+
+            elif op == 0x0F:  # JZ
+                if not self.stack.pop():
+                    self.pc = arg
+                    continue
+
+            elif op == 0x10:  # JNZ
+                if self.stack.pop():
+                    self.pc = arg
+                    continue
+
+            elif op == 0x11:  # CALL
+                address, param_count, frame_size = code[self.pc + 1:self.pc + 4]
+
+                # Extract arguments from stack (in reverse order)
+                args_for_func = [self.stack.pop() for _ in range(param_count)][::-1]
+
+                self.call_stack.append(self.pc + 1 + width)
+                self.push_env(frame_size)
+
+                # Store args in new scope
+                for i, val in enumerate(args_for_func):
+                    self.set_var(i, val)
+
+                self.pc = address
+                continue
+
+            elif op == 0x12:  # RETURN
+                self.pop_env()
+                self.pc = self.call_stack.pop()
+                continue
+
+            elif op == 0x13:  # PRINT
+                val=self.stack.pop()
+                if val is True or val is False:
+                    self.print_buffer.append("nocap" if val else "cap")
+                elif isinstance(val, (int, float)) and val < 0:
+                    self.print_buffer.append("~" + str(abs(val)))
+                else:
+                    self.print_buffer.append(str(val))
+                
+            elif op == 0x19: #INPUT
+                kind = self.constants[arg]
+                if kind is not None:
+                    self.stack.append(read_value(kind))
+                else:
+                    self.stack.append(get_true_val(reader.line()))
+            
+            elif op == 0x1A:  # EXIT
+                break
+            
+            elif op == 0x1C: #CREATE_LIST
+                leng = arg
+                arr =[]
+                for _ in range(leng):
+                    arr.append(self.stack.pop())
+                self.stack.append(arr[::-1])
+             
+            elif op == 0x1D:  #LOAD_INDEX
+                index = self.stack.pop()
+                arr = self.get_var(arg)
+                self.stack.append(arr[index]) 
+            
+            elif op == 0x26:  # LOAD_INDEX2
+                j = self.stack.pop()
+                i = self.stack.pop()
+                arr = self.get_var(arg)
+                self.stack.append(arr.get(i, j) if type(arr) is Matrix else arr[i][j])
+
+            elif op == 0x27:  # STORE_INDEX2
+                val = self.stack.pop()
+                j = self.stack.pop()
+                i = self.stack.pop()
+                arr = self.get_var(arg)
+                if type(arr) is Matrix:
+                    arr.set(i, j, val)
+                else:
+                    arr[i][j] = val
+
+            elif op == 0x25:  # NEWMATRIX
+                fill = self.stack.pop()
+                cols = self.stack.pop()
+                rows = self.stack.pop()
+                self.stack.append(Matrix(rows, cols, fill))
+
+            elif op == 0x28:  # REDUCE
+                self.stack.append(REDUCTIONS[self.constants[arg]](self.stack.pop()))
+
+            elif op == 0x29:  # FILL
+                val = self.stack.pop()
+                fill_array(self.stack.pop(), val)
+
+            elif op == 0x2A:  # RANGE
+                self.stack.append(new_range(self.stack.pop()))
+
+            elif op == 0x2B:  # SORT
+                sort_array(self.stack.pop(), descending=arg)
+
+            elif op == 0x2C:  # REVERSE
+                reverse_array(self.stack.pop())
+
+            elif op == 0x2D:  # BISECT
+                val = self.stack.pop()
+                self.stack.append(SEARCHES[self.constants[arg]](self.stack.pop(), val))
+
+            elif op == 0x2E:  # NEWSET
+                self.stack.append(set())
+
+            elif op == 0x2F:  # CONTAINS
+                val = self.stack.pop()
+                self.stack.append(val in self.stack.pop())
+
+            elif op == 0x30:  # SET_ADD
+                self.get_var(arg).add(self.stack.pop())
+
+            elif op == 0x31:  # SET_REMOVE
+                self.get_var(arg).remove(self.stack.pop())
+
+            elif op == 0x32:  # MAP_GET
+                default = self.stack.pop()
+                key = self.stack.pop()
+                self.stack.append(self.stack.pop().get(key, default))
+
+            elif op == 0x33:  # MAP_VIEW
+                hashmap = self.stack.pop()
+                self.stack.append(TypedArray(hashmap.keys() if self.constants[arg] == "keys" else hashmap.values()))
+
+            elif op == 0x1E:  #STORE_INDEX
+                val = self.stack.pop()
+                index = self.stack.pop()
+                arr = self.get_var(arg)
+                arr[index]=val 
+                self.set_var(arg, arr)
+            
+            elif op == 0x1F:  #APPEND_INDEX
+                val = self.stack.pop()
+                arr = self.get_var(arg)
+                arr.append(val )
+                self.set_var(arg, arr)
+            
+            elif op == 0x20:  #DELETE_INDEX
+                index = self.stack.pop()
+                arr = self.get_var(arg)
+                del arr[index]
+                self.set_var(arg, arr)
+                     
+            elif op == 0x15: #NEWLINE
+                output.write(' '.join(self.print_buffer) + "\n")
+                self.print_buffer.clear()
+            
+            elif op== 0x22: #NEWHASH
+                self.stack.append({})
+                
+            elif op ==0x23: #LEN
+                arr = self.get_var(arg)
+                self.stack.append(len(arr))            
+                   
+            self.pc += 1 + width
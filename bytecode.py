@@ -1,10 +1,11 @@
 from enum import Enum
 from parser import *
 from stack_vm import *
+import yapb
+from errors import CodegenError
 
 class Opcode(Enum):
     """Enum for stack-based VM opcodes (standardized)"""
-    PUSH = 0x01       # Push a value onto the stack (replaces LOAD)
     POP = 0x02        # Remove top value from stack
     STORE = 0x03      # Store stack value into a variable
     ADD = 0x04
@@ -39,16 +40,39 @@ class Opcode(Enum):
     FLR_DIV = 0x21
     NEWHASH = 0x22
     LEN = 0x23
+    LOAD_GLOBAL = 0x24  # Load a global from inside a function
+    NEWMATRIX = 0x25    # Pop fill, columns, rows; push a matrix
+    LOAD_INDEX2 = 0x26  # Pop j, i; push var[i][j]
+    STORE_INDEX2 = 0x27 # Pop value, j, i; var[i][j] = value
+    REDUCE = 0x28       # Pop an array; push its sum, min or max (the argument)
+    FILL = 0x29         # Pop value, array; set every element to value
+    RANGE = 0x2A        # Pop n; push the int array 0 .. n-1
+    SORT = 0x2B         # Pop an array; sort it in place, descending if the argument is set
+    REVERSE = 0x2C      # Pop an array; reverse it in place
+    BISECT = 0x2D       # Pop value, array; push its lower_bound or upper_bound (the argument)
+    NEWSET = 0x2E       # Push an empty set
+    CONTAINS = 0x2F     # Pop value, collection; push whether it holds the value
+    SET_ADD = 0x30      # Pop value; add it to the set in var
+    SET_REMOVE = 0x31   # Pop value; remove it from the set in var
+    MAP_GET = 0x32      # Pop default, key, hashmap; push hashmap[key], or default if missing
+    MAP_VIEW = 0x33     # Pop hashmap; push its keys or values (the argument) as an array
+    PUSH_CONST = 0x34   # Push constants[argument]
     
+# Instructions whose operand is a label until `AssemblyGenerator.link`
+JUMPS = {Opcode.JMP.value, Opcode.JZ.value, Opcode.JNZ.value}
+
+
 class AssemblyGenerator:
     def __init__(self):
         self.instructions = []
         self.instruction_counter = 0
         self.label_counter = 0
-        self.symbol_table = {}
+        self.depth = 0  # function nesting of the code being generated
         self.break_labels=[]
         self.continue_labels=[]
         self.function_table = {}  # Track function definitions
+        self.constants = []       # Constant pool, indexed by PUSH_CONST
+        self.constant_index = {}  # (type, value) -> index in the pool
         self.current_function = None  # Track current function context
 
     def emit(self, instruction, *args):
@@ -61,49 +85,119 @@ class AssemblyGenerator:
             self.instruction_counter += 1
 
 
+    def push_constant(self, value):
+        """Emit a PUSH_CONST of `value`, adding it to the pool once"""
+        key = (type(value), value)
+        index = self.constant_index.get(key)
+        if index is None:
+            index = self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        self.emit(Opcode.PUSH_CONST, index)
+
     def generate_label(self):
         """Generate a unique label for jumps"""
         label = f"L{self.label_counter}"
         self.label_counter += 1
         return label
 
-    def get_var_location(self, var_name):
-        """Assign memory location for a variable"""
-        if var_name not in self.symbol_table:
-            self.symbol_table[var_name] = len(self.symbol_table)
-        return self.symbol_table[var_name]
+    def get_var_location(self, node, var_name):
+        """Slot resolver.py gave a variable of the running frame"""
+        if node.slot is None:
+            raise NameError(f"Undefined variable: {var_name}")
+        if node.depth != self.depth:
+            raise CodegenError(f"No bytecode for outer variable '{var_name}'")
+        return node.slot
 
     def generate(self, ast):
         """Generate assembly for an AST"""
         self.generate_statement(ast)
         self.emit(Opcode.EXIT)  # End of program
-        return  self.instructions, self.function_table 
+        self.link()
+        return  self.instructions, self.function_table, self.constants
+
+    def write(self, path):
+        """Save the generated program as a .yapb file (see yapb.py)"""
+        yapb.write(path, self.instructions, self.function_table, self.constants)
+
+    def link(self):
+        """Drop the label pseudo-instructions and replace every jump target
+        with the index of the instruction it jumps to.  A CALL's operands
+        become (address, parameter count, frame size); the function table
+        records each function's address too.
+        """
+        addresses = {}
+        code = []
+        for instr in self.instructions:
+            if len(instr) == 1:  # ("L3::",) labels the next instruction
+                addresses[instr[0][:-2]] = len(code)
+            else:
+                code.append(instr)
+
+        for info in self.function_table.values():
+            info['address'] = addresses[info['label']]
+
+        for i, (head, args) in enumerate(code):
+            opcode = head[2]
+            if opcode in JUMPS:
+                code[i] = (head, (addresses[args[0]],))
+            elif opcode == Opcode.CALL.value:
+                info = self.function_table.get(args[0])
+                if info is None:
+                    raise CodegenError(f"No bytecode for a call to '{args[0]}'")
+                code[i] = (head, (info['address'], len(info['params']), info['frame_size']))
+        self.instructions = code
 
     def generate_statement(self, expr):
         """Convert AST expressions into bytecode"""
         if isinstance(expr, Number):
-            self.emit(Opcode.PUSH, expr.val)
+            self.push_constant(float(expr.val) if '.' in expr.val else int(expr.val))
         elif isinstance(expr, String):
-            self.emit(Opcode.PUSH, expr.val)
+            self.push_constant(expr.val)
         elif isinstance(expr, Boolean):
-            self.emit(Opcode.PUSH, expr.val)
+            self.push_constant(expr.val == "nocap")
         elif isinstance(expr, Variable):
-            var_loc = self.get_var_location(expr.val)
-            
             # Check if this is a function reference
             if expr.val in self.function_table:
                 # For function references, push the function name instead of loading a value
-                self.emit(Opcode.PUSH, expr.val)
+                self.push_constant(expr.val)
+            elif expr.depth == 0 and self.depth > 0 and expr.slot is not None:
+                # A global read from inside a function
+                self.emit(Opcode.LOAD_GLOBAL, expr.slot)
             else:
                 # For regular variables, load the value
-                self.emit(Opcode.LOAD, var_loc)
+                self.emit(Opcode.LOAD, self.get_var_location(expr, expr.val))
                 
         elif isinstance(expr, Parenthesis):
             self.generate_statement(expr.expr)
         elif isinstance(expr, Input):
-            self.emit(Opcode.INPUT)  # Emit input instruction  
+            self.emit(Opcode.INPUT, expr.type)  # Emit input instruction, with the declared type if known  
         elif isinstance(expr, ArrayAccess):  # Handling numbers[2]
             self.generate_array_access(expr)
+        elif isinstance(expr, NewMatrix):
+            self.generate_statement(expr.rows)
+            self.generate_statement(expr.cols)
+            self.generate_statement(expr.fill)
+            self.emit(Opcode.NEWMATRIX)
+        elif isinstance(expr, ArrayReduce):
+            self.generate_statement(expr.array)
+            self.emit(Opcode.REDUCE, expr.op)
+        elif isinstance(expr, ArrayFill):
+            self.generate_statement(expr.array)
+            self.generate_statement(expr.value)
+            self.emit(Opcode.FILL)
+        elif isinstance(expr, NewRange):
+            self.generate_statement(expr.count)
+            self.emit(Opcode.RANGE)
+        elif isinstance(expr, ArrayReorder):
+            self.generate_statement(expr.array)
+            if expr.op == "reverse":
+                self.emit(Opcode.REVERSE)
+            else:
+                self.emit(Opcode.SORT, expr.op == "sort_desc")
+        elif isinstance(expr, ArraySearch):
+            self.generate_statement(expr.array)
+            self.generate_statement(expr.value)
+            self.emit(Opcode.BISECT, expr.op)
         elif isinstance(expr, ArrayAppend):  # Handle appending in expressions
             self.generate_array_append(expr)
 
@@ -179,7 +273,7 @@ class AssemblyGenerator:
                 self.emit(op_map[expr.op])
             
             else:
-                raise KeyError(f"Unsupported operator: '{expr.op}'")
+                raise CodegenError(f"Unsupported operator: '{expr.op}'")
 
 
 
@@ -189,7 +283,7 @@ class AssemblyGenerator:
         elif isinstance(expr, Declaration):
             self.generate_declaration(expr)
         elif isinstance(expr, Assignment):
-            var_loc = self.get_var_location(expr.name)
+            var_loc = self.get_var_location(expr, expr.name)
             self.generate_statement(expr.value)  
             self.emit(Opcode.STORE, var_loc)
         elif isinstance(expr, ArrayAssignment): 
@@ -239,10 +333,34 @@ class AssemblyGenerator:
         
         elif isinstance(expr, HashMap):
             self.emit(Opcode.NEWHASH)
-            self.emit(Opcode.STORE,self.get_var_location(expr.name))
+            self.emit(Opcode.STORE,self.get_var_location(expr, expr.name))
+
+        elif isinstance(expr, SetDeclaration):
+            self.emit(Opcode.NEWSET)
+            self.emit(Opcode.STORE, self.get_var_location(expr, expr.name))
+
+        elif isinstance(expr, (SetAdd, SetRemove)):
+            self.generate_statement(expr.value)
+            self.emit(Opcode.SET_ADD if isinstance(expr, SetAdd) else Opcode.SET_REMOVE,
+                      self.get_var_location(expr, expr.set_name))
+
+        elif isinstance(expr, Contains):
+            self.generate_statement(expr.collection)
+            self.generate_statement(expr.value)
+            self.emit(Opcode.CONTAINS)
+
+        elif isinstance(expr, MapGet):
+            self.generate_statement(expr.map)
+            self.generate_statement(expr.key)
+            self.generate_statement(expr.default)
+            self.emit(Opcode.MAP_GET)
+
+        elif isinstance(expr, MapView):
+            self.generate_statement(expr.map)
+            self.emit(Opcode.MAP_VIEW, expr.op)
             
         else:
-            self.generate_statement(expr) 
+            raise CodegenError(f"No bytecode for {type(expr).__name__}")
 
         
     def generate_if(self, expr):
@@ -306,9 +424,9 @@ class AssemblyGenerator:
 
         start_label = self.generate_label()
         end_label = self.generate_label()
-        self.break_labels.append(end_label)
-        self.continue_labels.append(start_label)
         increment_label = self.generate_label()
+        self.break_labels.append(end_label)
+        self.continue_labels.append(increment_label)  # continue still runs the increment
         self.emit(f"{start_label}:")
         self.generate_statement(expr.condition)
         self.emit(Opcode.JZ, end_label)
@@ -324,7 +442,7 @@ class AssemblyGenerator:
 
     def generate_declaration(self, decl):
         """Convert AST variable declarations into bytecode"""
-        var_loc = self.get_var_location(decl.name)
+        var_loc = self.get_var_location(decl, decl.name)
         if decl.type == 'fn':
             # For function type declarations, handle specially
             self.generate_statement(decl.value)  # This will push the function name
@@ -342,14 +460,33 @@ class AssemblyGenerator:
             self.emit(Opcode.STORE, var_loc)
 
     def generate_array_access(self, array_access):
-        """Handles array indexing (arr[i])"""
-        var_loc = self.get_var_location(array_access.array.val)  
+        """Handles array indexing (arr[i], and m[i][j] in one step)"""
+        if isinstance(array_access.array, ArrayAccess) and isinstance(array_access.array.array, Variable):
+            row = array_access.array
+            var_loc = self.get_var_location(row.array, row.array.val)
+            self.generate_statement(row.index)
+            self.generate_statement(array_access.index)
+            self.emit(Opcode.LOAD_INDEX2, var_loc)
+            return
+        var_loc = self.get_var_location(array_access.array, array_access.array.val)  
         self.generate_statement(array_access.index)  # Push index onto stack
         self.emit(Opcode.LOAD_INDEX, var_loc)  # Load element from array
 
     def generate_array_store(self, array_store):
-        """Handles writing to an array (arr[i] = value)"""
-        var_loc = self.get_var_location(array_store.array.val)
+        """Handles writing to an array (arr[i] = value, and m[i][j] = value)"""
+        target = array_store.array
+        if (array_store.index is None and isinstance(target, ArrayAccess)
+                and isinstance(target.array, ArrayAccess) and isinstance(target.array.array, Variable)):
+            var_loc = self.get_var_location(target.array.array, target.array.array.val)
+            self.generate_statement(target.array.index)  # Push i
+            self.generate_statement(target.index)        # Push j
+            self.generate_statement(array_store.value)   # Push value
+            self.emit(Opcode.STORE_INDEX2, var_loc)
+            return
+        if array_store.index is None and isinstance(target, ArrayAccess) and isinstance(target.array, Variable):
+            # arr[i] = value as a statement is parsed in the same shape
+            array_store = ArrayAssignment(target.array, target.index, array_store.value)
+        var_loc = self.get_var_location(array_store.array, array_store.array.val)
         
         self.generate_statement(array_store.index)  # Push index
         self.generate_statement(array_store.value)  # Push value
@@ -357,18 +494,18 @@ class AssemblyGenerator:
 
     def generate_array_append(self, append_node):
         """Generate bytecode for appending to an array"""
-        array_loc = self.get_var_location(append_node.array.val) 
+        array_loc = self.get_var_location(append_node.array, append_node.array.val) 
         self.generate_statement(append_node.value)  # Then push value to append
         self.emit(Opcode.APPEND_INDEX, array_loc)              # Append value to array
     
     def generate_array_delete(self, delete_node):
         """Generate bytecode for deleting from an array"""
-        array_loc = self.get_var_location(delete_node.array.val)
+        array_loc = self.get_var_location(delete_node.array, delete_node.array.val)
         self.generate_statement(delete_node.index)  # Push index to delete
         self.emit(Opcode.DELETE_INDEX, array_loc)              # Delete element at index
     def generate_array_length(self, expr):
         """Generate bytecode for deleting from an array"""
-        array_loc = self.get_var_location(expr.array.val)
+        array_loc = self.get_var_location(expr.array, expr.array.val)
         self.emit(Opcode.LEN, array_loc)              # length
     def print_assembly(self):
         """Print generated assembly code"""
@@ -385,22 +522,16 @@ class AssemblyGenerator:
         # Create a label for the function
         func_label = self.generate_label()
         
-        # Save the current symbol table
-        old_symbol_table = self.symbol_table.copy()
-        
-        # Reset the symbol table for the function scope
-        self.symbol_table = {}
-        
-        # Pre-allocate locations for parameters
+        # Parameters take the first slots of the function's frame
         param_locations = []
         for param_type, param_name in expr.params:
-            param_loc = self.get_var_location(param_name)
             param_locations.append(param_name)
         
         self.function_table[func_name] = {
             'label': func_label,
             'params': param_locations,
-            'return_type': expr.return_type if hasattr(expr, 'return_type') else None
+            'return_type': expr.return_type if hasattr(expr, 'return_type') else None,
+            'frame_size': expr.frame_size
         }
         
         # Jump past the function definition during normal execution
@@ -413,6 +544,14 @@ class AssemblyGenerator:
         # Save current function context
         prev_function = self.current_function
         self.current_function = func_name
+        self.depth += 1
+
+        # Locals shadowing a global start out as its copy
+        for slot, depth, outer, outer_name in expr.copies:
+            if depth != 0:
+                raise CodegenError(f"No bytecode for outer variable '{outer_name}'")
+            self.emit(Opcode.LOAD_GLOBAL, outer)
+            self.emit(Opcode.STORE, slot)
         
         # Generate code for function body
         self.generate_statement(expr.body)
@@ -422,14 +561,12 @@ class AssemblyGenerator:
                 isinstance(expr.body, Sequence) and 
                 expr.body.statements and 
                 isinstance(expr.body.statements[-1], Return)):
-            self.emit(Opcode.PUSH, None)  # Push None as default return value
+            self.push_constant(None)  # Push None as default return value
             self.emit(Opcode.RETURN)
         
         # Restore previous function context
         self.current_function = prev_function
-        
-        # Restore the previous symbol table
-        self.symbol_table = old_symbol_table
+        self.depth -= 1
         
         # End of function definition
         self.emit(f"{end_func_label}:")
@@ -443,20 +580,21 @@ class AssemblyGenerator:
         # Call the function
         self.emit(Opcode.CALL, call_node.name)
         
-# with open('bytecode_tests.txt', 'r', encoding='utf-8') as file:
-with open('cp_problems/q19_22110165.yap', 'r', encoding='utf-8') as file:
-        source_code = file.read()
-ast = parse(source_code)
-# print(ast)
-generator = AssemblyGenerator()
-abc, function_table = generator.generate(ast)
-# print(abc)
-# print(generator.function_table)
-# Print human-readable assembly
-# generator.print_assembly()
-vm = StackVM(abc, function_table)
-# print("ok")
-vm.run()
+if __name__ == "__main__":
+    # with open('bytecode_tests.txt', 'r', encoding='utf-8') as file:
+    with open('cp_problems/q19_22110165.yap', 'r', encoding='utf-8') as file:
+            source_code = file.read()
+    ast = parse(source_code)
+    # print(ast)
+    generator = AssemblyGenerator()
+    abc, function_table, constants = generator.generate(ast)
+    # print(abc)
+    # print(generator.function_table)
+    # Print human-readable assembly
+    # generator.print_assembly()
+    vm = StackVM(abc, function_table, constants)
+    # print("ok")
+    vm.run()
 
 
 
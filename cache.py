@@ -0,0 +1,140 @@
+# Description: On-disk compilation cache
+#
+# Each entry is a .yapc file holding the type-checked AST (as an arena, see
+# arena.py) and the bytecode generated for it.  Entries are named after a hash
+# of the source text and the compiler version, so editing either one simply
+# misses.  The directory is kept under a size limit by evicting the least
+# recently used entries; a hit refreshes the entry's modification time.
+
+import hashlib
+import json
+import marshal
+import os
+import sys
+
+import arena
+from arena import Arena
+
+COMPILER_VERSION = "1.5"
+MAGIC = b"YAPC"
+SUFFIX = ".yapc"
+STATS_FILE = "stats.json"
+DEFAULT_DIR = "__yapcache__"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Anything that changes what an entry means is folded into every key
+_SALT = "\0".join([COMPILER_VERSION, sys.implementation.cache_tag or "", arena.schema()]).encode()
+
+
+class CompileCache:
+    """A directory of compiled programs, bounded to `max_bytes` on disk"""
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source):
+        return hashlib.sha256(_SALT + b"\0" + source.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load(self, source):
+        """Return (ast, instructions, function_table, constants) for `source`, or None on a miss"""
+        path = self._path(self.key(source))
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            if blob[:len(MAGIC)] != MAGIC:
+                raise ValueError("bad magic")
+            tree, instructions, function_table, constants = marshal.loads(blob[len(MAGIC):])
+            entry = (Arena.from_bytes(tree).to_ast(), instructions, function_table, constants)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, EOFError, TypeError):
+            # unreadable or corrupt entry: drop it and recompile
+            self.misses += 1
+            self._remove(path)
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, source, tree, instructions=None, function_table=None, constants=None):
+        """Save a compiled program; failures to write are not fatal"""
+        path = self._path(self.key(source))
+        blob = MAGIC + marshal.dumps((Arena.from_ast(tree).to_bytes(), instructions, function_table, constants))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp = f"{path}.{os.getpid()}.tmp"
+            with open(temp, "wb") as f:
+                f.write(blob)
+            os.replace(temp, path)
+            self.evict()
+        except OSError:
+            pass
+
+    def entries(self):
+        """(mtime, size, path) of every entry, least recently used first"""
+        out = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return out
+        for name in names:
+            if name.endswith(SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                out.append((st.st_mtime_ns, st.st_size, path))
+        out.sort()
+        return out
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # ---- hit/miss counts ---------------------------------------------------
+
+    def stats(self):
+        """Hit and miss counts over all runs, including this one"""
+        totals = {"hits": 0, "misses": 0}
+        try:
+            with open(os.path.join(self.directory, STATS_FILE)) as f:
+                totals.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        totals["hits"] += self.hits
+        totals["misses"] += self.misses
+        return totals
+
+    def save_stats(self):
+        """Fold this run's counts into the stats file"""
+        totals = self.stats()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, STATS_FILE), "w") as f:
+                json.dump(totals, f)
+        except OSError:
+            return
+        self.hits = self.misses = 0
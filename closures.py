@@ -0,0 +1,815 @@
+# Description: Closure-compiling execution engine
+#
+# `compile_program` walks a checked AST once and turns every node into a
+# Python closure with its children already compiled and bound, so running
+# the program is a chain of direct calls instead of a `match` per visit.
+# It follows the semantics of `evaluator.e`: statements return None, or one
+# of the "break" / "continue" / "return" signals (the returned value is left
+# in `Runtime.result`), and expressions return their value.
+
+from keywords import datatypes
+from parser import *
+from errors import *
+from arrays import TypedArray, Matrix, ARRAYS, TYPED_ARRAYS, check_array, packed, fill_array, new_range, elementwise, ELEMENTWISE, REDUCTIONS, REORDERS, SEARCHES
+from evaluator import (Stack, Queue, Deque, Heap, CONTAINERS, FRESH_ARRAYS, Frame, BoundFunction, frame_at, MAX_RECURSION_DEPTH, BINARY_OPERATORS, LOGICAL_OPERATORS, SHORT_CIRCUIT,
+                       NUMERIC_OPERATORS, DIVISION_OPERATORS, is_array_type,
+                       parse_input, format_value, subscript)
+from yapio import output, reader, read_value
+
+# Nodes that may produce a control-flow signal; anything else used as a
+# statement has its value dropped
+STATEMENTS = (Sequence, Cond, While, For, Break, Continue, Return, Declaration, Assignment,
+              ArrayAssignment, Print, Function, HashMap, StackDeclaration, StackPush,
+              QueueDeclaration, QueuePush, DequeDeclaration, DequePush, HeapDeclaration, HeapPush,
+              SetDeclaration, SetAdd, SetRemove)
+
+
+class Runtime:
+    """Variables of the running program: the globals by name, and the running
+    function's Frame (None at top level) holding its locals by slot.
+    """
+    __slots__ = ("globals", "global_types", "frame", "depth", "result")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.globals = {}
+        self.global_types = {}
+        self.frame = None
+        self.depth = 0
+        self.result = None
+
+
+class CompiledFunction:
+    __slots__ = ("params", "return_type", "body")
+
+    def __init__(self, params, return_type, body):
+        self.params = params
+        self.return_type = return_type
+        self.body = body
+
+
+def _value_check(var_type, var_name):
+    """Check a declared value against its type the way `e` does"""
+    if is_array_type(var_type):
+        return lambda val: check_array(val, var_type, var_name)
+    if var_type == "fn":
+        def check(val):
+            if not isinstance(val, Function):
+                raise TypeError(f"Variable '{var_name}' must be a function")
+        return check
+
+    if var_type not in datatypes:
+        def check(val):
+            datatypes[var_type]  # unknown type: KeyError, as in `e`
+        return check
+    expected = datatypes[var_type]
+
+    def check(val):
+        if not isinstance(val, expected):
+            raise TypeError(f"Variable '{var_name}' must be of type {var_type}")
+    return check
+
+
+class ClosureCompiler:
+    def __init__(self):
+        self.rt = Runtime()
+        self.functions = {}  # id(Function node body) -> CompiledFunction
+        self.depth = 0  # function nesting of the code being compiled
+
+    def compile(self, node):
+        method = getattr(self, "compile_" + type(node).__name__, None)
+        if method is None:
+            return lambda: None
+        return method(node)
+
+    def compile_statement(self, node):
+        run = self.compile(node)
+        if isinstance(node, STATEMENTS):
+            return run
+
+        def statement():
+            run()
+        return statement
+
+    def compile_block(self, node):
+        if isinstance(node, Sequence):
+            return self.compile_Sequence(node)
+        return self.compile_statement(node)
+
+    # Resolved variables: depth 0 is a global looked up by name; anything
+    # deeper is a slot in the running frame or one a fixed number of parent
+    # links up from it
+
+    def _frame(self, depth):
+        """Closure returning the frame that holds variables at `depth`"""
+        rt, hops = self.rt, self.depth - depth
+        if hops == 0:
+            return lambda: rt.frame
+
+        def frame():
+            frame = rt.frame
+            for _ in range(hops):
+                frame = frame.parent
+            return frame
+        return frame
+
+    def _load(self, node, name):
+        """Closure returning the value and type of the variable `node` names"""
+        rt = self.rt
+        if not node.depth:
+            return lambda: (rt.globals.get(name), rt.global_types.get(name))
+        frame, slot = self._frame(node.depth), node.slot
+
+        def load():
+            f = frame()
+            return f.vars[slot], f.types[slot]
+        return load
+
+    def _store(self, node, name):
+        """Closure binding the variable `node` names to a value and type"""
+        rt = self.rt
+        if not node.depth:
+            def store(value, var_type):
+                rt.globals[name] = value
+                rt.global_types[name] = var_type
+            return store
+        frame, slot = self._frame(node.depth), node.slot
+
+        def store(value, var_type):
+            f = frame()
+            f.vars[slot] = value
+            f.types[slot] = var_type
+        return store
+
+    # ---- literals and variables ------------------------------------------
+
+    def compile_Number(self, node):
+        value = float(node.val) if '.' in node.val else int(node.val)
+        return lambda: value
+
+    def compile_String(self, node):
+        value = node.val
+        return lambda: value
+
+    def compile_Boolean(self, node):
+        value = {"nocap": True, "cap": False}.get(node.val)
+        return lambda: value
+
+    def compile_Input(self, node):
+        value_type = node.type
+        if value_type is None:
+            return lambda: parse_input(reader.line())
+        if is_array_type(value_type):
+            return lambda: TypedArray(read_value(value_type))
+        return lambda: read_value(value_type)
+
+    def compile_Variable(self, node):
+        rt, name, slot = self.rt, node.val, node.slot
+
+        if not node.depth:
+            def global_variable():
+                try:
+                    return rt.globals[name]
+                except KeyError:
+                    raise NameError(f"Undefined variable: {name}") from None
+            return global_variable
+
+        if node.depth == self.depth:
+            def local_variable():
+                value = rt.frame.vars[slot]
+                if value is None:
+                    raise NameError(f"Undefined variable: {name}")
+                return value
+            return local_variable
+
+        frame = self._frame(node.depth)
+
+        def outer_variable():
+            value = frame().vars[slot]
+            if value is None:
+                raise NameError(f"Undefined variable: {name}")
+            return value
+        return outer_variable
+
+    def compile_Parenthesis(self, node):
+        return self.compile(node.expr)
+
+    # ---- operators -------------------------------------------------------
+
+    def compile_BinOp(self, node):
+        op = node.op
+        left = self.compile(node.left) if node.left is not None else (lambda: None)
+        right = self.compile(node.right)
+
+        constant = node.right
+        while isinstance(constant, Parenthesis):
+            constant = constant.expr
+        constant = isinstance(constant, (Number, String, Boolean))
+
+        if op in ("==", "!="):
+            fn = BINARY_OPERATORS[op]
+            if constant:
+                b = right()
+                return lambda: fn(left(), b)
+            return lambda: fn(left(), right())
+
+        if op in NUMERIC_OPERATORS:
+            fn = BINARY_OPERATORS.get(op)
+            checks_zero = op in DIVISION_OPERATORS
+            vector = op in ELEMENTWISE  # also applies to two arrays
+
+            # `x + 1`: the right operand's checks are done once, here
+            if constant and right().__class__ in (int, float) and fn is not None \
+                    and not (checks_zero and right() == 0):
+                b = right()
+
+                def binop_constant():
+                    a = left()
+                    if a.__class__ is bool:
+                        raise TypeError(f"Cannot apply '{op}' to Boolean type")
+                    if a.__class__ is str:
+                        raise TypeError(f"Cannot apply '{op}' to String type")
+                    return fn(a, b)
+                return binop_constant
+
+            def binop():
+                a = left()
+                b = right()
+                if a.__class__ is bool or b.__class__ is bool:
+                    raise TypeError(f"Cannot apply '{op}' to Boolean type")
+                if a.__class__ is str or b.__class__ is str:
+                    raise TypeError(f"Cannot apply '{op}' to String type")
+                if vector and isinstance(a, ARRAYS) and isinstance(b, ARRAYS):
+                    return elementwise(op, a, b)
+                if fn is None:  # ~~
+                    return ~b
+                if checks_zero and b == 0:
+                    raise ZeroDivisionError("Division by zero")
+                return fn(a, b)
+            return binop
+
+        if op in LOGICAL_OPERATORS:
+            fn = LOGICAL_OPERATORS[op]
+            short_circuits = op in SHORT_CIRCUIT
+            decides = SHORT_CIRCUIT.get(op)
+
+            def logical():
+                a = left()
+                if short_circuits and a is decides:
+                    return a
+                b = right()
+                if a.__class__ is bool or b.__class__ is bool:
+                    return fn(a, b)
+                return None
+            return logical
+
+        def unknown():
+            left()
+            right()
+            return None
+        return unknown
+
+    def compile_Concat(self, node):
+        left, right = self.compile(node.left), self.compile(node.right)
+
+        def concat():
+            left_val = left()
+            right_val = right()
+            if not isinstance(left_val, str) or not isinstance(right_val, str):
+                raise TypeError("Concat can only be used with String")
+            return left_val + right_val
+        return concat
+
+    # ---- statements ------------------------------------------------------
+
+    def compile_Sequence(self, node):
+        statements = [self.compile_statement(stmt) for stmt in node.statements]
+        if len(statements) == 1:
+            return statements[0]
+
+        def sequence():
+            for statement in statements:
+                signal = statement()
+                if signal is not None:
+                    return signal
+        return sequence
+
+    def compile_Declaration(self, node):
+        name, var_type = node.name, node.type
+        value, store = self.compile(node.value), self._store(node, node.name)
+        check = _value_check(var_type, name)
+        pack = is_array_type(var_type) and isinstance(node.value, FRESH_ARRAYS)
+
+        def declaration():
+            val = value()
+            if val is None:
+                raise ValueError(f"Failed to get valid input for {name}")
+            check(val)
+            if pack:
+                val = packed(val, var_type)
+            store(val, var_type)
+        return declaration
+
+    def compile_Assignment(self, node):
+        name = node.name
+        value, load, store = self.compile(node.value), self._load(node, name), self._store(node, name)
+        checks = {}
+        fresh = isinstance(node.value, FRESH_ARRAYS)
+
+        def assignment():
+            current, var_type = load()
+            if current is None:
+                raise NameError(f"Undefined variable: {name}")
+            val = value()
+            check = checks.get(var_type)
+            if check is None:
+                check = checks[var_type] = _value_check(var_type, name)
+            check(val)
+            if fresh and is_array_type(var_type):
+                val = packed(val, var_type)
+            store(val, var_type)
+        return assignment
+
+    def compile_Print(self, node):
+        values = [self.compile(value) for value in node.values]
+
+        write = output.write
+
+        def print_values():
+            write("".join([format_value(value()) for value in values]) + "\n")
+        return print_values
+
+    def compile_Cond(self, node):
+        branches = [(self.compile(node.If[0]), self.compile_block(node.If[1]))]
+        branches += [(self.compile(cond), self.compile_block(body)) for cond, body in node.Elif or ()]
+        otherwise = self.compile_block(node.Else) if node.Else is not None else None
+
+        if len(branches) == 1:
+            (test, body), = branches
+
+            def cond():
+                if test():
+                    return body()
+                if otherwise is not None:
+                    return otherwise()
+            return cond
+
+        def cond():
+            for test, body in branches:
+                if test():
+                    return body()
+            if otherwise is not None:
+                return otherwise()
+        return cond
+
+    def compile_While(self, node):
+        test, body = self.compile(node.condition), self.compile_block(node.body)
+
+        def while_loop():
+            while test():
+                signal = body()
+                if signal is not None:
+                    if signal == "break":
+                        return None
+                    if signal != "continue":
+                        return signal
+        return while_loop
+
+    def compile_For(self, node):
+        init, test = self.compile_statement(node.init), self.compile(node.condition)
+        increment, body = self.compile_statement(node.increment), self.compile_block(node.body)
+
+        def for_loop():
+            init()
+            while test():
+                signal = body()
+                if signal is not None:
+                    if signal == "break":
+                        return None
+                    if signal != "continue":
+                        return signal
+                increment()
+        return for_loop
+
+    def compile_Break(self, node):
+        return lambda: "break"
+
+    def compile_Continue(self, node):
+        return lambda: "continue"
+
+    # ---- functions -------------------------------------------------------
+
+    def compile_Function(self, node):
+        rt, name = self.rt, node.name
+        params = []
+        for param_type, param_name in node.params:
+            expected = None if param_type == "fn" else param_type
+            params.append((param_type, param_name, expected))
+        self.depth += 1
+        self.functions[id(node.body)] = CompiledFunction(params, node.return_type, self.compile_block(node.body))
+        self.depth -= 1
+        store = self._store(node, name)
+
+        if not node.depth:
+            return lambda: store(node, "fn")
+        fields = [getattr(node, field) for field in Function.__match_args__]
+
+        def define():
+            store(BoundFunction(*fields, scope=rt.frame), "fn")
+        return define
+
+    def compile_Return(self, node):
+        rt = self.rt
+        value = self.compile(node.value)
+
+        def return_value():
+            if not rt.depth:
+                raise RuntimeError("Return statement executed outside of function scope")
+            rt.result = value()
+            return "return"
+        return return_value
+
+    def compile_FunctionCall(self, node):
+        rt, functions, name = self.rt, self.functions, node.name
+        args = [self.compile(arg) for arg in node.params]
+        load = self._load(node, name)
+
+        def call():
+            func = load()[0]
+            if not isinstance(func, Function):
+                raise NameError(f"Undefined function: {name}")
+            if len(args) != len(func.params):
+                raise TypeError(f"Function '{name}' expects {len(func.params)} arguments but got {len(args)}")
+            compiled = functions[id(func.body)]
+
+            parent = func.scope if func.__class__ is BoundFunction else None
+            frame = Frame(func.frame_size, func.depth + 1, parent)
+            local_env, local_types = frame.vars, frame.types
+            for slot, ((param_type, param_name, expected), arg) in enumerate(zip(compiled.params, args)):
+                arg_value = arg()
+                if expected is None:
+                    if not isinstance(arg_value, Function):
+                        raise TypeError(f"Argument '{param_name}' must be a function")
+                elif not isinstance(arg_value, datatypes[expected]):
+                    raise TypeError(f"Argument '{param_name}' must be of type {param_type}")
+                local_env[slot] = arg_value
+                local_types[slot] = param_type
+            for slot, depth, outer, outer_name in func.copies:
+                if depth:
+                    source = frame_at(depth, parent)
+                    local_env[slot], local_types[slot] = source.vars[outer], source.types[outer]
+                elif outer_name in rt.globals:
+                    local_env[slot], local_types[slot] = rt.globals[outer_name], rt.global_types.get(outer_name)
+
+            if rt.depth >= MAX_RECURSION_DEPTH:
+                raise RecursionLimitError(name)
+            saved_frame, rt.frame = rt.frame, frame
+            rt.depth += 1
+            signal = compiled.body()
+            rt.depth -= 1
+            rt.frame = saved_frame
+            result = rt.result if signal == "return" else None
+            rt.result = None
+
+            return_type = compiled.return_type
+            if return_type != "void":
+                if return_type == "fn":
+                    if not isinstance(result, Function):
+                        raise TypeError(f"Function '{name}' must return a function, but got {type(result).__name__}")
+                elif not isinstance(result, datatypes[return_type]):
+                    raise TypeError(f"Function '{name}' must return a value of type {return_type}, but got {type(result).__name__}")
+            return result
+        return call
+
+    # ---- arrays and hashmaps ---------------------------------------------
+
+    def compile_Array(self, node):
+        elements = [self.compile(element) for element in node.elements]
+        return lambda: TypedArray([element() for element in elements])
+
+    def compile_ArrayAccess(self, node):
+        index = self.compile(node.index)
+
+        if type(node.array) is ArrayAccess:
+            # m[i][j]: a matrix looks it up with one flat index
+            outer, row_index = self.compile(node.array.array), self.compile(node.array.index)
+
+            def element_access():
+                outer_val = outer()
+                i = row_index()
+                if type(outer_val) is Matrix:
+                    return outer_val.get(i, index())
+                return subscript(subscript(outer_val, i), index())
+            return element_access
+
+        array = self.compile(node.array)
+        return lambda: subscript(array(), index())
+
+    def compile_NewMatrix(self, node):
+        rows, cols, fill = self.compile(node.rows), self.compile(node.cols), self.compile(node.fill)
+        return lambda: Matrix(rows(), cols(), fill())
+
+    def compile_ArrayAssignment(self, node):
+        value = self.compile(node.value)
+
+        # multi-index form  arr[0][1] = rhs  (index is None)
+        if node.index is None and isinstance(node.array, ArrayAccess):
+            indices = []
+            target = node.array
+            while isinstance(target, ArrayAccess):
+                indices.insert(0, self.compile(target.index))
+                target = target.array
+            if not isinstance(target, Variable):
+                def invalid():
+                    raise RuntimeError("Invalid assignment target")
+                return invalid
+            base, parents, last = self.compile(target), indices[:-1], indices[-1]
+
+            def nested_assignment():
+                col = base()
+                if not isinstance(col, (*ARRAYS, dict)):
+                    raise TypeError("Left side must be array or hashmap")
+                if type(col) is Matrix and len(parents) == 1:
+                    i = parents[0]()
+                    j = last()
+                    col.set(i, j, value())
+                    return
+                for index in parents:
+                    col = col[index()]
+                    if not isinstance(col, (*ARRAYS, dict)):
+                        raise TypeError("Intermediate element is not a collection")
+                last_idx = last()
+                val = value()
+                if isinstance(col, TYPED_ARRAYS):
+                    col.check(val)
+                col[last_idx] = val
+            return nested_assignment
+
+        # single-level form  arr[i] = rhs  or  map[key] = rhs
+        array, index = self.compile(node.array), self.compile(node.index)
+
+        def array_assignment():
+            col = array()
+            key = index()
+            val = value()
+            if isinstance(col, ARRAYS):
+                if not isinstance(key, int):
+                    raise TypeError("Array index must be an integer")
+                if key < 0 or key >= len(col):
+                    raise IndexError(f"Index {key} out of bounds")
+                if isinstance(col, TYPED_ARRAYS):
+                    col.check(val)
+            elif not isinstance(col, dict):
+                raise TypeError("Assignment target is neither array nor hashmap")
+            col[key] = val
+        return array_assignment
+
+    def compile_ArrayAppend(self, node):
+        array, value = self.compile(node.array), self.compile(node.value)
+
+        def array_append():
+            arr = array()
+            if not isinstance(arr, ARRAYS):
+                raise TypeError("append() can only be used on arrays")
+            val = value()
+            if isinstance(arr, TYPED_ARRAYS):
+                arr.check(val)
+            arr.append(val)
+            return arr
+        return array_append
+
+    def compile_ArrayDelete(self, node):
+        array, index = self.compile(node.array), self.compile(node.index)
+
+        def array_delete():
+            col = array()
+            if isinstance(col, ARRAYS):
+                idx = index()
+                if not isinstance(idx, int):
+                    raise TypeError("Array index must be an integer")
+                if idx < 0 or idx >= len(col):
+                    raise IndexError(f"Index {idx} out of bounds")
+                del col[idx]
+                return col
+            if isinstance(col, dict):
+                key = index()
+                if key not in col:
+                    raise KeyError(f"Key {key} not found in hashmap")
+                del col[key]
+                return col
+            raise TypeError("delete() can only be used on arrays or hashmaps")
+        return array_delete
+
+    def compile_ArrayLength(self, node):
+        array = self.compile(node.array)
+
+        def array_length():
+            col = array()
+            if isinstance(col, (*ARRAYS, dict, set, str)):
+                return len(col)
+            if isinstance(col, CONTAINERS):
+                return len(col.items)
+            raise TypeError("len() can only be used on arrays or hashmaps")
+        return array_length
+
+    def compile_ArrayReduce(self, node):
+        array, reduce = self.compile(node.array), REDUCTIONS[node.op]
+        return lambda: reduce(array())
+
+    def compile_ArrayFill(self, node):
+        array, value = self.compile(node.array), self.compile(node.value)
+        return lambda: fill_array(array(), value())
+
+    def compile_NewRange(self, node):
+        count = self.compile(node.count)
+        return lambda: new_range(count())
+
+    def compile_ArrayReorder(self, node):
+        array, reorder = self.compile(node.array), REORDERS[node.op]
+        return lambda: reorder(array())
+
+    def compile_ArraySearch(self, node):
+        array, value, search = self.compile(node.array), self.compile(node.value), SEARCHES[node.op]
+        return lambda: search(array(), value())
+
+    def compile_HashMap(self, node):
+        store = self._store(node, node.name)
+        hashmap_type = f"hashmap<{node.index_type}, {node.value_type}>"
+        return lambda: store({}, hashmap_type)
+
+    def compile_MapGet(self, node):
+        hashmap, key, default = self.compile(node.map), self.compile(node.key), self.compile(node.default)
+
+        def map_get():
+            col = hashmap()
+            if not isinstance(col, dict):
+                raise TypeError("get() can only be used on hashmaps")
+            k = key()
+            if k in col:
+                return col[k]
+            return default()
+        return map_get
+
+    def compile_MapView(self, node):
+        hashmap, op = self.compile(node.map), node.op
+
+        def map_view():
+            col = hashmap()
+            if not isinstance(col, dict):
+                raise TypeError(f"{op}() can only be used on hashmaps")
+            return TypedArray(col.keys() if op == "keys" else col.values())
+        return map_view
+
+    def compile_Contains(self, node):
+        collection, value = self.compile(node.collection), self.compile(node.value)
+
+        def contains():
+            col = collection()
+            if not isinstance(col, (set, dict, *ARRAYS)):
+                raise TypeError("contains() can only be used on sets, hashmaps or arrays")
+            return value() in col
+        return contains
+
+    # ---- stacks, queues, deques, heaps and sets --------------------------------
+
+    def _container(self, node, name, cls, kind):
+        """Closure fetching the container `name` (a stack, queue, deque, heap
+        or set) with its type, checking that it holds a `cls`"""
+        load = self._load(node, name)
+
+        def container():
+            value, container_type = load()
+            if value is None:
+                raise NameError(f"Undefined {kind}: {name}")
+            if not isinstance(value, cls):
+                raise TypeError(f"{name} is not a {kind}")
+            return value, container_type
+        return container
+
+    def _declare_container(self, node, cls, kind, element_type):
+        store = self._store(node, node.name)
+        container_type = f"{kind}<{element_type}>"
+        return lambda: store(cls(), container_type)
+
+    def _push(self, node, name, value, cls, kind, add):
+        """`add` is the container method that stores the value, e.g. Stack.push"""
+        container, value = self._container(node, name, cls, kind), self.compile(value)
+
+        def push_value():
+            items, container_type = container()
+            val = value()
+            element_type = container_type.split('<')[1][:-1]
+            if not isinstance(val, datatypes[element_type]):
+                raise TypeError(f"Cannot push {type(val).__name__} to {kind} of {element_type}")
+            add(items, val)
+        return push_value
+
+    def compile_StackDeclaration(self, node):
+        return self._declare_container(node, Stack, "stack", node.element_type)
+
+    def compile_StackPush(self, node):
+        return self._push(node, node.stack_name, node.value, Stack, "stack", Stack.push)
+
+    def compile_StackPop(self, node):
+        container = self._container(node, node.stack_name, Stack, "stack")
+
+        def stack_pop():
+            container()[0].pop()
+        return stack_pop
+
+    def compile_StackTop(self, node):
+        container = self._container(node, node.stack_name, Stack, "stack")
+        return lambda: container()[0].top()
+
+    def compile_QueueDeclaration(self, node):
+        return self._declare_container(node, Queue, "queue", node.element_type)
+
+    def compile_QueuePush(self, node):
+        return self._push(node, node.queue_name, node.value, Queue, "queue", Queue.push)
+
+    def compile_QueuePop(self, node):
+        container = self._container(node, node.queue_name, Queue, "queue")
+        return lambda: container()[0].pop()
+
+    def compile_QueueFirst(self, node):
+        container = self._container(node, node.queue_name, Queue, "queue")
+        return lambda: container()[0].first()
+
+    def compile_DequeDeclaration(self, node):
+        return self._declare_container(node, Deque, "deque", node.element_type)
+
+    def compile_DequePush(self, node):
+        add = Deque.push_front if node.end == "front" else Deque.push_back
+        return self._push(node, node.deque_name, node.value, Deque, "deque", add)
+
+    def compile_DequePop(self, node):
+        container = self._container(node, node.deque_name, Deque, "deque")
+        pop = Deque.pop_front if node.end == "front" else Deque.pop_back
+        return lambda: pop(container()[0])
+
+    def compile_DequePeek(self, node):
+        container = self._container(node, node.deque_name, Deque, "deque")
+        peek = Deque.front if node.end == "front" else Deque.back
+        return lambda: peek(container()[0])
+
+    def compile_HeapDeclaration(self, node):
+        store = self._store(node, node.name)
+        heap_type, largest_first = f"heap<{node.element_type}>", node.order == "max"
+        return lambda: store(Heap(largest_first), heap_type)
+
+    def compile_HeapPush(self, node):
+        return self._push(node, node.heap_name, node.value, Heap, "heap", Heap.push)
+
+    def compile_HeapPop(self, node):
+        container = self._container(node, node.heap_name, Heap, "heap")
+        return lambda: container()[0].pop()
+
+    def compile_HeapTop(self, node):
+        container = self._container(node, node.heap_name, Heap, "heap")
+        return lambda: container()[0].top()
+
+
+    def compile_SetDeclaration(self, node):
+        return self._declare_container(node, set, "set", node.element_type)
+
+    def compile_SetAdd(self, node):
+        container, value = self._container(node, node.set_name, set, "set"), self.compile(node.value)
+
+        def set_add():
+            items, set_type = container()
+            val = value()
+            element_type = set_type.split('<')[1][:-1]
+            if not isinstance(val, datatypes[element_type]):
+                raise TypeError(f"Cannot add {type(val).__name__} to set of {element_type}")
+            items.add(val)
+        return set_add
+
+    def compile_SetRemove(self, node):
+        container, value = self._container(node, node.set_name, set, "set"), self.compile(node.value)
+
+        def set_remove():
+            items = container()[0]
+            val = value()
+            if val not in items:
+                raise KeyError(f"Element {val} not found in set")
+            items.remove(val)
+        return set_remove
+
+def compile_program(tree):
+    """Compile a checked AST into a function that runs it"""
+    compiler = ClosureCompiler()
+    rt, body = compiler.rt, compiler.compile_block(tree)
+
+    def program():
+        rt.reset()
+        try:
+            body()
+        finally:
+            output.flush()
+    return program
+
+
+def run(tree):
+    compile_program(tree)()
@@ -1,19 +1,66 @@
 import sys
 import os
+import argparse
 from lexer import lex
 from parser import parse, ParseError
 from evaluator import e
+import closures
 from typechecker import TypeChecker
+from bytecode import AssemblyGenerator
+from errors import CodegenError
+from stack_vm import StackVM
+import yapb
+from cache import CompileCache, DEFAULT_DIR, DEFAULT_MAX_BYTES
+from yapio import output, DEFAULT_LIMIT
+
+
+def compile_ast(ast):
+    """Rest of the front end: type-check and generate bytecode"""
+    checker = TypeChecker()
+    checker.visit(ast)
+    try:
+        instructions, function_table, constants = AssemblyGenerator().generate(ast)
+    except CodegenError:
+        # the bytecode generator does not cover the whole language yet; the
+        # program still runs on the other engines
+        instructions = function_table = constants = None
+    return ast, instructions, function_table, constants
 
-if len(sys.argv) != 2:
-    print("Usage: python compiler.py <filename.yap>")
-    sys.exit(1)
 
-filename = sys.argv[1]
+cli = argparse.ArgumentParser(usage="python compiler.py [options] <filename.yap | filename.yapb>")
+cli.add_argument("filename")
+cli.add_argument("--engine", choices=["tree", "closure"], default="tree",
+                 help="tree: walk the AST with evaluator.e; closure: compile it to closures first")
+cli.add_argument("--no-cache", action="store_true", help="always run the front end")
+cli.add_argument("--cache-dir", default=DEFAULT_DIR, help=f"compile cache directory (default {DEFAULT_DIR})")
+cli.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES, help="compile cache size limit in bytes")
+cli.add_argument("--cache-stats", action="store_true", help="report compile cache hits and misses on stderr")
+cli.add_argument("--output", metavar="FILE", help="write the program's yap() output to FILE instead of stdout")
+cli.add_argument("--output-buffer", type=int, default=DEFAULT_LIMIT,
+                 help=f"characters of output to collect before writing them out (default {DEFAULT_LIMIT})")
+cli.add_argument("--emit-bytecode", metavar="FILE",
+                 help="also write the program's bytecode to FILE (.yapb), which compiler.py can run on the VM")
+args = cli.parse_args()
+
+filename = args.filename
+
+# Compiled bytecode skips the front end and runs on the stack VM
+if filename.endswith(yapb.SUFFIX):
+    try:
+        vm = StackVM.load(filename)
+        output.redirect(args.output, args.output_buffer)
+        vm.run()
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error : {e}")
+        sys.exit(1)
+    sys.exit(0)
 
 # Check file extension
 if not filename.endswith('.yap'):
-    print("Error: Input file must have a .yap extension")
+    print("Error: Input file must have a .yap or .yapb extension")
     sys.exit(1)
 
 try:
@@ -26,16 +73,38 @@ except IOError as e:
     print(f"Error reading file: {e}")
     sys.exit(1)
 
+cache = None if args.no_cache else CompileCache(args.cache_dir, args.cache_size)
+
 # print(list(lex(code)))
 # ast = parse(code)
 # checker = TypeChecker()
 # checker.visit(ast)
 try:
-    ast = parse(code)
-    print(ast)
-    checker = TypeChecker()
-    checker.visit(ast)
-    result = e(ast)
+    compiled = cache.load(code) if cache else None
+    if compiled is None:
+        ast = parse(code)
+        print(ast)
+        compiled = compile_ast(ast)
+        if cache:
+            cache.store(code, *compiled)
+    else:
+        print(compiled[0])
+    ast, instructions, function_table, constants = compiled
+    if args.emit_bytecode:
+        if instructions is None:
+            AssemblyGenerator().generate(ast)  # raises the CodegenError saying why
+        yapb.write(args.emit_bytecode, instructions, function_table, constants)
+    output.redirect(args.output, args.output_buffer)
+    if args.engine == "closure":
+        result = closures.run(ast)
+    else:
+        result = e(ast)
 except Exception as e:
     print(f"Error : {e}")
     sys.exit(1)
+finally:
+    if cache:
+        cache.save_stats()
+        if args.cache_stats:
+            stats = cache.stats()
+            print(f"cache: {stats['hits']} hits, {stats['misses']} misses", file=sys.stderr)
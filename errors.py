@@ -62,6 +62,11 @@ class IOError(Exception):
         line_info = f" on line {token.line}" if token and hasattr(token, 'line') else ""
         super().__init__(f"I/O error during '{operation}': {msg}{line_info}")
 
+class CodegenError(Exception):
+    def __init__(self, msg, token=None):
+        line_info = f" on line {token.line}" if token and hasattr(token, 'line') else ""
+        super().__init__(f"Codegen error: {msg}{line_info}")
+
 class SyntaxWarning(Warning):
     def __init__(self, msg, line=None):
         self.msg = msg
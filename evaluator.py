@@ -2,6 +2,11 @@ from keywords import *
 from lexer import *
 from parser import *
 from errors import *
+import operator
+from collections import deque
+import heapq
+from yapio import output, reader, read_value
+from arrays import TypedArray, Matrix, ARRAYS, TYPED_ARRAYS, check_array, packed, fill_array, new_range, elementwise, ELEMENTWISE, REDUCTIONS, REORDERS, SEARCHES
 
 def is_array_type(type_str: str) -> bool:
     return type_str.endswith('[]')
@@ -9,6 +14,68 @@ def is_array_type(type_str: str) -> bool:
 def get_base_type(type_str: str) -> str:
     return type_str[:-2] if is_array_type(type_str) else type_str
 
+# Operators that are rejected on booleans and strings
+NUMERIC_OPERATORS = {"%", "+", "-", "*", "/", "^", "<", ">", "<=", ">=", "&", "|", "~~", "//"}
+DIVISION_OPERATORS = {"/", "%", "//"}
+
+BINARY_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "%": operator.mod,
+    "//": operator.floordiv,
+    "^": operator.pow,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "&": operator.and_,
+    "|": operator.or_,
+}
+
+# Only applied when one of the operands is a boolean
+LOGICAL_OPERATORS = {
+    "and": lambda left, right: left and right,
+    "or": lambda left, right: left or right,
+    "not": lambda left, right: not right,
+}
+
+# The boolean left operand that decides `and`/`or` without the right one
+SHORT_CIRCUIT = {"and": False, "or": True}
+
+def parse_input(word):
+    """Convert a line read by spill() to the value it spells"""
+    if word == "nocap":
+        return True
+    elif word == "cap":
+        return False
+    elif word.count('.') == 1 and word.replace('.', '').isdigit():
+            return float(word)
+    elif word.isdigit():
+        return int(word)
+    else:
+        return word
+
+def subscript(array_val, index_val):
+    """array_val[index_val] for an array, string or hashmap"""
+    if not isinstance(array_val, (*ARRAYS, str, dict)):
+        raise TypeError(f"Indexing cannot be used with type {type(array_val).__name__}")
+    if isinstance(array_val,dict):
+        if index_val not in array_val:
+            return "None"
+    return array_val[index_val]
+
+def format_value(value):
+    """Text yap() prints for a value"""
+    if isinstance(value, bool):
+        return "nocap" if value else "cap"
+    elif isinstance(value, int) and value < 0:
+        return "~" + str(-value)
+    return str(value)
+
 class Stack:
     def __init__(self):
         self.items = []
@@ -28,7 +95,7 @@ class Stack:
     
 class Queue:
     def __init__(self):
-        self.items = []
+        self.items = deque()
     
     def push(self, item):
         self.items.append(item)
@@ -36,62 +103,181 @@ class Queue:
     def pop(self):
         if not self.items:
             raise RuntimeError("Queue underflow")
-        return self.items.pop(0)  # Remove and return first element
+        return self.items.popleft()  # Remove and return first element
     
     def first(self):
         if not self.items:
             raise RuntimeError("Queue is empty")
         return self.items[0]  # Return first element without removing it
 
+class Deque:
+    def __init__(self):
+        self.items = deque()
+
+    def push_front(self, item):
+        self.items.appendleft(item)
+
+    def push_back(self, item):
+        self.items.append(item)
+
+    def pop_front(self):
+        if not self.items:
+            raise RuntimeError("Deque underflow")
+        return self.items.popleft()
+
+    def pop_back(self):
+        if not self.items:
+            raise RuntimeError("Deque underflow")
+        return self.items.pop()
+
+    def front(self):
+        if not self.items:
+            raise RuntimeError("Deque is empty")
+        return self.items[0]
+
+    def back(self):
+        if not self.items:
+            raise RuntimeError("Deque is empty")
+        return self.items[-1]
+
+class Largest:
+    """Heap entry that orders its item in reverse, for max-heaps"""
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        self.item = item
+
+    def __lt__(self, other):
+        return other.item < self.item
+
+class Heap:
+    """Binary heap on `heapq`; pops the smallest item first, or the largest
+    with `largest_first`
+    """
+    def __init__(self, largest_first=False):
+        self.items = []
+        self.largest_first = largest_first
+
+    def push(self, item):
+        heapq.heappush(self.items, Largest(item) if self.largest_first else item)
+
+    def pop(self):
+        if not self.items:
+            raise RuntimeError("Heap underflow")
+        item = heapq.heappop(self.items)
+        return item.item if self.largest_first else item
+
+    def top(self):
+        if not self.items:
+            raise RuntimeError("Heap is empty")
+        item = self.items[0]
+        return item.item if self.largest_first else item
+
+# Collections whose len() is the number of items they hold
+CONTAINERS = (Stack, Queue, Deque, Heap)
+
 MAX_RECURSION_DEPTH = 1000
+
+# Expressions that build a new array, which nothing else refers to yet: a
+# variable declared or assigned from one can take it in packed storage
+FRESH_ARRAYS = (Array, Input)
+
+class Frame:
+    """Variables of one function call, in the slots resolver.py assigned.
+    `parent` is the frame of the function the callee was defined in, or None
+    for functions defined at top level, whose outer scope is the global `env`.
+    """
+    __slots__ = ("vars", "types", "depth", "parent", "result")
+
+    def __init__(self, size, depth=1, parent=None):
+        self.vars = [None] * size
+        self.types = [None] * size
+        self.depth = depth
+        self.parent = parent
+        self.result = None
+
+@dataclass(slots=True, eq=False, repr=False)
+class BoundFunction(Function):
+    """A function defined inside another function's body, together with the
+    frame it can see
+    """
+    scope: Frame = None
+
+def frame_at(depth, frame):
+    """`frame`, or the enclosing function's frame at `depth`"""
+    while frame.depth != depth:
+        frame = frame.parent
+    return frame
+
+def lookup(node, name, env, types, call_stack):
+    """Value and type of the variable a resolved node names, (None, None) if unset"""
+    if node.depth:
+        frame = frame_at(node.depth, call_stack[-1])
+        return frame.vars[node.slot], frame.types[node.slot]
+    return env.get(name), types.get(name)
+
+def store(node, name, value, var_type, env, types, call_stack):
+    if node.depth:
+        frame = frame_at(node.depth, call_stack[-1])
+        frame.vars[node.slot] = value
+        frame.types[node.slot] = var_type
+    else:
+        env[name] = value
+        types[name] = var_type
+
 def e(tree: AST, env={}, types={}, call_stack=[]):
+    """Run `tree`, then flush whatever it printed"""
+    try:
+        return evaluate(tree, env, types, call_stack)
+    finally:
+        output.flush()
+
+def evaluate(tree: AST, env, types, call_stack):
+    # `env`/`types` hold the globals by name; the running function's variables
+    # are in the slots of the Frame on top of `call_stack`
     match tree:
-        case Input():
-            word = input()
-            if word == "nocap":
-                return True
-            elif word == "cap":
-                return False
-            elif word.count('.') == 1 and word.replace('.', '').isdigit():
-                    return float(word)
-            elif word.isdigit():
-                return int(word)
-            else:
-                return word           
+        case Input(value_type):
+            if value_type is None:
+                return parse_input(reader.line())
+            val = read_value(value_type)
+            return TypedArray(val) if isinstance(val, ARRAYS) else val
             
         case Variable(v):
-            if call_stack:    
-                local_env, _ = call_stack[-1]
-                if v in local_env:
-                    return local_env[v]
-            
-
-            if v in env:  # Fallback to global scope
-                return env[v]
-            raise NameError(f"Undefined variable: {v}")
+            if tree.depth:
+                frame = call_stack[-1]
+                while frame.depth != tree.depth:
+                    frame = frame.parent
+                value = frame.vars[tree.slot]
+            else:
+                value = env.get(v)
+            if value is None:
+                raise NameError(f"Undefined variable: {v}")
+            return value
 
 
         case Function(name, params, return_type, body):  
-            env[name] = tree  
+            if tree.depth:
+                tree = BoundFunction(*[getattr(tree, field) for field in Function.__match_args__],
+                                     scope=call_stack[-1])
+            store(tree, name, tree, "fn", env, types, call_stack)
             return None  
 
         case FunctionCall(name, args):
-            if name not in env or not isinstance(env[name], Function):
+            func, _ = lookup(tree, name, env, types, call_stack)
+            if not isinstance(func, Function):
                 raise NameError(f"Undefined function: {name}")
 
-            func = env[name]
-            if not isinstance(func, Function):
-                raise TypeError(f"'{name}' is not a function")
             if len(args) != len(func.params):
                 raise TypeError(f"Function '{name}' expects {len(func.params)} arguments but got {len(args)}")
                     
-            # This means that all var in env are global and accessible by function to read only
-            local_env = env.copy()
-            local_types = types.copy()
+            # The callee gets a fresh frame sized by the resolver; everything
+            # else it reads through the frame's parent link or the globals
+            parent = func.scope if isinstance(func, BoundFunction) else None
+            frame = Frame(func.frame_size, func.depth + 1, parent)
 
             # Bind function arguments
-            for (param_type, param_name), arg in zip(func.params, args):
-                arg_value = e(arg, local_env, local_types)
+            for slot, ((param_type, param_name), arg) in enumerate(zip(func.params, args)):
+                arg_value = evaluate(arg, env, types, call_stack)
                 
                 if param_type == "fn":
                     if not isinstance(arg_value, Function):
@@ -100,14 +286,22 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
                     if not isinstance(arg_value, datatypes[param_type]):
                         raise TypeError(f"Argument '{param_name}' must be of type {param_type}")
 
-                local_env[param_name] = arg_value
-                local_types[param_name] = param_type 
+                frame.vars[slot] = arg_value
+                frame.types[slot] = param_type 
+
+            # Locals shadowing an outer variable start out as its copy
+            for slot, depth, outer, outer_name in func.copies:
+                if depth:
+                    source = frame_at(depth, parent)
+                    frame.vars[slot], frame.types[slot] = source.vars[outer], source.types[outer]
+                elif outer_name in env:
+                    frame.vars[slot], frame.types[slot] = env[outer_name], types.get(outer_name)
             
-            call_stack.append((local_env,local_types))   
+            call_stack.append(frame)
             if(len(call_stack)>MAX_RECURSION_DEPTH):
                 raise RecursionLimitError(name)
-            result = e(func.body, local_env, local_types,call_stack)
-            result=e(result)
+            evaluate(func.body, env, types, call_stack)
+            result = frame.result
             if func.return_type != "void":
                 if func.return_type == "fn":
                     if not isinstance(result, Function):
@@ -123,11 +317,10 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
         case Return(expr):
             if not call_stack:
                 raise RuntimeError("Return statement executed outside of function scope")
-            local_env,local_types = call_stack[-1]
-           
-            res = e(expr, local_env, local_types,call_stack)
-            
-            return res
+            # the value is left in the frame; the node itself tells the
+            # enclosing statements to stop
+            call_stack[-1].result = evaluate(expr, env, types, call_stack)
+            return tree
 
         case Boolean(v):
             if v == "nocap":
@@ -135,104 +328,62 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
             elif v == "cap":
                 return False
         case Parenthesis(expr):
-            return e(expr)
+            return evaluate(expr, env, types, call_stack)
         case Number(v):
             if '.' in v:
                 return float(v)
             else:
                 return int(v)
         case BinOp(op, l, r):
-            if isinstance(e(l), bool) or isinstance(e(r), bool):
-                if op in {"%","+", "-", "*", "/", "^","<",">","<=",">=","&","|","~~","//"}:
+            # evaluate each operand once; `not` and `~~` have no left operand
+            left = evaluate(l, env, types, call_stack) if l is not None else None
+            if op in SHORT_CIRCUIT and left is SHORT_CIRCUIT[op]:
+                return left
+            right = evaluate(r, env, types, call_stack)
+            if isinstance(left, bool) or isinstance(right, bool):
+                if op in NUMERIC_OPERATORS:
                     raise TypeError(f"Cannot apply '{op}' to Boolean type")
-                match op:
-                    case "and":
-                        return e(l) and e(r)
-                    case "or":
-                        return e(l) or e(r)
-                    case "not":
-                        return not e(r)
-            if isinstance(e(l), str) or isinstance(e(r), str):
-                if op in {"%","+", "-", "*", "/", "^","<",">","<=",">=","&","|","~~","//"}:
-                    raise TypeError(f"Cannot apply '{op}' to String type")  
-            match op:
-                case "+":
-                    return e(l) + e(r)
-                case "-":
-                    return e(l) - e(r)
-                case "*":
-                    return e(l) * e(r)
-                case "/":
-                    if e(r) == 0:
-                        raise ZeroDivisionError("Division by zero")
-                    return e(l) / e(r)
-                case  "%":
-                    if e(r) == 0:
-                        raise ZeroDivisionError("Division by zero")
-                    return e(l) % e(r)
-                case "^":
-                    return e(l) ** e(r)
-                case "<":
-                    return e(l) < e(r)
-                case ">":
-                    return e(l) > e(r)
-                case "<=":
-                    return e(l) <= e(r)
-                case ">=":
-                    return e(l) >= e(r)
-                case "==":
-                    return e(l) == e(r)
-                case "!=":
-                    return e(l) != e(r)
-                case "&":  # Bitwise AND
-                    return e(l) & e(r)
-                case "|":  # Bitwise OR
-                    return e(l) | e(r)
-                case "~~":  # Bitwise NOT (unary)
-                    return ~e(r)  # Only use `left`, `right` is None
-                case "//":  # Floor division
-                    if e(r) == 0:
-                        raise ZeroDivisionError("Division by zero")
-                    return e(l) // e(r)
+                if op in LOGICAL_OPERATORS:
+                    return LOGICAL_OPERATORS[op](left, right)
+            if isinstance(left, str) or isinstance(right, str):
+                if op in NUMERIC_OPERATORS:
+                    raise TypeError(f"Cannot apply '{op}' to String type")
+            if op in ELEMENTWISE and isinstance(left, ARRAYS) and isinstance(right, ARRAYS):
+                return elementwise(op, left, right)
+            if op in BINARY_OPERATORS:
+                if op in DIVISION_OPERATORS and right == 0:
+                    raise ZeroDivisionError("Division by zero")
+                return BINARY_OPERATORS[op](left, right)
+            if op == "~~":  # Bitwise NOT (unary)
+                return ~right
+            return None
         case Cond(If, Elif, Else):
-            if e(If[0]):
+            if evaluate(If[0], env, types, call_stack):
                 
-                return e(If[1])  # Execute the 'If' body
+                return evaluate(If[1], env, types, call_stack)  # Execute the 'If' body
 
             # If there are any 'elif' conditions, check each one
             if Elif:  # Check if Elif is not empty
                 for elif_condition, elif_body in Elif:
-                    if e(elif_condition):  # Evaluating 'elif' condition
-                        return e(elif_body)  # Execute the corresponding 'elif' body
+                    if evaluate(elif_condition, env, types, call_stack):  # Evaluating 'elif' condition
+                        return evaluate(elif_body, env, types, call_stack)  # Execute the corresponding 'elif' body
 
             # If no condition matched, check 'Else' (if exists)
             if Else is not None:
-                return e(Else)  # Execute the 'Else' body
+                return evaluate(Else, env, types, call_stack)  # Execute the 'Else' body
 
             # Default return value if no conditions matched
             return None
         
         case Declaration(var_type, var_name, value):
-            local_env = env
-            local_types = types
-            if call_stack:
-                local_env, local_types = call_stack[-1]
-
-            val = e(value, local_env, local_types)
+            val = evaluate(value, env, types, call_stack)
             if val is None:
                 raise ValueError(f"Failed to get valid input for {var_name}")
 
             if is_array_type(var_type):
-                if not isinstance(val, list):
-                    raise TypeError(f"Variable '{var_name}' must be of type {var_type}")
-                base_type_str = get_base_type(var_type)
-                if base_type_str == "fn":
-                    if not all(isinstance(x, Function) for x in val):
-                        raise TypeError(f"All elements in array '{var_name}' must be functions")
-                else:
-                    base_type = datatypes[base_type_str]
-                    if not all(isinstance(x, base_type) for x in val):
-                        raise TypeError(f"All elements in array '{var_name}' must be of type {base_type_str}")
+                check_array(val, var_type, var_name)
+                if isinstance(value, FRESH_ARRAYS):
+                    val = packed(val, var_type)
 
             elif var_type == "fn":
                 if not isinstance(val, Function):
@@ -241,28 +392,20 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
                 if not isinstance(val, datatypes[var_type]):
                     raise TypeError(f"Variable '{var_name}' must be of type {var_type}")
 
-            local_env[var_name] = val
-            local_types[var_name] = var_type  # Keep string type info
+            store(tree, var_name, val, var_type, env, types, call_stack)  # Keep string type info
             return
 
         case Assignment(var_name, value):
-            local_env = env
-            local_types = types
-            if call_stack:
-                local_env, local_types = call_stack[-1]
-
-            if var_name not in local_env:
+            current, var_type = lookup(tree, var_name, env, types, call_stack)
+            if current is None:
                 raise NameError(f"Undefined variable: {var_name}")
 
-            val = e(value, local_env, local_types)
-            var_type = local_types[var_name]
+            val = evaluate(value, env, types, call_stack)
 
             if is_array_type(var_type):
-                if not isinstance(val, list):
-                    raise TypeError(f"Variable '{var_name}' must be of type {var_type}")
-                base_type = datatypes[get_base_type(var_type)]
-                if not all(isinstance(x, base_type) for x in val):
-                    raise TypeError(f"All elements in array '{var_name}' must be of type {get_base_type(var_type)}")
+                check_array(val, var_type, var_name)
+                if isinstance(value, FRESH_ARRAYS):
+                    val = packed(val, var_type)
             elif var_type == "fn":
                 if not isinstance(val, Function):
                     raise TypeError(f"Variable '{var_name}' must be a function")
@@ -270,15 +413,16 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
                 if not isinstance(val, datatypes[var_type]):
                     raise TypeError(f"Variable '{var_name}' must be of type {var_type}")
 
-            local_env[var_name] = val
+            # inside a function the resolver gives outer variables a local copy
+            store(tree, var_name, val, var_type, env, types, call_stack)
             return
 
         
         case While(condition, body):
-            while e(condition, env, types):
+            while evaluate(condition, env, types, call_stack):
                 if isinstance(body, Sequence):
                     for stmt in body.statements:
-                        result = e(stmt, env, types)
+                        result = evaluate(stmt, env, types, call_stack)
                         if result == "break":
                             return None 
                         elif result == "continue":
@@ -289,7 +433,7 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
                             # If return is encountered, stop execution
                             return stmt 
                 else:
-                    result = e(body, env, types)
+                    result = evaluate(body, env, types, call_stack)
                     if result == "break":
                         return None  
                     if result == "continue":
@@ -305,11 +449,11 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
         
         case For(init, condition, increment, body):
             xy = None
-            e(init, env, types)  
-            while e(condition, env, types): 
+            evaluate(init, env, types, call_stack)  
+            while evaluate(condition, env, types, call_stack): 
                 if isinstance(body, Sequence):
                     for stmt in body.statements:
-                        xy = e(stmt, env, types) 
+                        xy = evaluate(stmt, env, types, call_stack) 
                         if xy == "break":
                             return None  
                         elif xy == "continue":
@@ -319,7 +463,7 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
                         elif isinstance(stmt, Return):
                             return stmt 
                 else:
-                    xy = e(body, env, types)
+                    xy = evaluate(body, env, types, call_stack)
                     if xy == "break":
                             return None  
                     elif xy == "continue":
@@ -328,13 +472,13 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
                             return xy
                     elif isinstance(stmt, Return):
                         return stmt 
-                e(increment, env, types)
+                evaluate(increment, env, types, call_stack)
             return xy
 
         case Sequence(statements):
             last_value = []
             for stmt in statements:
-                last_value=e(stmt, env, types,call_stack)  
+                last_value=evaluate(stmt, env, types, call_stack)  
                 if isinstance(last_value,Return):
                     return last_value
                 elif isinstance(stmt, Return):
@@ -350,8 +494,8 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
         case String(v):
             return v
         case Concat(left, right):
-            left_val = e(left, env, types)
-            right_val = e(right, env, types)
+            left_val = evaluate(left, env, types, call_stack)
+            right_val = evaluate(right, env, types, call_stack)
 
             if not isinstance(left_val, str) or not isinstance(right_val, str):
                 raise TypeError("Concat can only be used with String")
@@ -359,31 +503,30 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
             return left_val + right_val 
         
         case Print(values):
-            results = []
-            for value in values:
-                result = e(value, env, types)
-                if isinstance(result, bool): 
-                    result = "nocap" if result else "cap"
-                elif isinstance(result, int) and result < 0:
-                    result = "~" + str(-result)
-                results.append(result)
+            results = [format_value(evaluate(value, env, types, call_stack)) for value in values]
             # print(*results) 
-            print("".join(map(str, results)))
+            output.write("".join(results) + "\n")
             return None
-            # results = [e(value, env, types) for value in values]
+            # results = [evaluate(value, env, types, call_stack) for value in values]
             # print(*results)  # Changed to use default print behavior with newline
            
         case Array(elements):
-            return [e(element, env, types) for element in elements]            
+            return TypedArray([evaluate(element, env, types, call_stack) for element in elements])            
         case ArrayAccess(array, index):
-            array_val = e(array, env, types)
-            index_val = e(index, env, types)
-            if not isinstance(array_val, (list,str,dict)):
-                raise TypeError(f"Indexing cannot be used with type {type(array_val).__name__}")
-            if isinstance(array_val,dict):
-                if index_val not in array_val:
-                    return "None"
-            return array_val[index_val]
+            if type(array) is ArrayAccess:
+                # m[i][j]: a matrix looks it up with one flat index
+                outer = evaluate(array.array, env, types, call_stack)
+                row_index = evaluate(array.index, env, types, call_stack)
+                if type(outer) is Matrix:
+                    return outer.get(row_index, evaluate(index, env, types, call_stack))
+                array_val = subscript(outer, row_index)
+            else:
+                array_val = evaluate(array, env, types, call_stack)
+            return subscript(array_val, evaluate(index, env, types, call_stack))
+
+        case NewMatrix(rows, cols, fill):
+            return Matrix(evaluate(rows, env, types, call_stack), evaluate(cols, env, types, call_stack),
+                          evaluate(fill, env, types, call_stack))
         
         case ArrayAssignment(array, index, value):
             # ── multi‑index form  arr[0][1] = rhs  (index is None) ─────────
@@ -397,30 +540,42 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
                     raise RuntimeError("Invalid assignment target")
 
                 # base collection
-                col = e(node, env, types)
-                if not isinstance(col, (list, dict)):
+                col = evaluate(node, env, types, call_stack)
+                if not isinstance(col, (*ARRAYS, dict)):
                     raise TypeError("Left side must be array or hashmap")
 
+                if type(col) is Matrix and len(idx_asts) == 2:
+                    i = evaluate(idx_asts[0], env, types, call_stack)
+                    j = evaluate(idx_asts[1], env, types, call_stack)
+                    val = evaluate(value, env, types, call_stack)
+                    col.set(i, j, val)
+                    return val
+
                 # walk down to parent container
                 for idx_ast in idx_asts[:-1]:
-                    col = col[e(idx_ast, env, types)]
-                    if not isinstance(col, (list, dict)):
+                    col = col[evaluate(idx_ast, env, types, call_stack)]
+                    if not isinstance(col, (*ARRAYS, dict)):
                         raise TypeError("Intermediate element is not a collection")
 
-                last_idx = e(idx_asts[-1], env, types)
-                col[last_idx] = e(value, env, types)
+                last_idx = evaluate(idx_asts[-1], env, types, call_stack)
+                val = evaluate(value, env, types, call_stack)
+                if isinstance(col, TYPED_ARRAYS):
+                    col.check(val)
+                col[last_idx] = val
                 return col[last_idx]
 
             # ── single‑level form  arr[i] = rhs  or  map[key] = rhs ───────
-            col   = e(array, env, types)
-            key   = e(index, env, types)
-            val   = e(value, env, types)
+            col   = evaluate(array, env, types, call_stack)
+            key   = evaluate(index, env, types, call_stack)
+            val   = evaluate(value, env, types, call_stack)
 
-            if isinstance(col, list):
+            if isinstance(col, ARRAYS):
                 if not isinstance(key, int):
                     raise TypeError("Array index must be an integer")
                 if key < 0 or key >= len(col):
                     raise IndexError(f"Index {key} out of bounds")
+                if isinstance(col, TYPED_ARRAYS):
+                    col.check(val)
             elif not isinstance(col, dict):
                 raise TypeError("Assignment target is neither array nor hashmap")
 
@@ -428,17 +583,20 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
             return val
 
         case ArrayAppend(array, value):
-            arr = e(array, env, types)
-            if not isinstance(arr, list):
+            arr = evaluate(array, env, types, call_stack)
+            if not isinstance(arr, ARRAYS):
                 raise TypeError("append() can only be used on arrays")
-            arr.append(e(value, env, types))
+            val = evaluate(value, env, types, call_stack)
+            if isinstance(arr, TYPED_ARRAYS):
+                arr.check(val)
+            arr.append(val)
             return arr                           # return the *same list* ref
 
         case ArrayDelete(array, index):
-            col = e(array, env, types)
+            col = evaluate(array, env, types, call_stack)
 
-            if isinstance(col, list):
-                idx = e(index, env, types)
+            if isinstance(col, ARRAYS):
+                idx = evaluate(index, env, types, call_stack)
                 if not isinstance(idx, int):
                     raise TypeError("Array index must be an integer")
                 if idx < 0 or idx >= len(col):
@@ -447,7 +605,7 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
                 return col
 
             if isinstance(col, dict):
-                key = e(index, env, types)
+                key = evaluate(index, env, types, call_stack)
                 if key not in col:
                     raise KeyError(f"Key {key} not found in hashmap")
                 del col[key]
@@ -456,85 +614,212 @@ def e(tree: AST, env={}, types={}, call_stack=[]):
             raise TypeError("delete() can only be used on arrays or hashmaps")
 
         case ArrayLength(array):
-            col = e(array, env, types)
-            if isinstance(col, (list, dict,str)):
+            col = evaluate(array, env, types, call_stack)
+            if isinstance(col, (*ARRAYS, dict, set, str)):
                 return len(col)
+            if isinstance(col, CONTAINERS):
+                return len(col.items)
             raise TypeError("len() can only be used on arrays or hashmaps")
                     
+        case ArrayReduce(array, op):
+            return REDUCTIONS[op](evaluate(array, env, types, call_stack))
+
+        case ArrayFill(array, value):
+            arr = evaluate(array, env, types, call_stack)
+            return fill_array(arr, evaluate(value, env, types, call_stack))
+
+        case NewRange(count):
+            return new_range(evaluate(count, env, types, call_stack))
+
+        case ArrayReorder(array, op):
+            return REORDERS[op](evaluate(array, env, types, call_stack))
+
+        case ArraySearch(array, value, op):
+            arr = evaluate(array, env, types, call_stack)
+            return SEARCHES[op](arr, evaluate(value, env, types, call_stack))
+
         case HashMap(name,key_type, value_type):
-            env[name] = {}  
-            types[name] = f"hashmap<{key_type}, {value_type}>"
+            store(tree, name, {}, f"hashmap<{key_type}, {value_type}>", env, types, call_stack)
             return None     
 
             
         case StackDeclaration(element_type, name):
-            env[name] = Stack()  # Initialize an empty stack
-            types[name] = f"stack<{element_type}>"
+            store(tree, name, Stack(), f"stack<{element_type}>", env, types, call_stack)  # Initialize an empty stack
             return None
         
         case StackPush(stack_name, value):
-            if stack_name not in env:
+            stack, stack_type = lookup(tree, stack_name, env, types, call_stack)
+            if stack is None:
                 raise NameError(f"Undefined stack: {stack_name}")
-            stack = env[stack_name]
             if not isinstance(stack, Stack):
                 raise TypeError(f"{stack_name} is not a stack")
-            val = e(value, env, types)
+            val = evaluate(value, env, types, call_stack)
             # Get the element type from the stack type
-            element_type = types[stack_name].split('<')[1][:-1]  # Extract type between < and >
+            element_type = stack_type.split('<')[1][:-1]  # Extract type between < and >
             if not isinstance(val, datatypes[element_type]):
                 raise TypeError(f"Cannot push {type(val).__name__} to stack of {element_type}")
             stack.push(val)
             return None 
         
         case StackPop(stack_name):
-            if stack_name not in env:
+            stack, stack_type = lookup(tree, stack_name, env, types, call_stack)
+            if stack is None:
                 raise NameError(f"Undefined stack: {stack_name}")
-            stack = env[stack_name]
             if not isinstance(stack, Stack):
                 raise TypeError(f"{stack_name} is not a stack")
             stack.pop()  
             return None
         
         case StackTop(stack_name):
-            if stack_name not in env:
+            stack, stack_type = lookup(tree, stack_name, env, types, call_stack)
+            if stack is None:
                 raise NameError(f"Undefined stack: {stack_name}")
-            stack = env[stack_name]
             if not isinstance(stack, Stack):
                 raise TypeError(f"{stack_name} is not a stack")
             return stack.top()
         
         case QueueDeclaration(element_type, name):
-            env[name] = Queue()  # Initialize an empty queue
-            types[name] = f"queue<{element_type}>"
+            store(tree, name, Queue(), f"queue<{element_type}>", env, types, call_stack)  # Initialize an empty queue
             return None
 
         case QueuePush(queue_name, value):
-            if queue_name not in env:
+            queue, queue_type = lookup(tree, queue_name, env, types, call_stack)
+            if queue is None:
                 raise NameError(f"Undefined queue: {queue_name}")
-            queue = env[queue_name]
             if not isinstance(queue, Queue):
                 raise TypeError(f"{queue_name} is not a queue")
-            val = e(value, env, types)
+            val = evaluate(value, env, types, call_stack)
             # Get the element type from the queue type
-            element_type = types[queue_name].split('<')[1][:-1]  # Extract type between < and >
+            element_type = queue_type.split('<')[1][:-1]  # Extract type between < and >
             if not isinstance(val, datatypes[element_type]):
                 raise TypeError(f"Cannot push {type(val).__name__} to queue of {element_type}")
             queue.push(val)
             return None
 
         case QueuePop(queue_name):
-            if queue_name not in env:
+            queue, queue_type = lookup(tree, queue_name, env, types, call_stack)
+            if queue is None:
                 raise NameError(f"Undefined queue: {queue_name}")
-            queue = env[queue_name]
             if not isinstance(queue, Queue):
                 raise TypeError(f"{queue_name} is not a queue")
             return queue.pop()
 
         case QueueFirst(queue_name):
-            if queue_name not in env:
+            queue, queue_type = lookup(tree, queue_name, env, types, call_stack)
+            if queue is None:
                 raise NameError(f"Undefined queue: {queue_name}")
-            queue = env[queue_name]
             if not isinstance(queue, Queue):
                 raise TypeError(f"{queue_name} is not a queue")
             return queue.first()
 
+        case DequeDeclaration(element_type, name):
+            store(tree, name, Deque(), f"deque<{element_type}>", env, types, call_stack)
+            return None
+
+        case DequePush(deque_name, end, value):
+            dq, deque_type = lookup(tree, deque_name, env, types, call_stack)
+            if dq is None:
+                raise NameError(f"Undefined deque: {deque_name}")
+            if not isinstance(dq, Deque):
+                raise TypeError(f"{deque_name} is not a deque")
+            val = evaluate(value, env, types, call_stack)
+            element_type = deque_type.split('<')[1][:-1]
+            if not isinstance(val, datatypes[element_type]):
+                raise TypeError(f"Cannot push {type(val).__name__} to deque of {element_type}")
+            if end == "front":
+                dq.push_front(val)
+            else:
+                dq.push_back(val)
+            return None
+
+        case DequePop(deque_name, end):
+            dq, _ = lookup(tree, deque_name, env, types, call_stack)
+            if dq is None:
+                raise NameError(f"Undefined deque: {deque_name}")
+            if not isinstance(dq, Deque):
+                raise TypeError(f"{deque_name} is not a deque")
+            return dq.pop_front() if end == "front" else dq.pop_back()
+
+        case DequePeek(deque_name, end):
+            dq, _ = lookup(tree, deque_name, env, types, call_stack)
+            if dq is None:
+                raise NameError(f"Undefined deque: {deque_name}")
+            if not isinstance(dq, Deque):
+                raise TypeError(f"{deque_name} is not a deque")
+            return dq.front() if end == "front" else dq.back()
+
+        case SetDeclaration(element_type, name):
+            store(tree, name, set(), f"set<{element_type}>", env, types, call_stack)
+            return None
+
+        case SetAdd(set_name, value) | SetRemove(set_name, value):
+            items, set_type = lookup(tree, set_name, env, types, call_stack)
+            if items is None:
+                raise NameError(f"Undefined set: {set_name}")
+            if not isinstance(items, set):
+                raise TypeError(f"{set_name} is not a set")
+            val = evaluate(value, env, types, call_stack)
+            if isinstance(tree, SetRemove):
+                if val not in items:
+                    raise KeyError(f"Element {val} not found in set")
+                items.remove(val)
+                return None
+            element_type = set_type.split('<')[1][:-1]
+            if not isinstance(val, datatypes[element_type]):
+                raise TypeError(f"Cannot add {type(val).__name__} to set of {element_type}")
+            items.add(val)
+            return None
+
+        case Contains(collection, value):
+            col = evaluate(collection, env, types, call_stack)
+            if not isinstance(col, (set, dict, *ARRAYS)):
+                raise TypeError("contains() can only be used on sets, hashmaps or arrays")
+            return evaluate(value, env, types, call_stack) in col
+
+        case MapGet(hashmap, key, default):
+            col = evaluate(hashmap, env, types, call_stack)
+            if not isinstance(col, dict):
+                raise TypeError("get() can only be used on hashmaps")
+            key = evaluate(key, env, types, call_stack)
+            if key in col:
+                return col[key]
+            return evaluate(default, env, types, call_stack)
+
+        case MapView(hashmap, op):
+            col = evaluate(hashmap, env, types, call_stack)
+            if not isinstance(col, dict):
+                raise TypeError(f"{op}() can only be used on hashmaps")
+            return TypedArray(col.keys() if op == "keys" else col.values())
+
+        case HeapDeclaration(element_type, name, order):
+            store(tree, name, Heap(order == "max"), f"heap<{element_type}>", env, types, call_stack)
+            return None
+
+        case HeapPush(heap_name, value):
+            heap, heap_type = lookup(tree, heap_name, env, types, call_stack)
+            if heap is None:
+                raise NameError(f"Undefined heap: {heap_name}")
+            if not isinstance(heap, Heap):
+                raise TypeError(f"{heap_name} is not a heap")
+            val = evaluate(value, env, types, call_stack)
+            element_type = heap_type.split('<')[1][:-1]
+            if not isinstance(val, datatypes[element_type]):
+                raise TypeError(f"Cannot push {type(val).__name__} to heap of {element_type}")
+            heap.push(val)
+            return None
+
+        case HeapPop(heap_name):
+            heap, _ = lookup(tree, heap_name, env, types, call_stack)
+            if heap is None:
+                raise NameError(f"Undefined heap: {heap_name}")
+            if not isinstance(heap, Heap):
+                raise TypeError(f"{heap_name} is not a heap")
+            return heap.pop()
+
+        case HeapTop(heap_name):
+            heap, _ = lookup(tree, heap_name, env, types, call_stack)
+            if heap is None:
+                raise NameError(f"Undefined heap: {heap_name}")
+            if not isinstance(heap, Heap):
+                raise TypeError(f"{heap_name} is not a heap")
+            return heap.top()
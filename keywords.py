@@ -1,5 +1,6 @@
-keywords = ["if", "elif", "else", "nocap", "cap", "yap", "concat", "while", "for", "and", "or", "not", "def", "yeet", "void", "break", "continue","spill","fn", "stack", "queue","hashmap","struct"]
+keywords = ["if", "elif", "else", "nocap", "cap", "yap", "concat", "while", "for", "and", "or", "not", "def", "yeet", "void", "break", "continue","spill","fn", "stack", "queue", "hashmap","struct"]
 
+from abc import ABC
 from dataclasses import dataclass
 
 class AST:
@@ -12,15 +13,20 @@ class Function(AST):
     return_type: str
     body: AST 
 
+class Array(ABC):
+    """Python types of YAP array values: lists, and arrays.PackedArray"""
+
+Array.register(list)
+
 datatypes = {
     "int": int, 
     "float": float, 
     "bool": bool, 
     "string": str,
-    "int[]": list,
-    "float[]": list,
-    "bool[]": list,
-    "string[]": list,
+    "int[]": Array,
+    "float[]": Array,
+    "bool[]": Array,
+    "string[]": Array,
     "fn": Function,
     "fn[]": Function,
     "void": None,
@@ -1,159 +1,242 @@
+import re
+from array import array
 from dataclasses import dataclass, field
 from collections.abc import Iterator
 from keywords import keywords, datatypes
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     # pass
     val: str
     line: int = field(default=-1)
 
-@dataclass
+@dataclass(slots=True)
 class NumberToken(Token):
     val: str
     def __eq__(self, other):
         return isinstance(other, NumberToken) and self.val == other.val
 
-@dataclass
+@dataclass(slots=True)
 class ParenthesisToken(Token):
     val: str
     def __eq__(self, other):
         return isinstance(other, ParenthesisToken) and self.val == other.val
 
-@dataclass
+@dataclass(slots=True)
 class KeywordToken(Token):
     val: str
     def __eq__(self, other):
         return isinstance(other, KeywordToken) and self.val == other.val
 
-@dataclass
+@dataclass(slots=True)
 class OperatorToken(Token):
     val: str
     def __eq__(self, other):
         return isinstance(other, OperatorToken) and self.val == other.val
 
-@dataclass
+@dataclass(slots=True)
 class BooleanToken(Token):
     val: str
     def __eq__(self, other):
         return isinstance(other, BooleanToken) and self.val == other.val
 
-@dataclass
+@dataclass(slots=True)
 class StringToken(Token):
     val: str
     def __eq__(self, other):
         return isinstance(other, StringToken) and self.val == other.val
 
-@dataclass
+@dataclass(slots=True)
 class VariableToken(Token):
     val: str
     def __eq__(self, other):
         return isinstance(other, VariableToken) and self.val == other.val
 
-@dataclass
+@dataclass(slots=True)
 class TypeToken(Token):
     val: str
     def __eq__(self, other):
         return isinstance(other, TypeToken) and self.val == other.val
 
-@dataclass
+@dataclass(slots=True)
 class SymbolToken(Token):
     val: str
     def __eq__(self, other):
         return isinstance(other, SymbolToken) and self.val == other.val
 
 
+# One alternation covering every lexeme; the group that matched tells us what
+# kind of token it is.  Leading blanks are folded into the match so that most
+# tokens cost a single regex step.  Order matters: two-character operators are
+# tried before their one-character prefixes, and `error` catches anything else.
+TOKEN_PATTERN = re.compile(r"""[ \t]*(?:
+    (?P<space>\s+)
+  | (?P<comment>\#[^\n]*)
+  | (?P<word>[^\W\d_][\w.]*)
+  | (?P<number>\d+(?:\.\d*)?)
+  | (?P<string>"[^"]*"?)
+  | (?P<operator2><=|>=|==|!=|~~|//)
+  | (?P<arrow>->)
+  | (?P<paren>[(){}\[\]])
+  | (?P<operator>[-+*/^~<>=%&|])
+  | (?P<symbol>[.;,!])
+  | (?P<error>.)
+)""", re.VERBOSE | re.DOTALL)
+
+# Token class for each group whose text is the token value as-is
+GROUP_TOKENS = {
+    "number": NumberToken,
+    "operator2": OperatorToken,
+    "arrow": SymbolToken,
+    "paren": ParenthesisToken,
+    "operator": OperatorToken,
+    "symbol": SymbolToken,
+}
+
+# Token class for every reserved word; anything else is a variable name
+WORD_TOKENS = {word: TypeToken for word in datatypes}
+for word in keywords:
+    if word in WORD_TOKENS:
+        continue
+    if word in ("nocap", "cap"):
+        WORD_TOKENS[word] = BooleanToken
+    elif word in ("and", "or", "not"):
+        WORD_TOKENS[word] = OperatorToken
+    else:
+        WORD_TOKENS[word] = KeywordToken
+
+
 def lex(s: str) -> Iterator[Token]:
-    i = 0
+    line = 1
+    word_token = WORD_TOKENS.get
+    group_token = GROUP_TOKENS.get
+
+    for m in TOKEN_PATTERN.finditer(s):
+        kind = m.lastgroup
+        text = m.group(kind)
+        token = group_token(kind)
+        if token is not None:
+            yield token(text, line)
+        elif kind == "word":
+            yield word_token(text, VariableToken)(text, line)
+        elif kind == "space":
+            line += text.count("\n")
+        elif kind == "string":
+            # an unterminated string runs to the end of the input
+            yield StringToken(text[1:-1] if len(text) > 1 and text[-1] == '"' else text[1:], line)
+        elif kind == "error":
+            raise ValueError(f"Unexpected character: {text} at line {line}")
+
+
+# Kind ids used by TokenBuffer, in a fixed order
+TOKEN_KINDS = (NumberToken, ParenthesisToken, KeywordToken, OperatorToken, BooleanToken,
+               StringToken, VariableToken, TypeToken, SymbolToken)
+KIND_IDS = {token: kind for kind, token in enumerate(TOKEN_KINDS)}
+
+GROUP_KINDS = {group: KIND_IDS[token] for group, token in GROUP_TOKENS.items()}
+WORD_KINDS = {word: KIND_IDS[token] for word, token in WORD_TOKENS.items()}
+
+# Values every TokenBuffer interns first, in this order, so reserved words and
+# punctuation have the same value id, and so the same code, in every buffer
+FIXED_VALUES = (*WORD_TOKENS, "<=", ">=", "==", "!=", "~~", "//", "->", "(", ")", "{", "}", "[", "]",
+                "-", "+", "*", "/", "^", "~", "<", ">", "=", "%", "&", "|", ".", ";", ",", "!")
+FIXED_IDS = {val: value_id for value_id, val in enumerate(FIXED_VALUES)}
+
+
+def token_code(token):
+    """Code of a reserved word or punctuation token, the same in every TokenBuffer"""
+    return FIXED_IDS[token.val] << 4 | KIND_IDS[type(token)]
+
+
+class TokenBuffer:
+    """Compact token stream stored as parallel arrays.
+
+    Each token is a code and a line number.  The code packs an interned value
+    id (index into `strings`) and a kind id (index into TOKEN_KINDS) into one
+    int, value_id << 4 | kind, so equal codes mean equal tokens.  Indexing
+    returns an ordinary Token, so the buffer can stand in for a list of
+    tokens.  FIXED_VALUES come first in `strings`, so token_code() gives the
+    code of a reserved word or punctuation token without looking at the buffer.
+    """
+    __slots__ = ("codes", "lines", "strings", "ids")
+
+    def __init__(self):
+        self.codes = array('I')
+        self.lines = array('I')
+        self.strings = list(FIXED_VALUES)
+        self.ids = dict(FIXED_IDS)
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """Buffer holding the given Token objects"""
+        buffer = cls()
+        codes, lines, intern = buffer.codes, buffer.lines, buffer.intern
+        for token in tokens:
+            codes.append(intern(token.val) << 4 | KIND_IDS[type(token)])
+            lines.append(token.line)
+        return buffer
+
+    def intern(self, val):
+        value_id = self.ids.setdefault(val, len(self.strings))
+        if value_id == len(self.strings):
+            self.strings.append(val)
+        return value_id
+
+    def append(self, kind, val, line):
+        self.codes.append(self.intern(val) << 4 | kind)
+        self.lines.append(line)
+
+    def code(self, i):
+        """Kind and value of token i packed into one int; equal codes mean equal tokens"""
+        return self.codes[i]
+
+    def code_of(self, token):
+        """Code that token would have in this buffer, or -1 if its value never occurs"""
+        value_id = self.ids.get(token.val)
+        if value_id is None:
+            return -1
+        return value_id << 4 | KIND_IDS[type(token)]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        code = self.codes[i]
+        return TOKEN_KINDS[code & 15](self.strings[code >> 4], self.lines[i])
+
+    def __iter__(self):
+        strings = self.strings
+        for code, line in zip(self.codes, self.lines):
+            yield TOKEN_KINDS[code & 15](strings[code >> 4], line)
+
+
+def lex_compact(s: str) -> TokenBuffer:
+    """Lex s into a TokenBuffer; produces the same tokens as lex() without allocating them"""
+    tokens = TokenBuffer()
+    codes, lines = tokens.codes, tokens.lines
+    intern = tokens.intern
+    word_kind = WORD_KINDS.get
+    group_kind = GROUP_KINDS.get
+    variable, string = KIND_IDS[VariableToken], KIND_IDS[StringToken]
     line = 1
 
-    while i < len(s):
-        while i < len(s) and s[i].isspace():
-            if s[i] == '\n':
-                line += 1
-            i += 1
-
-        if i >= len(s):
-            return            
-
-        if s[i].isalpha():
-            start = i
-            while i < len(s) and (s[i].isalnum() or s[i] == '_' or s[i] == '.'):
-                i += 1
-            word = s[start:i]
-            if word in datatypes.keys():
-                yield TypeToken(word, line)
-            elif word in keywords:
-                if word in ["nocap", "cap"]:
-                    yield BooleanToken(word, line)
-                elif word in ["and", "or", "not"]:
-                    yield OperatorToken(word, line)
-                else:
-                    yield KeywordToken(word, line)
+    for m in TOKEN_PATTERN.finditer(s):
+        group = m.lastgroup
+        text = m.group(group)
+        kind = group_kind(group)
+        if kind is None:
+            if group == "word":
+                kind = word_kind(text, variable)
+            elif group == "space":
+                line += text.count("\n")
+                continue
+            elif group == "string":
+                kind = string
+                text = text[1:-1] if len(text) > 1 and text[-1] == '"' else text[1:]
+            elif group == "error":
+                raise ValueError(f"Unexpected character: {text} at line {line}")
             else:
-                yield VariableToken(word, line)
-
-        elif s[i].isdigit():
-            t = s[i]
-            i += 1
-            has_decimal = False
-            while i < len(s) and (s[i].isdigit() or (s[i] == '.' and not has_decimal)):
-                if s[i] == '.':
-                    has_decimal = True
-                t += s[i]
-                i += 1
-            yield NumberToken(t, line)
-
-        elif s[i] == '"':
-            i += 1
-            start = i
-            while i < len(s) and s[i] != '"':
-                i += 1
-            yield StringToken(s[start:i], line)
-            i += 1
-        
-        elif s[i] == '#':
-            while i < len(s) and s[i] != '\n':
-                i += 1
-            continue
-
-
-        else:
-            match s[i]:
-                case '.' | '+' | '*' | '-' | '/' | '%' | '^' | '(' | ')' | '<' | '>' | '=' | '!' | '~' | '{' | '}' | ';' | ',' | '[' | ']' | '->'|'%':
-                    if i + 1 < len(s):
-                        two_char_op = s[i:i + 2]
-                        if two_char_op in {"<=", ">=", "==", "!=","~~"}:  # Explicitly handle <=, >=
-                            yield OperatorToken(two_char_op, line)
-                            i += 2
-                            continue
-                    if s[i] in "}(){[]":
-                        yield ParenthesisToken(s[i], line)
-                    # Handle square brackets (array access)
-                    elif s[i] == '[' or s[i] == ']':
-                        yield ParenthesisToken(s[i], line)
-                        i += 1
-                    # Handle dot notation for method calls (e.g., arr.append(2))
-                    elif s[i] == '.':
-                        yield SymbolToken('.', line)
-                        i += 1
-                        continue
-                    elif s[i] == '-' and i + 1 < len(s) and s[i + 1] == '>':
-                        yield SymbolToken('->', line)
-                        i += 1
-                    elif s[i] == '/' and i + 1 < len(s) and s[i + 1] == '/':
-                        yield OperatorToken('//', line)
-                        i += 1
-                        
-                    elif s[i] in '+ * / - ^ ~><= %':
-                        yield OperatorToken(s[i], line)
-                    else:
-                        yield SymbolToken(s[i], line)
-                    i += 1
-                # Handle bitwise operators separately
-                case '&' | '|':
-                    yield OperatorToken(s[i], line)
-                    i += 1
-                case _:
-                    raise ValueError(f"Unexpected character: {s[i]} at line {line}")
-
+                continue
+        codes.append(intern(text) << 4 | kind)
+        lines.append(line)
+    return tokens
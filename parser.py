@@ -1,17 +1,52 @@
-from dataclasses import dataclass
-from more_itertools import peekable
+from dataclasses import dataclass, field
 from typing import Optional, List
 from keywords import keywords, datatypes
 from lexer import *
 from errors import *
 
 # helper‑method names recognised after an array / array element
-METHODS = {"append", "delete", "len"}
+METHODS = {"append", "delete", "len", "size", "contains", "sum", "min", "max", "fill",
+           "sort", "sort_desc", "reverse", "lower_bound", "upper_bound"}
+# the ones that take an argument
+METHOD_ARGS = {"append", "delete", "contains", "fill", "lower_bound", "upper_bound"}
+
+# Container types that are not reserved words, so programs can still use them
+# as names: they start a declaration only as `set<T> name`.  The matrix and
+# range builtins are likewise only recognised when called, `range(n)`
+CONTAINER_TYPES = {"deque", "heap", "set"}
+
+# Binary operators: binding power (higher binds tighter) and right-associativity.
+# `not` and `~~` after an operand keep only their right side, as before.
+BINARY_OPERATORS = {
+    "and": (1, False), "or": (1, False),
+    "<": (1, False), ">": (1, False), "<=": (1, False), ">=": (1, False),
+    "==": (1, False), "!=": (1, False),
+    "&": (1, False), "|": (1, False),
+    "not": (1, False), "~~": (1, False),
+    "+": (2, False),
+    "-": (3, False),
+    "*": (4, False),
+    "/": (5, False), "//": (5, False),
+    "%": (6, False),
+    "^": (7, True),
+}
+DISCARDS_LEFT = {"not", "~~"}
+
+# Prefix operators bind tighter than any binary operator: `~` negates, `~~` is
+# bitwise not and `not` is logical not
+PREFIX_OPERATORS = {"not", "~~", "~"}
+
+# entry kinds on the expression parser's operator stack
+BINARY, PREFIX, GROUP = 0, 1, 2
 
 class AST:
-    pass
+    __slots__ = ()
+
+def binding():
+    """Field filled in by resolver.py; not printed or compared"""
+    return field(default=None, repr=False, compare=False)
 
-@dataclass
+@dataclass(slots=True)
 class BinOp(AST):
     op: str
     left: AST
@@ -20,6 +55,7 @@ class BinOp(AST):
 # AST node for a sequence of statements
 class Sequence(AST):
     __match_args__ = ("statements",)  # Tells Python to expect a "statements" attribute during matching
+    __slots__ = ("statements",)
 
     def __init__(self, statements):
         self.statements = statements
@@ -32,176 +68,430 @@ class Sequence(AST):
     def __repr__(self):
         return f"Sequence({self.statements})"
 
-@dataclass
+@dataclass(slots=True)
 class Cond(AST):
     If: tuple[AST, AST]  # ('condition', 'body') for the 'if' statement
     Elif: Optional[List[tuple[AST, AST]]] # Optional list of ('condition', 'body') for each 'elif'
     Else: Optional[AST] = None 
     
-@dataclass
+@dataclass(slots=True)
 class While(AST):
     condition: AST
     body: list[AST]  
 
-@dataclass
+@dataclass(slots=True)
 class For(AST):
     init: AST
     condition: AST
     increment: AST
     body: list[AST]
 
-@dataclass
+@dataclass(slots=True)
 class Number(AST):
     val: str
 
-@dataclass
+@dataclass(slots=True)
 class Parenthesis(AST):
     expr: AST
 
-@dataclass
+@dataclass(slots=True)
 class SemicolonToken(AST):
     s: str
 
-@dataclass
+@dataclass(slots=True)
 class Break(AST):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Continue(AST):
     pass
-@dataclass
+@dataclass(slots=True)
 class Boolean(AST):
     val: str
 
-@dataclass
+@dataclass(slots=True)
 class String(AST):
     val: str
 
-@dataclass
+@dataclass(slots=True)
 class Variable(AST):
     val: str
+    depth: int|None = binding()  # scope the name lives in: 0 for globals
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
 class Declaration(AST):
     type: str
     name: str
     value: AST
+    depth: int|None = binding()
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
 class Assignment(AST):
     name: str
     value: AST
+    depth: int|None = binding()
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
 class Concat(AST):
     left: str
     right: str 
 
-@dataclass
+@dataclass(slots=True)
 class Function(AST):
     name: str
     params: list[tuple[str, str]]  # List of (type, name) pairs
     return_type: str
-    body: AST  
+    body: AST
+    depth: int|None = binding()
+    slot: int|None = binding()
+    frame_size: int|None = binding()  # number of local slots
+    copies: list|None = binding()  # (slot, depth, outer slot, name) to copy in on a call
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCall(AST):
     name: str
-    params: list[str] 
+    params: list[str]
+    depth: int|None = binding()
+    slot: int|None = binding()
       
-@dataclass
+@dataclass(slots=True)
 class Return(AST):
     value: AST
 
-@dataclass
+@dataclass(slots=True)
 class Print(AST):
     values: list[AST]  
 
-@dataclass
+@dataclass(slots=True)
 class Array(AST):
     elements: list[AST]
 
-@dataclass
+@dataclass(slots=True)
+class NewMatrix(AST):
+    rows: AST
+    cols: AST
+    fill: AST  # initial value of every element; its type is the element type
+
+@dataclass(slots=True)
 class ArrayAccess(AST):
     array: AST
     index: AST
 
-@dataclass
+@dataclass(slots=True)
 class ArrayAssignment(AST):
     array: AST
     index: AST
     value: AST
 
-@dataclass
+@dataclass(slots=True)
 class ArrayAppend(AST):
     array: AST
     value: AST
 
-@dataclass
+@dataclass(slots=True)
 class ArrayDelete(AST):
     array: AST
     index: AST
 
-@dataclass
+@dataclass(slots=True)
 class ArrayLength(AST):
     array: AST
 
+@dataclass(slots=True)
+class ArrayReduce(AST):
+    array: AST
+    op: str  # "sum", "min" or "max"
+
+@dataclass(slots=True)
+class ArrayFill(AST):
+    array: AST
+    value: AST
+
+@dataclass(slots=True)
+class NewRange(AST):
+    count: AST
+
+@dataclass(slots=True)
+class ArrayReorder(AST):
+    array: AST
+    op: str  # "sort", "sort_desc" or "reverse", done in place
 
-@dataclass
+@dataclass(slots=True)
+class ArraySearch(AST):
+    array: AST
+    value: AST
+    op: str  # "lower_bound" or "upper_bound" in a sorted array
+
+
+def array_method(array, method, arg):
+    """Node for `array.method(arg)`, `method` being one of METHODS"""
+    match method:
+        case "append":
+            return ArrayAppend(array, arg)
+        case "delete":
+            return ArrayDelete(array, arg)
+        case "fill":
+            return ArrayFill(array, arg)
+        case "len" | "size":
+            return ArrayLength(array)
+        case "contains":
+            return Contains(array, arg)
+        case "sort" | "sort_desc" | "reverse":
+            return ArrayReorder(array, method)
+        case "lower_bound" | "upper_bound":
+            return ArraySearch(array, arg, method)
+        case _:
+            return ArrayReduce(array, method)
+
+@dataclass(slots=True)
 class Input(AST):
-    pass
+    type: Optional[str] = None  # declared type of the variable read into, if known
 
-@dataclass
+@dataclass(slots=True)
 class StackDeclaration(AST):
     element_type: str
     name: str
+    depth: int|None = binding()
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
 class StackPush(AST):
     stack_name: str
     value: AST
+    depth: int|None = binding()
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
 class StackPop(AST):
     stack_name: str
+    depth: int|None = binding()
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
 class StackTop(AST):
     stack_name: str
+    depth: int|None = binding()
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
 class QueueDeclaration(AST):
-    element_type: str 
+    element_type: str
     name: str
+    depth: int|None = binding()
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
 class QueuePush(AST):
     queue_name: str
     value: AST
+    depth: int|None = binding()
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
 class QueuePop(AST):
     queue_name: str
+    depth: int|None = binding()
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
 class QueueFirst(AST):
     queue_name: str
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
+class DequeDeclaration(AST):
+    element_type: str
+    name: str
+    depth: int|None = binding()
+    slot: int|None = binding()
 
-@dataclass
+@dataclass(slots=True)
+class DequePush(AST):
+    deque_name: str
+    end: str  # "front" or "back"
+    value: AST
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
+class DequePop(AST):
+    deque_name: str
+    end: str
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
+class DequePeek(AST):
+    deque_name: str
+    end: str
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
+class HeapDeclaration(AST):
+    element_type: str
+    name: str
+    order: str  # "min" or "max": which element comes out first
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
+class HeapPush(AST):
+    heap_name: str
+    value: AST
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
+class HeapPop(AST):
+    heap_name: str
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
+class HeapTop(AST):
+    heap_name: str
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
 class HashMap(AST):
     name: str
     index_type: str
     value_type: str
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
+class MapGet(AST):
+    map: AST
+    key: AST
+    default: AST  # value when the key is missing
+
+@dataclass(slots=True)
+class MapView(AST):
+    map: AST
+    op: str  # "keys" or "values", as an array
+
+@dataclass(slots=True)
+class Contains(AST):
+    collection: AST  # set, hashmap (its keys) or array
+    value: AST
 
-@dataclass
+@dataclass(slots=True)
+class SetDeclaration(AST):
+    element_type: str
+    name: str
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
+class SetAdd(AST):
+    set_name: str
+    value: AST
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
+class SetRemove(AST):
+    set_name: str
+    value: AST
+    depth: int|None = binding()
+    slot: int|None = binding()
+
+@dataclass(slots=True)
 class StructDefinition(AST):
     name: str
     fields: list[tuple[str, str]]  # List of (type, name)
 
 inside_function=False
 
+# Codes (lexer.token_code) of the tokens the parser tests most often, so that
+# it compares ints instead of building and comparing Token objects
+LPAREN, RPAREN, SEMICOLON = map(token_code, (ParenthesisToken('('), ParenthesisToken(')'), SymbolToken(';')))
+OPERATOR, VARIABLE = KIND_IDS[OperatorToken], KIND_IDS[VariableToken]
+PREFIX_CODES = {token_code(OperatorToken(op)): op for op in PREFIX_OPERATORS}
+BINARY_CODES = {token_code(OperatorToken(op)): (op, power, right_assoc)
+                for op, (power, right_assoc) in BINARY_OPERATORS.items()}
+
+# Operand kinds the expression parser turns into a node directly, and the
+# tokens that make a variable more than a plain reference (a[i], f(x), a .len())
+SIMPLE_OPERANDS = {KIND_IDS[NumberToken]: Number, KIND_IDS[StringToken]: String,
+                   KIND_IDS[BooleanToken]: Boolean, VARIABLE: Variable}
+VARIABLE_SUFFIXES = set(map(token_code, (ParenthesisToken('['), ParenthesisToken('('), SymbolToken('.'))))
+
+_NO_DEFAULT = object()
+
+class TokenCursor:
+    """Integer cursor over a TokenBuffer (a sequence of Tokens is copied into
+    one first).
+
+    code() reads the integer code of a token (see TokenBuffer) straight from
+    the buffer's `codes` column, for comparing against token_code() constants.
+    peek() and next(cursor) return Token objects, built on first use and at
+    most once per position.  peek() looks any number of tokens ahead in O(1)
+    and mark()/reset() back up for backtracking.
+    """
+    __slots__ = ("codes", "strings", "buffer", "tokens", "pos", "end")
+
+    def __init__(self, tokens):
+        if isinstance(tokens, TokenBuffer):
+            buffer = tokens
+            tokens = [None] * len(buffer)
+        else:
+            tokens = list(tokens)
+            buffer = TokenBuffer.from_tokens(tokens)
+        self.codes = buffer.codes
+        self.strings = buffer.strings
+        self.buffer = buffer
+        self.tokens = tokens
+        self.pos = 0
+        self.end = len(tokens)
+
+    def __iter__(self):
+        return self
+
+    def token(self, pos):
+        token = self.tokens[pos]
+        if token is None:
+            token = self.tokens[pos] = self.buffer[pos]
+        return token
+
+    def __next__(self):
+        pos = self.pos
+        if pos >= self.end:
+            raise StopIteration
+        self.pos = pos + 1
+        return self.token(pos)
+
+    def peek(self, default=_NO_DEFAULT, ahead=0):
+        pos = self.pos + ahead
+        if pos < self.end:
+            return self.token(pos)
+        if default is _NO_DEFAULT:
+            raise StopIteration
+        return default
+
+    def code(self, ahead=0):
+        """Code of the token `ahead` places on, or -1 past the end"""
+        pos = self.pos + ahead
+        if pos < self.end:
+            return self.codes[pos]
+        return -1
+
+    def mark(self):
+        return self.pos
+
+    def reset(self, mark):
+        self.pos = mark
+
 def parse(s: str) -> AST:
-    t = peekable(lex(s))
+    # s may also be already lexed: a TokenBuffer or a sequence of Tokens
+    t = TokenCursor(lex_compact(s) if isinstance(s, str) else s)
 
     # debug prints while adding line numbers in errors
     # print(list(t))
@@ -210,6 +500,12 @@ def parse(s: str) -> AST:
     # print(isinstance(t.peek(None), KeywordToken) and t.peek(None).val == "yap")
     # print(t.peek(None) == KeywordToken("yap"))
 
+    def container_declaration():
+        # `set<int> s`, as opposed to an expression using a variable named set
+        token = t.peek(None)
+        return (type(token) is VariableToken and token.val in CONTAINER_TYPES
+                and t.peek(None, 1) == OperatorToken('<') and type(t.peek(None, 2)) is TypeToken)
+
     def parse_sequence():
         statements = []
         
@@ -229,7 +525,7 @@ def parse(s: str) -> AST:
                         # if not inside_function:
                         #     raise ParseError("Return statement outside Function body", t.peek())
                         next(t)
-                        expr = parse_comparator()
+                        expr = parse_expression()
                         
                         # If returning an array, ensure it’s valid
                         # if isinstance(expr, Array):
@@ -257,8 +553,8 @@ def parse(s: str) -> AST:
                 if isinstance(statements[-1], (Cond,Function,For,While)):
                     pass 
                 else: 
-                    if isinstance(t.peek(None), SymbolToken) and t.peek(None).val == ";":
-                        next(t)   
+                    if t.code() == SEMICOLON:
+                        t.pos += 1
                     else:
                         raise ParseError("Expected ';' after statement", last_token)
 
@@ -272,97 +568,186 @@ def parse(s: str) -> AST:
             match t.peek(None):
                 
                 case VariableToken(name):
+                    start = t.mark()
                     next(t) 
 
                     if t.peek(None) != ParenthesisToken("("):
-                        t.prepend(VariableToken(name))
-                        return parse_comparator()
-                    
-                    next(t)
-                    last_token = t.peek(None)
-                    args = []
-                    while t.peek(None) and not (isinstance(t.peek(None), ParenthesisToken) and t.peek(None).val == ")"):
-                        args.append(parse_comparator())
-                        if t.peek(None):
-                            last_token = t.peek(None)
+                        t.reset(start)
+                        return parse_expression()
 
-                        if t.peek(None) == SymbolToken(","):
-                            next(t)
-                        else:
-                            break
-                    
-                    # if next(t) != ParenthesisToken(")"):
-                    #     raise ParseError("Expected ')' after function arguments", t.peek(None))
-
-                    try:
-                        closing = next(t)
-                        if closing != ParenthesisToken(")"):
-                            raise ParseError("Expected ')' after function arguments", last_token)
-                    except StopIteration:
-                        # Fall back to the last meaningful token for location info
-                        raise ParseError("Unexpected end of input, expected ')'", last_token)
+                    return parse_call(name)
+                case _:
+                    return parse_expression()
+        except ParseError as e:
+            raise e
 
+    def parse_call(name):
+        # the callee name has been consumed; t is positioned at '('
+        try:
+            next(t)
+            last_token = t.peek(None)
+            args = []
+            while t.peek(None) and not (isinstance(t.peek(None), ParenthesisToken) and t.peek(None).val == ")"):
+                args.append(parse_expression())
+                if t.peek(None):
                     last_token = t.peek(None)
-                    # Checking queue operations
-                    if name.endswith(".stackPush"):
-                        if len(args) != 1:
-                            raise ParseError(f"Stack push expects exactly 1 argument, got {len(args)}", last_token)
-                        stack_name = name.split(".")[0]
-                        return StackPush(stack_name, args[0])
-
-                    if name.endswith(".stackPop") and len(args) == 0:
-                        stack_name = name.split(".")[0]
-                        return StackPop(stack_name)
-
-                    if name.endswith(".top") and len(args) == 0:
-                        stack_name = name.split(".")[0]
-                        return StackTop(stack_name)
-                    
-                    if name.endswith(".queuePush"):
-                        if len(args) != 1:
-                            raise ParseError(f"Queue push expects exactly 1 argument, got {len(args)}", last_token)
-                        queue_name = name.split(".")[0]
-                        return QueuePush(queue_name, args[0])
-
-                    if name.endswith(".queuePop") and len(args) == 0:
-                        queue_name = name.split(".")[0]
-                        return QueuePop(queue_name)
-
-                    if name.endswith(".first") and len(args) == 0:
-                        queue_name = name.split(".")[0]
-                        return QueueFirst(queue_name)
-                    
-                    # Check for stack operations
-                    # if name.endswith(".push"):
-                    #     if len(args) != 1:
-                    #         raise ParseError(f"Stack push expects exactly 1 argument, got {len(args)}")
-                    #     stack_name = name.split(".")[0]
-                    #     return StackPush(stack_name, args[0])
-                    # if name.endswith(".pop") and len(args) == 0:
-                    #     stack_name = name.split(".")[0]
-                    #     return StackPop(stack_name)
-                    # if name.endswith(".top") and len(args) == 0:
-                    #     stack_name = name.split(".")[0]
-                    #     return StackTop(stack_name)
-                    
-                    # Check for array operations
-                    if name.endswith(".append") and len(args) == 1:
-                        array_name = name.split(".")[0]
-                        return ArrayAppend(Variable(array_name), args[0])
-
-                    if name.endswith(".delete") and len(args) == 1:
-                        array_name = name.split(".")[0]
-                        return ArrayDelete(Variable(array_name), args[0])
-                    
-                    if name.endswith(".len"):
-                        array_name = name.split(".")[0]
-                        if len(args) != 0:
-                            raise ParseError("len function takes no arguments", t.peek())
-                        return ArrayLength(Variable(array_name))
-                    
-                    return FunctionCall(name, args)
-                case _:
-                    return parse_comparator()
+
+                if t.peek(None) == SymbolToken(","):
+                    next(t)
+                else:
+                    break
+            
+            # if next(t) != ParenthesisToken(")"):
+            #     raise ParseError("Expected ')' after function arguments", t.peek(None))
+
+            try:
+                closing = next(t)
+                if closing != ParenthesisToken(")"):
+                    raise ParseError("Expected ')' after function arguments", last_token)
+            except StopIteration:
+                # Fall back to the last meaningful token for location info
+                raise ParseError("Unexpected end of input, expected ')'", last_token)
+
+            last_token = t.peek(None)
+            # Checking queue operations
+            if name.endswith(".stackPush"):
+                if len(args) != 1:
+                    raise ParseError(f"Stack push expects exactly 1 argument, got {len(args)}", last_token)
+                stack_name = name.split(".")[0]
+                return StackPush(stack_name, args[0])
+
+            if name.endswith(".stackPop") and len(args) == 0:
+                stack_name = name.split(".")[0]
+                return StackPop(stack_name)
+
+            if name.endswith(".top") and len(args) == 0:
+                stack_name = name.split(".")[0]
+                return StackTop(stack_name)
+            
+            if name.endswith(".queuePush"):
+                if len(args) != 1:
+                    raise ParseError(f"Queue push expects exactly 1 argument, got {len(args)}", last_token)
+                queue_name = name.split(".")[0]
+                return QueuePush(queue_name, args[0])
+
+            if name.endswith(".queuePop") and len(args) == 0:
+                queue_name = name.split(".")[0]
+                return QueuePop(queue_name)
+
+            if name.endswith(".first") and len(args) == 0:
+                queue_name = name.split(".")[0]
+                return QueueFirst(queue_name)
+
+            if name.endswith(".heapPush"):
+                if len(args) != 1:
+                    raise ParseError(f"Heap push expects exactly 1 argument, got {len(args)}", last_token)
+                heap_name = name.split(".")[0]
+                return HeapPush(heap_name, args[0])
+
+            if name.endswith(".heapPop") and len(args) == 0:
+                heap_name = name.split(".")[0]
+                return HeapPop(heap_name)
+
+            if name.endswith(".heapTop") and len(args) == 0:
+                heap_name = name.split(".")[0]
+                return HeapTop(heap_name)
+
+            # Set operations: add/remove
+            if name.endswith(".add") or name.endswith(".remove"):
+                if len(args) != 1:
+                    raise ParseError(f"Set {name.rsplit('.', 1)[1]} expects exactly 1 argument, got {len(args)}", last_token)
+                set_name = name.split(".")[0]
+                return (SetAdd if name.endswith(".add") else SetRemove)(set_name, args[0])
+
+            # Set and hashmap lookups: contains, size, get, keys, values
+            if name.endswith(".contains"):
+                if len(args) != 1:
+                    raise ParseError(f"contains expects exactly 1 argument, got {len(args)}", last_token)
+                return Contains(Variable(name.split(".")[0]), args[0])
+
+            if name.endswith(".size"):
+                if len(args) != 0:
+                    raise ParseError("size function takes no arguments", t.peek())
+                return ArrayLength(Variable(name.split(".")[0]))
+
+            if name.endswith(".get"):
+                if len(args) != 2:
+                    raise ParseError(f"get expects 2 arguments (key, default), got {len(args)}", last_token)
+                return MapGet(Variable(name.split(".")[0]), *args)
+
+            if name.endswith(".keys") or name.endswith(".values"):
+                if len(args) != 0:
+                    raise ParseError(f"{name.rsplit('.', 1)[1]} function takes no arguments", t.peek())
+                return MapView(Variable(name.split(".")[0]), name.rsplit(".", 1)[1])
+
+            # Deque operations: pushFront/pushBack, popFront/popBack, front/back
+            if name.endswith(".pushFront") or name.endswith(".pushBack"):
+                if len(args) != 1:
+                    raise ParseError(f"Deque push expects exactly 1 argument, got {len(args)}", last_token)
+                deque_name = name.split(".")[0]
+                return DequePush(deque_name, "front" if name.endswith("Front") else "back", args[0])
+
+            if (name.endswith(".popFront") or name.endswith(".popBack")) and len(args) == 0:
+                deque_name = name.split(".")[0]
+                return DequePop(deque_name, "front" if name.endswith("Front") else "back")
+
+            if (name.endswith(".front") or name.endswith(".back")) and len(args) == 0:
+                deque_name = name.split(".")[0]
+                return DequePeek(deque_name, "front" if name.endswith("front") else "back")
+            
+            # Check for stack operations
+            # if name.endswith(".push"):
+            #     if len(args) != 1:
+            #         raise ParseError(f"Stack push expects exactly 1 argument, got {len(args)}")
+            #     stack_name = name.split(".")[0]
+            #     return StackPush(stack_name, args[0])
+            # if name.endswith(".pop") and len(args) == 0:
+            #     stack_name = name.split(".")[0]
+            #     return StackPop(stack_name)
+            # if name.endswith(".top") and len(args) == 0:
+            #     stack_name = name.split(".")[0]
+            #     return StackTop(stack_name)
+            
+            # Check for array operations
+            if name.endswith(".append") and len(args) == 1:
+                array_name = name.split(".")[0]
+                return ArrayAppend(Variable(array_name), args[0])
+
+            if name.endswith(".delete") and len(args) == 1:
+                array_name = name.split(".")[0]
+                return ArrayDelete(Variable(array_name), args[0])
+            
+            if name.endswith(".len"):
+                array_name = name.split(".")[0]
+                if len(args) != 0:
+                    raise ParseError("len function takes no arguments", t.peek())
+                return ArrayLength(Variable(array_name))
+
+            if name.endswith((".sum", ".min", ".max")):
+                array_name, method = name.split(".")[0], name.rsplit(".", 1)[1]
+                if len(args) != 0:
+                    raise ParseError(f"{method} function takes no arguments", t.peek())
+                return ArrayReduce(Variable(array_name), method)
+
+            if name.endswith((".sort", ".sort_desc", ".reverse")):
+                array_name, method = name.split(".")[0], name.rsplit(".", 1)[1]
+                if len(args) != 0:
+                    raise ParseError(f"{method} function takes no arguments", t.peek())
+                return ArrayReorder(Variable(array_name), method)
+
+            if name.endswith((".lower_bound", ".upper_bound")):
+                array_name, method = name.split(".")[0], name.rsplit(".", 1)[1]
+                if len(args) != 1:
+                    raise ParseError(f"{method} expects exactly 1 argument, got {len(args)}", last_token)
+                return ArraySearch(Variable(array_name), args[0], method)
+
+            if name.endswith(".fill"):
+                if len(args) != 1:
+                    raise ParseError(f"fill expects exactly 1 argument, got {len(args)}", last_token)
+                array_name = name.split(".")[0]
+                return ArrayFill(Variable(array_name), args[0])
+            
+            return FunctionCall(name, args)
         except ParseError as e:
             raise e
 
@@ -467,7 +852,7 @@ def parse(s: str) -> AST:
         values = []
         while t.peek(None) and  t.peek(None).val != ")":
             
-            values.append(parse_comparator())  # Always use parse_comparator to handle full expressions
+            values.append(parse_expression())  # Always use parse_comparator to handle full expressions
             if t.peek(None) == SymbolToken(","):
                 next(t)  # Consume ','
             else:
@@ -491,7 +876,7 @@ def parse(s: str) -> AST:
 
                     next(t) 
                     
-                    condition = parse_comparator()
+                    condition = parse_expression()
                     
 
                     closing_paren = next(t, None)  
@@ -518,7 +903,7 @@ def parse(s: str) -> AST:
                             raise ParseError("Expected '(' after elif keyword", t.peek())
 
                         next(t) 
-                        elif_condition = parse_comparator()
+                        elif_condition = parse_expression()
 
                         closing_paren = next(t, None)  
                         if not isinstance(closing_paren, ParenthesisToken) or closing_paren.val != ')':
@@ -566,7 +951,7 @@ def parse(s: str) -> AST:
                                 case _:
                                     raise ParseError("Expected ';' after for-loop initialization", t.peek())
 
-                            condition = parse_comparator()  # Parse condition (e.g., i < 10)
+                            condition = parse_expression()  # Parse condition (e.g., i < 10)
 
                             match next(t, None):
                                 case SymbolToken(';'):
@@ -603,7 +988,7 @@ def parse(s: str) -> AST:
                     match t.peek(None):
                         case ParenthesisToken('('):
                             next(t)
-                            condition = parse_comparator()
+                            condition = parse_expression()
                             match next(t, None):
                                 case ParenthesisToken(')'):
                                     pass
@@ -692,7 +1077,7 @@ def parse(s: str) -> AST:
     def parse_assignment():
         try:
             # not a variable ⇒ let declaration / general expression handle it
-            if not isinstance(t.peek(None), VariableToken):
+            if not isinstance(t.peek(None), VariableToken) or container_declaration():
                 return parse_declaration()
 
             # 1) consume the variable name
@@ -705,7 +1090,7 @@ def parse(s: str) -> AST:
             while t.peek(None) == ParenthesisToken('['):
                 has_index = True
                 next(t)                             # '['
-                idx_ast = parse_comparator()
+                idx_ast = parse_expression()
                 if next(t) != ParenthesisToken(']'):
                     raise ParseError("Expected ']' after array index", t.peek())
                 node = ArrayAccess(node, idx_ast)
@@ -725,7 +1110,7 @@ def parse(s: str) -> AST:
                         raise ParseError("Expected empty spill()", t.peek())
                     rhs_ast = Input()
                 else:
-                    rhs_ast = parse_comparator()
+                    rhs_ast = parse_expression()
 
                 if has_index:                       # arr[i][j] = …
                     return ArrayAssignment(node, None, rhs_ast)
@@ -738,25 +1123,22 @@ def parse(s: str) -> AST:
                 if not isinstance(t.peek(None), VariableToken):
                     raise ParseError("Expected method name after '.'", t.peek())
                 method = next(t).val
-                if method not in METHODS:           # {"append","delete","len"}
+                if method not in METHODS:
                     raise ParseError(f"Unknown method '{method}'", t.peek())
                 if next(t) != ParenthesisToken('('):
                     raise ParseError("Expected '(' after method", t.peek())
 
                 arg = None
-                if method in {"append", "delete"}:
-                    arg = parse_comparator()
+                if method in METHOD_ARGS:
+                    arg = parse_expression()
                 if next(t) != ParenthesisToken(')'):
                     raise ParseError("Expected ')' after method call", t.peek())
 
-                node = (ArrayAppend(node, arg)  if method == "append" else
-                        ArrayDelete(node, arg)  if method == "delete" else
-                        ArrayLength(node))
+                node = array_method(node, method, arg)
 
             # optional plain function call (only if no “[ … ]” used)
             if not has_index and t.peek(None) == ParenthesisToken('('):
-                t.prepend(VariableToken(var_name))
-                return parse_function_call()
+                return parse_call(var_name)
 
             return node                              # expression head
 
@@ -789,6 +1171,88 @@ def parse(s: str) -> AST:
                     
                     return QueueDeclaration(element_type, queue_name)
                 
+                case VariableToken("heap") if container_declaration():
+                    next(t)  # Consume 'heap'
+                    if t.peek(None) != OperatorToken('<'):
+                        raise ParseError("Expected '<' after 'heap'", t.peek())
+                    next(t)  # Consume '<'
+                    if not isinstance(t.peek(None), TypeToken):
+                        raise ParseError("Expected type after '<'", t.peek())
+                    element_type = next(t).val
+                    while isinstance(t.peek(None), ParenthesisToken) and t.peek(None).val == '[':
+                        next(t)  # consume '['
+                        if next(t) != ParenthesisToken(']'):
+                            raise ParseError("Expected ']' after '[' in array type", t.peek())
+                        element_type += "[]"
+
+                    # heap<int, max> pops the largest element first
+                    order = "min"
+                    if t.peek(None) == SymbolToken(','):
+                        next(t)  # Consume ','
+                        if t.peek(None) not in (VariableToken("min"), VariableToken("max")):
+                            raise ParseError("Expected 'min' or 'max' after ',' in heap type", t.peek())
+                        order = next(t).val
+
+                    if t.peek(None) != OperatorToken('>'):
+                        raise ParseError("Expected '>' after heap element type", t.peek())
+                    next(t)
+
+                    if not isinstance(t.peek(None), VariableToken):
+                        raise ParseError("Expected heap name after '>'", t.peek())
+                    heap_name = next(t).val
+                    if heap_name in keywords:
+                        raise InvalidVariableNameError(heap_name)
+                    if t.peek(None) != SymbolToken(";"):
+                        raise ParseError("Expected ';' after heap declaration", t.peek())
+
+                    return HeapDeclaration(element_type, heap_name, order)
+
+                case VariableToken("set") if container_declaration():
+                    next(t)  # Consume 'set'
+                    if t.peek(None) != OperatorToken('<'):
+                        raise ParseError("Expected '<' after 'set'", t.peek())
+                    next(t)  # Consume '<'
+                    if not isinstance(t.peek(None), TypeToken):
+                        raise ParseError("Expected type after '<'", t.peek())
+                    element_type = next(t).val
+
+                    if t.peek(None) != OperatorToken('>'):
+                        raise ParseError("Expected '>' after set element type", t.peek())
+                    next(t)
+
+                    if not isinstance(t.peek(None), VariableToken):
+                        raise ParseError("Expected set name after '>'", t.peek())
+                    set_name = next(t).val
+                    if set_name in keywords:
+                        raise InvalidVariableNameError(set_name)
+                    if t.peek(None) != SymbolToken(";"):
+                        raise ParseError("Expected ';' after set declaration", t.peek())
+
+                    return SetDeclaration(element_type, set_name)
+
+                case VariableToken("deque") if container_declaration():
+                    next(t)  # Consume 'deque'
+                    if t.peek(None) != OperatorToken('<'):
+                        raise ParseError("Expected '<' after 'deque'", t.peek())
+                    next(t)  # Consume '<'
+                    if not isinstance(t.peek(None), TypeToken):
+                        raise ParseError("Expected type after '<'", t.peek())
+                    element_type = next(t).val
+
+                    if t.peek(None) != OperatorToken('>'):
+                        raise ParseError("Expected '>' after deque element type", t.peek())
+                    next(t)
+
+                    if not isinstance(t.peek(None), VariableToken):
+                        raise ParseError("Expected deque name after '>'", t.peek())
+                    deque_name = next(t).val
+                    if deque_name in keywords:
+                        raise InvalidVariableNameError(deque_name)
+                    if t.peek(None) != SymbolToken(";"):
+                        raise ParseError("Expected ';' after deque declaration", t.peek())
+
+                    return DequeDeclaration(element_type, deque_name)
+
                 case KeywordToken("stack"):
                      next(t)  # Consume 'stack'
                      if t.peek(None) != OperatorToken('<'):
@@ -877,12 +1341,12 @@ def parse(s: str) -> AST:
                                                 if not isinstance(t.peek(None), ParenthesisToken) or t.peek(None).val != ')':
                                                     raise ParseError("Expected ')' after input", t.peek())
                                                 next(t) 
-                                                return Declaration(var_type, var_name, Input())
-                                            value = parse_comparator()
+                                                return Declaration(var_type, var_name, Input(var_type))
+                                            value = parse_expression()
                                             # **FIX: Ensure arr[0] is parsed as ArrayAccess**
                                             if isinstance(value, Variable) and t.peek(None) == ParenthesisToken('['):
                                                 next(t)
-                                                index = parse_comparator()
+                                                index = parse_expression()
                                                 if next(t) != ParenthesisToken(']'):
                                                     raise ParseError("Expected ']' after array index", t.peek())
                                                 value = ArrayAccess(value, index)  # Convert to ArrayAccess node
@@ -892,7 +1356,7 @@ def parse(s: str) -> AST:
                                             next(t)
                                             elements = []
                                             while t.peek(None) and not (isinstance(t.peek(None), ParenthesisToken) and t.peek(None).val == "]"):
-                                                elements.append(parse_comparator())
+                                                elements.append(parse_expression())
                                                 if t.peek(None) == SymbolToken(","):
                                                     next(t)
                                                 else:
@@ -918,146 +1382,116 @@ def parse(s: str) -> AST:
                                         match t.peek(None):
                                             case OperatorToken('='):
                                                 next(t)
-                                                value = parse_comparator()
-                                                return Declaration(var_type + "[]" * array_depth, var_name, value)
+                                                array_type = var_type + "[]" * array_depth
+                                                if t.peek(None) == KeywordToken("spill"):
+                                                    # int[] xs = spill(); reads a line of words
+                                                    next(t)
+                                                    if next(t) != ParenthesisToken('(') or next(t) != ParenthesisToken(')'):
+                                                        raise ParseError("Expected empty spill()", t.peek())
+                                                    return Declaration(array_type, var_name, Input(array_type))
+                                                value = parse_expression()
+                                                return Declaration(array_type, var_name, value)
                                             case _:
                                                 raise ParseError("Expected '=' after array variable name", t.peek())
                                     case _:
                                         raise ParseError("Expected variable name after array type", t.peek())
 
                 case _:
-                    return parse_comparator()
+                    return parse_expression()
         except ParseError as e:
             raise e
         
-    def parse_comparator():
-        try:
-            ast = parse_add()
-            while True:
-                match t.peek(None):
-                    case OperatorToken(op):
-                        if op in {"and", "or"}:  # added <=, >= and !=
-                            next(t)
-                            ast = BinOp(op, ast, parse_add())
-                        elif op in {"not"}:
-                            next(t)
-                            ast = BinOp(op, None, parse_add())
-                        elif op in {"<", ">", "<=", ">=", "==", "!="}:
-                            next(t)
-                            ast = BinOp(op, ast, parse_add())
-                        elif op == "&":  # Bitwise AND
-                            next(t)
-                            ast = BinOp("&", ast, parse_add())
-                        elif op == "|":  # Bitwise OR
-                            next(t)
-                            ast = BinOp("|", ast, parse_add())
-                        elif op == "~~":  # Bitwise NOT (unary)
-                            next(t)
-                            ast = BinOp("~~", None, parse_add())  # Unary operator
-                        else:
-                            raise InvalidOperationError(str(op), "comparison")
-                    case _:
-                        return ast
-        except ParseError as e:
-            raise e
-
-    def parse_add():
-        try:
-            ast = parse_sub()
-            while True:
-                match t.peek(None):
-                    case OperatorToken('+'):
-                        next(t)
-                        ast = BinOp('+', ast, parse_sub())
-                    case _:
-                        return ast
-        except ParseError as e:
-            raise e
-
-    def parse_sub():
-        try:
-            ast = parse_mod()
-            while True:
-                match t.peek(None):
-                    case OperatorToken('-'):
-                        next(t)
-                        ast = BinOp('-', ast, parse_mod())
-                    case _:
-                        return ast
-        except ParseError as e:
-            raise e
-
-    def parse_mod():
-        try:
-            ast = parse_mul()
-            while True:
-                match t.peek(None):
-                    case OperatorToken('%'):
-                        next(t)
-                        ast = BinOp('%', ast, parse_mul())
-                    case _:
-                        return ast
-        except ParseError as e:
-            raise e
-
-    def parse_mul():
-        try:
-            ast = parse_div()
-            while True:
-                match t.peek(None):
-                    case OperatorToken('*'):
-                        next(t)
-                        ast = BinOp('*', ast, parse_div())
-                    case _:
-                        return ast
-        except ParseError as e:
-            raise e
-
-    def parse_div():
-        try:
-            ast = parse_modulo()  
-            while True:
-                match t.peek(None):
-                    case OperatorToken('/'):
-                        next(t)
-                        ast = BinOp('/', ast, parse_modulo()) 
-                    case OperatorToken('//'):
-                        next(t)
-                        ast = BinOp('//', ast, parse_modulo())
-                    case _:
-                        return ast
-        except ParseError as e:
-            raise e
-
-    def parse_modulo():
-        try:
-            ast = parse_exponent()
-            
-            while True:
-                match t.peek(None):
-                    case OperatorToken('%'):
-                        next(t)
-                        ast = BinOp('%', ast, parse_exponent())  
-                        
-                    case _:
-                        return ast
-        except ParseError as e:
-            raise e
+    def parse_expression():
+        # Operator-precedence parser driven by BINARY_OPERATORS.  Operands and
+        # pending operators live on explicit stacks, so neither long operator
+        # chains nor deeply nested parentheses recurse.
+        operands = []
+        operators = []      # (kind, op, power, operand count when a group opened)
+
+        def apply(entry):
+            kind, op = entry[0], entry[1]
+            if kind == BINARY:
+                right = operands.pop()
+                left = operands.pop()
+                operands.append(BinOp(op, None if op in DISCARDS_LEFT else left, right))
+            elif op == '~':
+                operands.append(BinOp('*', Number('-1'), operands.pop()))
+            else:
+                operands.append(BinOp(op, None, operands.pop()))
 
+        def apply_prefixes():
+            # prefix operators bind to the operand right after them
+            while operators and operators[-1][0] == PREFIX:
+                apply(operators.pop())
 
-    def parse_exponent():
-        try:
-            ast = parse_atom()
-            while True:
-                match t.peek(None):
-                    case OperatorToken('^'):
-                        next(t)
-                        ast = BinOp('^', ast, parse_exponent())
-                    case _:
-                        return ast
-        except ParseError as e:
-            print(e)
-            return None        
+        open_groups = 0
+        while True:
+            # ---- operand position -----------------------------------------
+            code = t.code()
+            if code in PREFIX_CODES:
+                t.pos += 1
+                operators.append((PREFIX, PREFIX_CODES[code], 0, 0))
+                continue
+            if code == LPAREN:
+                t.pos += 1
+                operators.append((GROUP, '(', 0, len(operands)))
+                open_groups += 1
+                continue
+
+            # plain literals and variables skip parse_atom's pattern match
+            kind = code & 15
+            if kind in SIMPLE_OPERANDS and (kind != VARIABLE or t.code(1) not in VARIABLE_SUFFIXES):
+                t.pos += 1
+                operands.append(SIMPLE_OPERANDS[kind](t.strings[code >> 4]))
+            else:
+                try:
+                    operands.append(parse_atom())
+                except ParseError as e:
+                    # a bad operand, together with its prefixes, becomes None
+                    print(e)
+                    while operators and operators[-1][0] == PREFIX:
+                        operators.pop()
+                    operands.append(None)
+            apply_prefixes()
+
+            # ---- operator position ----------------------------------------
+            while open_groups:
+                code = t.code()
+                closing = code == RPAREN
+                if not closing and code & 15 == OPERATOR:
+                    break
+                next(t, None)
+                while operators[-1][0] != GROUP:
+                    apply(operators.pop())
+                group = operators.pop()
+                open_groups -= 1
+                if closing:
+                    operands.append(Parenthesis(operands.pop()))
+                else:
+                    # unclosed group: report it and use None in its place
+                    print(ParseError("Expected ')' after expression", t.peek(None)))
+                    del operands[group[3]:]
+                    while operators and operators[-1][0] == PREFIX:
+                        operators.pop()
+                    operands.append(None)
+                apply_prefixes()
+
+            code = t.code()
+            if code & 15 != OPERATOR:
+                break
+            entry = BINARY_CODES.get(code)
+            if entry is None:
+                raise InvalidOperationError(t.strings[code >> 4], "comparison")
+            op, power, right_assoc = entry
+            while (operators and operators[-1][0] == BINARY
+                   and (operators[-1][2] > power or (operators[-1][2] == power and not right_assoc))):
+                apply(operators.pop())
+            t.pos += 1
+            operators.append((BINARY, op, power, 0))
+
+        while operators:
+            apply(operators.pop())
+        return operands[0]
 
     def parse_atom():
         try:
@@ -1078,6 +1512,35 @@ def parse(s: str) -> AST:
                         raise ParseError("Expected ')' after concat args", t.peek())
                     return Concat(left, right)
 
+                # ---------------------------------------------------------
+                #  matrix(rows, cols, fill)
+                # ---------------------------------------------------------
+                case VariableToken('matrix') if t.peek(None, 1) == ParenthesisToken('('):
+                    next(t)
+                    if next(t) != ParenthesisToken('('):
+                        raise ParseError("Expected '(' after 'matrix'", t.peek())
+                    args = [parse_expression()]
+                    while t.peek(None) == SymbolToken(','):
+                        next(t)
+                        args.append(parse_expression())
+                    if next(t) != ParenthesisToken(')'):
+                        raise ParseError("Expected ')' after matrix arguments", t.peek())
+                    if len(args) != 3:
+                        raise ParseError(f"matrix() expects 3 arguments (rows, columns, fill), got {len(args)}", t.peek())
+                    return NewMatrix(*args)
+
+                # ---------------------------------------------------------
+                #  range(n)
+                # ---------------------------------------------------------
+                case VariableToken('range') if t.peek(None, 1) == ParenthesisToken('('):
+                    next(t)
+                    if next(t) != ParenthesisToken('('):
+                        raise ParseError("Expected '(' after 'range'", t.peek())
+                    count = parse_expression()
+                    if next(t) != ParenthesisToken(')'):
+                        raise ParseError("Expected ')' after range size", t.peek())
+                    return NewRange(count)
+
                 # ---------------------------------------------------------
                 #  unary operators:  not  ~~  ~
                 # ---------------------------------------------------------
@@ -1103,7 +1566,7 @@ def parse(s: str) -> AST:
                     # one or more “[ index ]” -> ArrayAccess chain
                     while t.peek(None) == ParenthesisToken('['):
                         next(t)                            # '['
-                        idx = parse_comparator()
+                        idx = parse_expression()
                         if next(t) != ParenthesisToken(']'):
                             raise ParseError("Expected ']' after array index", t.peek())
                         node = ArrayAccess(node, idx)
@@ -1115,28 +1578,25 @@ def parse(s: str) -> AST:
                             raise ParseError("Expected method name after '.'", t.peek())
                         method = next(t).val
 
-                        if method not in METHODS:          # {"append","delete","len"}
+                        if method not in METHODS:
                             raise ParseError(f"Unknown method '{method}'", t.peek())
 
                         if next(t) != ParenthesisToken('('):
                             raise ParseError("Expected '(' after method name", t.peek())
 
                         arg = None
-                        if method in {"append", "delete"}: # need exactly one argument
-                            arg = parse_comparator()
+                        if method in METHOD_ARGS:          # need exactly one argument
+                            arg = parse_expression()
 
                         if next(t) != ParenthesisToken(')'):
                             raise ParseError("Expected ')' after method call", t.peek())
 
                         # build the new AST node and continue (method chaining allowed)
-                        node = (ArrayAppend(node, arg)  if method == "append" else
-                                ArrayDelete(node, arg)  if method == "delete" else
-                                ArrayLength(node))      # len()
+                        node = array_method(node, method, arg)
 
                     # a normal function call that immediately follows the variable
                     if t.peek(None) == ParenthesisToken('('):
-                        t.prepend(VariableToken(v))
-                        return parse_function_call()
+                        return parse_call(v)
 
                     return node
 
@@ -1153,7 +1613,7 @@ def parse(s: str) -> AST:
 
                 case ParenthesisToken('('):
                     next(t)
-                    expr = parse_comparator()
+                    expr = parse_expression()
                     if next(t) != ParenthesisToken(')'):
                         raise ParseError("Expected ')' after expression", t.peek())
                     return Parenthesis(expr)
@@ -1166,7 +1626,7 @@ def parse(s: str) -> AST:
                     next(t)
                     elements = []
                     while t.peek(None) and not (isinstance(t.peek(None), ParenthesisToken) and t.peek(None).val == "]"):
-                        elements.append(parse_comparator())
+                        elements.append(parse_expression())
                         if t.peek(None) == SymbolToken(','):
                             next(t)
                         else:
@@ -1184,7 +1644,10 @@ def parse(s: str) -> AST:
         except ParseError as e:
             raise e
 
-    return parse_sequence()
+    # every consumer of the tree works from resolved variable slots
+    # (resolver.py imports this module, hence the late import)
+    from resolver import resolve
+    return resolve(parse_sequence())
 
 
 
@@ -0,0 +1,127 @@
+# Description: Static name resolution
+#
+# Runs once after parsing and records on every node that names a variable
+# where that variable lives: `depth` is 0 for globals and n inside a function
+# nested n deep, and `slot` is its index in that scope.  Every Function also
+# gets its `frame_size` and the outer variables it `copies` into its frame.
+#
+# A function's locals are its parameters (slots 0 .. n-1) followed by every
+# name its body declares or assigns.  Variables of outer scopes are read-only
+# inside a function, so a local that is also visible outside starts out as a
+# copy of the outer value when the function is called.
+
+from parser import *
+
+# Nodes that bind a name in the scope they run in
+BINDINGS = (Declaration, Assignment, Function, HashMap, StackDeclaration, QueueDeclaration,
+            DequeDeclaration, HeapDeclaration, SetDeclaration)
+
+# Nodes that name a variable, and the field holding the name
+NAME_FIELDS = {
+    Variable: "val",
+    Declaration: "name",
+    Assignment: "name",
+    Function: "name",
+    FunctionCall: "name",
+    HashMap: "name",
+    StackDeclaration: "name",
+    StackPush: "stack_name",
+    StackPop: "stack_name",
+    StackTop: "stack_name",
+    QueueDeclaration: "name",
+    QueuePush: "queue_name",
+    QueuePop: "queue_name",
+    QueueFirst: "queue_name",
+    DequeDeclaration: "name",
+    DequePush: "deque_name",
+    DequePop: "deque_name",
+    DequePeek: "deque_name",
+    HeapDeclaration: "name",
+    HeapPush: "heap_name",
+    HeapPop: "heap_name",
+    HeapTop: "heap_name",
+    SetDeclaration: "name",
+    SetAdd: "set_name",
+    SetRemove: "set_name",
+}
+
+
+def _children(node):
+    """Direct child nodes, in field order"""
+    out = []
+    stack = [getattr(node, name) for name in reversed(node.__match_args__)]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, AST):
+            out.append(value)
+        elif isinstance(value, (list, tuple)):
+            stack.extend(reversed(value))
+    return out
+
+
+class Scope:
+    __slots__ = ("depth", "slots")
+
+    def __init__(self, depth):
+        self.depth = depth
+        self.slots = {}  # name -> slot
+
+    def bind(self, name):
+        return self.slots.setdefault(name, len(self.slots))
+
+    def bind_all(self, body):
+        """Give a slot to every name `body` binds, in source order.  Nested
+        functions bind their own name here but keep their bodies to themselves.
+        """
+        stack = [body] if body is not None else []
+        while stack:
+            node = stack.pop()
+            if isinstance(node, BINDINGS):
+                self.bind(node.name)
+            if not isinstance(node, Function):
+                stack.extend(reversed(_children(node)))
+
+
+def _lookup(name, scopes):
+    """(depth, slot) of `name` seen from the innermost of `scopes`.  Names
+    bound nowhere are left to a global lookup by name at run time.
+    """
+    for scope in reversed(scopes):
+        slot = scope.slots.get(name)
+        if slot is not None:
+            return scope.depth, slot
+    return 0, None
+
+
+def resolve(tree):
+    """Annotate `tree` in place and return it"""
+    if tree is None:
+        return tree
+    top = Scope(0)
+    top.bind_all(tree)
+
+    # explicit stack, so deeply nested expressions do not hit the recursion limit
+    stack = [(tree, (top,))]
+    while stack:
+        node, scopes = stack.pop()
+        field_name = NAME_FIELDS.get(type(node))
+        if field_name is not None:
+            node.depth, node.slot = _lookup(getattr(node, field_name), scopes)
+        if isinstance(node, Function):
+            scope = Scope(len(scopes))
+            for _, param_name in node.params:
+                scope.bind(param_name)
+            params = len(scope.slots)
+            scope.bind_all(node.body)
+            node.frame_size = len(scope.slots)
+            node.copies = []
+            for name, slot in scope.slots.items():
+                if slot >= params:
+                    depth, outer = _lookup(name, scopes)
+                    if outer is not None:
+                        node.copies.append((slot, depth, outer, name))
+            if node.body is not None:
+                stack.append((node.body, scopes + (scope,)))
+        else:
+            stack.extend((child, scopes) for child in reversed(_children(node)))
+    return tree
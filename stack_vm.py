@@ -1,230 +1,395 @@
-def get_true_val(word):
-    if isinstance(word, str):
-        if word.count('.') == 1:
-            parts = word.split('.')
-            if len(parts) == 2 and all(part.lstrip('-').isdigit() for part in parts):
-                return float(word)
-        elif word.lstrip('-').isdigit():
-            return int(word)
-    return word
-
-
-class StackVM:
-    def __init__(self, instructions, function_table):
-        self.instructions = instructions
-        self.stack = []
-        self.env_stack = [[None] * 16]  # Start with one scope of 16 slots
-        self.call_stack = []
-        self.labels = self._map_labels()
-        self.pc = 0
-        self.print_buffer = []
-        self.function_table = function_table
-        # print(function_table)
-        
-    def _map_labels(self):
-        labels = {}
-        for i, instr in enumerate(self.instructions):
-            if isinstance(instr, tuple) and len(instr) == 1 and isinstance(instr[0], str) and instr[0].endswith("::"):
-                label = instr[0][:-2]  # Remove the "::"
-                labels[label] = i + 1  # Point to the next instruction
-        # print("labels", labels)
-        return labels
-
-
-
-    def push_env(self, size=16):
-        self.env_stack.append([None] * size)
-
-    def pop_env(self):
-        self.env_stack.pop()
-
-    def set_var(self, index, value):
-        self.env_stack[-1][index] = value
-
-    def get_var(self, index):
-        return self.env_stack[-1][index]
-
-    def run(self):
-        while self.pc < len(self.instructions):
-            instr = self.instructions[self.pc]
-            # print(instr)
-            if isinstance(instr[0], str) and instr[0].endswith("::"):
-                self.pc += 1
-                continue
-
-            count, instr_name, op = instr[0]
-            args = instr[1]
-
-            if op == 0x01:  # PUSH
-                self.stack.append(get_true_val(args[0]))
-
-            elif op == 0x02:  # POP
-                self.stack.pop()
-
-            elif op == 0x18:  # DUP
-                self.stack.append(self.stack[-1])
-
-            elif op == 0x04:  # ADD
-                b, a = self.stack.pop(), self.stack.pop()
-                self.stack.append(a + b)
-
-            elif op == 0x05:  # SUB
-                b, a = self.stack.pop(), self.stack.pop()
-                self.stack.append(a - b)
-
-            elif op == 0x06:  # MUL
-                b, a = self.stack.pop(), self.stack.pop()
-                self.stack.append(a * b)
-
-            elif op == 0x07:  # DIV
-                b, a = self.stack.pop(), self.stack.pop()
-                self.stack.append(a / b)
-
-            elif op == 0x09:  # NEG
-                self.stack.append(-self.stack.pop())
-
-            elif op == 0x08:  # POW
-                b, a = self.stack.pop(), self.stack.pop()
-                self.stack.append(a ** b)
-            elif op == 0x16: #MODULO
-                b, a = self.stack.pop(), self.stack.pop()
-                self.stack.append(a % b)
-            elif op == 0x21: #Floor division
-                b, a = self.stack.pop(), self.stack.pop()
-                self.stack.append(a // b)
-            elif op == 0x17: #LNOT
-                curr = self.stack.pop()
-                if curr == "nocap":
-                    self.stack.append("cap")
-                else:
-                    self.stack.append("nocap")
-            elif op == 0x0C:  # CMP_EQ
-                b, a = self.stack.pop(), self.stack.pop()
-                if (a==b):
-                   self.stack.append("nocap")
-                else:
-                    self.stack.append("cap")
-
-            elif op == 0x0A:  # CMP_LT
-                b, a = self.stack.pop(), self.stack.pop()
-                if (a<b):
-                   self.stack.append("nocap")
-                else:
-                    self.stack.append("cap")
-
-            elif op == 0x0B:  # CMP_GT
-                b, a = self.stack.pop(), self.stack.pop()
-                if (a>b):
-                   self.stack.append("nocap")
-                else:
-                    self.stack.append("cap")
-            elif op == 0x0D:  # CMP_NEQ
-                b, a = self.stack.pop(), self.stack.pop()
-                if (a!=b):
-                   self.stack.append("nocap")
-                else:
-                    self.stack.append("cap")
-                
-            elif op == 0x1B:  # LOAD
-                index = args[0]
-                self.stack.append(self.get_var(index))
-
-            elif op == 0x03:  # STORE
-                index = args[0]
-                self.set_var(index, self.stack.pop())
-
-            elif op == 0x0E:  # JMP
-                self.pc = self.labels[args[0]]
-                continue
-
-            elif op == 0x0F:  # JZ
-                if self.stack.pop() == "cap":
-                    self.pc = self.labels[args[0]]
-                    continue
-
-            elif op == 0x10:  # JNZ
-                if self.stack.pop() != "cap":
-                    self.pc = self.labels[args[0]]
-                    continue
-
-            elif op == 0x11:  # CALL
-                func_name = args[0]
-                func_data = self.function_table[func_name]
-                func_label = func_data['label']
-                param_count = len(func_data['params'])
-
-                # Extract arguments from stack (in reverse order)
-                args_for_func = [self.stack.pop() for _ in range(param_count)][::-1]
-
-                self.call_stack.append(self.pc + 1)
-                self.push_env()
-
-                # Store args in new scope
-                for i, val in enumerate(args_for_func):
-                    self.set_var(i, val)
-
-                self.pc = self.labels[func_label]
-                continue
-
-            elif op == 0x12:  # RETURN
-                self.pop_env()
-                self.pc = self.call_stack.pop()
-                continue
-
-            elif op == 0x13:  # PRINT
-                val=self.stack.pop()
-                if isinstance(val, (int, float)) and val < 0:
-                    self.print_buffer.append("~" + str(abs(val)))
-                else:
-                    self.print_buffer.append(str(val))
-                
-            elif op == 0x19: #INPUT
-                user_input = input()
-                self.stack.append(get_true_val(user_input))
-            
-            elif op == 0x1A:  # EXIT
-                break
-            
-            elif op == 0x1C: #CREATE_LIST
-                leng = args[0]
-                arr =[]
-                for _ in range(leng):
-                    arr.append(self.stack.pop())
-                self.stack.append(arr[::-1])
-             
-            elif op == 0x1D:  #LOAD_INDEX
-                index = self.stack.pop()
-                arr = self.get_var(args[0])
-                self.stack.append(arr[index]) 
-            
-            elif op == 0x1E:  #STORE_INDEX
-                val = self.stack.pop()
-                index = self.stack.pop()
-                arr = self.get_var(args[0])
-                arr[index]=val 
-                self.set_var(args[0], arr)
-            
-            elif op == 0x1F:  #APPEND_INDEX
-                val = self.stack.pop()
-                arr = self.get_var(args[0])
-                arr.append(val )
-                self.set_var(args[0], arr)
-            
-            elif op == 0x20:  #DELETE_INDEX
-                index = self.stack.pop()
-                arr = self.get_var(args[0])
-                del arr[index]
-                self.set_var(args[0], arr)
-                     
-            elif op == 0x15: #NEWLINE
-                print(' '.join(self.print_buffer))
-                self.print_buffer.clear()
-            
-            elif op== 0x22: #NEWHASH
-                self.stack.append({})
-                
-            elif op ==0x23: #LEN
-                arr = self.get_var(args[0])
-                self.stack.append(len(arr))            
-                   
-            self.pc += 1
+from yapio import output, reader, read_value
+from arrays import Matrix, TypedArray, ARRAYS, fill_array, new_range, elementwise, sort_array, reverse_array, REDUCTIONS, SEARCHES
+import operator
+import yapb
+from yapb import assemble, WIDTHS
+
+BOOLEANS = {"nocap": True, "cap": False}
+
+# Instructions that never fall through to the next one: JMP, RETURN, EXIT
+BLOCK_ENDS = {0x0E, 0x12, 0x1A}
+
+# Binary opcodes that are one call of an operator function
+BINARY = {
+    0x05: operator.sub,       # SUB
+    0x07: operator.truediv,   # DIV
+    0x08: operator.pow,       # POW
+    0x16: operator.mod,       # MOD
+    0x21: operator.floordiv,  # FLR_DIV
+    0x0A: operator.lt,        # CMP_LT
+    0x0B: operator.gt,        # CMP_GT
+    0x0C: operator.eq,        # CMP_EQ
+    0x0D: operator.ne,        # CMP_NEQ
+}
+
+def get_true_val(word):
+    if isinstance(word, str):
+        if word in BOOLEANS:
+            return BOOLEANS[word]
+        if word.count('.') == 1:
+            parts = word.split('.')
+            if len(parts) == 2 and all(part.lstrip('-').isdigit() for part in parts):
+                return float(word)
+        elif word.lstrip('-').isdigit():
+            return int(word)
+    return word
+
+
+class StackVM:
+    def __init__(self, instructions, function_table, constants):
+        """VM for linked `instructions` from AssemblyGenerator; they are
+        assembled into code words first (see yapb.py)"""
+        self.boot(*assemble(instructions, function_table, constants))
+
+    @classmethod
+    def load(cls, path):
+        """VM for a .yapb file, running its code section in place"""
+        vm = cls.__new__(cls)
+        vm.boot(*yapb.load(path))
+        return vm
+
+    def boot(self, code, function_table, constants):
+        self.code = code
+        self.program = [None] * len(code)  # handler at each instruction's offset, made by `thread`
+        self.constants = constants
+        self.stack = []
+        self.env_stack = [[None] * 16]  # Start with one scope of 16 slots
+        self.call_stack = []
+        self.pc = 0
+        self.print_buffer = []
+        self.function_table = function_table
+
+    def push_env(self, size=16):
+        self.env_stack.append([None] * size)
+
+    def pop_env(self):
+        self.env_stack.pop()
+
+    def set_var(self, index, value):
+        self.env_stack[-1][index] = value
+
+    def get_var(self, index):
+        return self.env_stack[-1][index]
+
+    def run(self):
+        """Execute the program, then flush whatever it printed"""
+        try:
+            self.execute()
+        finally:
+            output.flush()
+
+    def execute(self):
+        """Run the code direct-threaded: every instruction is a closure that
+        does its work on the current frame and returns the offset of the
+        next one, so dispatch is one list index and one call.  CALL and
+        RETURN return ~offset to tell the loop that the frame changed.
+
+        Closures are made lazily: reaching an instruction that has none yet
+        fails the call on None, and `thread` fills in its basic block.
+        """
+        program = self.program
+        frames = self.env_stack
+        frame = frames[-1]
+        pc = self.pc
+        end = len(program)
+        while True:
+            try:
+                while pc < end:
+                    pc = program[pc](frame)
+                    if pc < 0:
+                        pc = ~pc
+                        frame = frames[-1]
+                break
+            except TypeError:
+                if program[pc] is not None:
+                    raise  # the instruction itself failed
+                self.thread(pc)
+        self.pc = pc
+
+    def thread(self, pc):
+        """Make the handlers of the basic block starting at word offset `pc`:
+        up to the next JMP, RETURN or EXIT, or to code already threaded"""
+        code = self.code
+        program = self.program
+        while pc < len(code) and program[pc] is None:
+            op = code[pc]
+            program[pc] = self.handler(pc)
+            if op in BLOCK_ENDS:
+                break
+            pc += 1 + WIDTHS[op]
+
+    def handler(self, pc):
+        """Closure running the instruction at word offset `pc`, with its
+        operands read from the code and bound; it returns `nxt`, the offset
+        of the following instruction, unless it jumps"""
+        code = self.code
+        op = code[pc]
+        nxt = pc + 1 + WIDTHS[op]
+        arg = code[pc + 1] if nxt > pc + 1 else None  # first operand
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        frames = self.env_stack
+
+        if op == 0x34:  # PUSH_CONST
+            value = self.constants[arg]
+            def run(frame):
+                push(value)
+                return nxt
+
+        elif op == 0x1B:  # LOAD
+            def run(frame):
+                push(frame[arg])
+                return nxt
+
+        elif op == 0x03:  # STORE
+            def run(frame):
+                frame[arg] = pop()
+                return nxt
+
+        elif op == 0x24:  # LOAD_GLOBAL
+            globals_ = frames[0]
+            def run(frame):
+                push(globals_[arg])
+                return nxt
+
+        elif op == 0x02:  # POP
+            def run(frame):
+                pop()
+                return nxt
+
+        elif op == 0x18:  # DUP
+            def run(frame):
+                push(stack[-1])
+                return nxt
+
+        elif op in (0x04, 0x06):  # ADD, MUL: elementwise on two arrays
+            symbol, fn = ("+", operator.add) if op == 0x04 else ("*", operator.mul)
+            def run(frame):
+                b = pop()
+                a = stack[-1]
+                if isinstance(a, ARRAYS) and isinstance(b, ARRAYS):
+                    stack[-1] = elementwise(symbol, a, b)
+                else:
+                    stack[-1] = fn(a, b)
+                return nxt
+
+        elif op in BINARY:  # SUB, DIV, POW, MOD, FLR_DIV, CMP_*
+            fn = BINARY[op]
+            def run(frame):
+                b = pop()
+                stack[-1] = fn(stack[-1], b)
+                return nxt
+
+        elif op == 0x09:  # NEG
+            def run(frame):
+                stack[-1] = -stack[-1]
+                return nxt
+
+        elif op == 0x17:  # LNOT
+            def run(frame):
+                stack[-1] = not stack[-1]
+                return nxt
+
+        elif op == 0x0E:  # JMP
+            def run(frame):
+                return arg
+
+        elif op == 0x0F:  # JZ
+            def run(frame):
+                return nxt if pop() else arg
+
+        elif op == 0x10:  # JNZ
+            def run(frame):
+                return arg if pop() else nxt
+
+        elif op == 0x11:  # CALL
+            address, param_count, frame_size = arg, code[pc + 2], code[pc + 3]
+            calls = self.call_stack
+            def run(frame):
+                scope = [None] * frame_size
+                if param_count:
+                    scope[:param_count] = stack[-param_count:]
+                    del stack[-param_count:]
+                frames.append(scope)
+                calls.append(nxt)
+                return ~address
+
+        elif op == 0x12:  # RETURN
+            calls = self.call_stack
+            def run(frame):
+                frames.pop()
+                return ~calls.pop()
+
+        elif op == 0x13:  # PRINT
+            printed = self.print_buffer.append
+            def run(frame):
+                val = pop()
+                if val is True or val is False:
+                    printed("nocap" if val else "cap")
+                elif isinstance(val, (int, float)) and val < 0:
+                    printed("~" + str(abs(val)))
+                else:
+                    printed(str(val))
+                return nxt
+
+        elif op == 0x15:  # NEWLINE
+            buffer = self.print_buffer
+            def run(frame):
+                output.write(' '.join(buffer) + "\n")
+                buffer.clear()
+                return nxt
+
+        elif op == 0x19:  # INPUT
+            kind = self.constants[arg]
+            def run(frame):
+                push(read_value(kind) if kind is not None else get_true_val(reader.line()))
+                return nxt
+
+        elif op == 0x1A:  # EXIT
+            end = len(self.code)
+            def run(frame):
+                return end
+
+        elif op == 0x1C:  # CREATE_LIST
+            def run(frame):
+                if arg:
+                    items = stack[-arg:]
+                    del stack[-arg:]
+                    push(items)
+                else:
+                    push([])
+                return nxt
+
+        elif op == 0x1D:  # LOAD_INDEX
+            def run(frame):
+                stack[-1] = frame[arg][stack[-1]]
+                return nxt
+
+        elif op == 0x1E:  # STORE_INDEX
+            def run(frame):
+                val = pop()
+                frame[arg][pop()] = val
+                return nxt
+
+        elif op == 0x1F:  # APPEND_INDEX
+            def run(frame):
+                frame[arg].append(pop())
+                return nxt
+
+        elif op == 0x20:  # DELETE_INDEX
+            def run(frame):
+                del frame[arg][pop()]
+                return nxt
+
+        elif op == 0x23:  # LEN
+            def run(frame):
+                push(len(frame[arg]))
+                return nxt
+
+        elif op == 0x26:  # LOAD_INDEX2
+            def run(frame):
+                j = pop()
+                i = stack[-1]
+                arr = frame[arg]
+                stack[-1] = arr.get(i, j) if type(arr) is Matrix else arr[i][j]
+                return nxt
+
+        elif op == 0x27:  # STORE_INDEX2
+            def run(frame):
+                val = pop()
+                j = pop()
+                i = pop()
+                arr = frame[arg]
+                if type(arr) is Matrix:
+                    arr.set(i, j, val)
+                else:
+                    arr[i][j] = val
+                return nxt
+
+        elif op == 0x22:  # NEWHASH
+            def run(frame):
+                push({})
+                return nxt
+
+        elif op == 0x25:  # NEWMATRIX
+            def run(frame):
+                fill = pop()
+                cols = pop()
+                stack[-1] = Matrix(stack[-1], cols, fill)
+                return nxt
+
+        elif op == 0x28:  # REDUCE
+            reduce = REDUCTIONS[self.constants[arg]]
+            def run(frame):
+                stack[-1] = reduce(stack[-1])
+                return nxt
+
+        elif op == 0x29:  # FILL
+            def run(frame):
+                val = pop()
+                fill_array(pop(), val)
+                return nxt
+
+        elif op == 0x2A:  # RANGE
+            def run(frame):
+                stack[-1] = new_range(stack[-1])
+                return nxt
+
+        elif op == 0x2B:  # SORT
+            def run(frame):
+                sort_array(pop(), descending=arg)
+                return nxt
+
+        elif op == 0x2C:  # REVERSE
+            def run(frame):
+                reverse_array(pop())
+                return nxt
+
+        elif op == 0x2D:  # BISECT
+            search = SEARCHES[self.constants[arg]]
+            def run(frame):
+                val = pop()
+                stack[-1] = search(stack[-1], val)
+                return nxt
+
+        elif op == 0x2E:  # NEWSET
+            def run(frame):
+                push(set())
+                return nxt
+
+        elif op == 0x2F:  # CONTAINS
+            def run(frame):
+                val = pop()
+                stack[-1] = val in stack[-1]
+                return nxt
+
+        elif op == 0x30:  # SET_ADD
+            def run(frame):
+                frame[arg].add(pop())
+                return nxt
+
+        elif op == 0x31:  # SET_REMOVE
+            def run(frame):
+                frame[arg].remove(pop())
+                return nxt
+
+        elif op == 0x32:  # MAP_GET
+            def run(frame):
+                default = pop()
+                key = pop()
+                stack[-1] = stack[-1].get(key, default)
+                return nxt
+
+        elif op == 0x33:  # MAP_VIEW
+            keys = self.constants[arg] == "keys"
+            def run(frame):
+                hashmap = stack[-1]
+                stack[-1] = TypedArray(hashmap.keys() if keys else hashmap.values())
+                return nxt
+
+        else:  # NEWARRAY and anything else the VM does not act on
+            def run(frame):
+                return nxt
+
+        return run
@@ -0,0 +1,50 @@
+import pytest
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import *
+from arena import Arena
+
+SOURCE = """
+int x = 3;
+int[] a = [1, 2, x];
+def f(int n) -> int {
+    if (n <= 1) { yeet 1 }
+    yeet n * f(n - 1)
+}
+hashmap<string, int> h;
+h["k"] = f(x) + a[1];
+for (int i = 0; i < 3; i = i + 1) { yap(i, "done"); }
+"""
+
+def test_nodes_are_slotted():
+    tree = parse(SOURCE)
+    for node in [tree] + tree.statements:
+        assert not hasattr(node, "__dict__")
+    with pytest.raises(AttributeError):
+        tree.statements[0].extra = 1
+
+def test_arena_round_trip():
+    tree = parse(SOURCE)
+    arena = Arena.from_ast(tree)
+    assert arena.to_ast() == tree
+    assert Arena.from_bytes(arena.to_bytes()).to_ast() == tree
+
+def test_arena_traversal():
+    tree = parse(SOURCE)
+    arena = Arena.from_ast(tree)
+    assert arena.kind(arena.root) is Sequence
+    top = arena.children(arena.root)
+    assert [arena.kind(i) for i in top] == [type(s) for s in tree.statements]
+    # children are always stored before their parents
+    for node_id in range(len(arena)):
+        assert all(child < node_id for child in arena.children(node_id))
+    assert [arena.fields(i)[0] for i in arena.nodes_of(Function)] == ["f"]
+    assert len(arena.nodes_of(FunctionCall)) == 2
+
+def test_arena_rejects_bad_bytes():
+    with pytest.raises(ValueError):
+        Arena.from_bytes(b"nope")
@@ -0,0 +1,71 @@
+import os
+import sys
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from bytecode import AssemblyGenerator
+from cache import CompileCache
+
+SOURCE = """
+int x = 4;
+def sq(int n) -> int { yeet n * n }
+yap(sq(x) + 1);
+"""
+
+def compile_source(code):
+    ast = parse(code)
+    instructions, function_table, constants = AssemblyGenerator().generate(ast)
+    return ast, instructions, function_table, constants
+
+def test_cache_miss_then_hit(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    assert cache.load(SOURCE) is None
+    compiled = compile_source(SOURCE)
+    cache.store(SOURCE, *compiled)
+    ast, instructions, function_table, constants = cache.load(SOURCE)
+    assert ast == compiled[0]
+    assert instructions == compiled[1]
+    assert function_table == compiled[2]
+    assert constants == compiled[3]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_cache_key_depends_on_source(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    cache.store(SOURCE, *compile_source(SOURCE))
+    assert cache.load(SOURCE + "\nyap(x);") is None
+    assert cache.key(SOURCE) != cache.key(SOURCE + " ")
+
+def test_cache_drops_corrupt_entries(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    cache.store(SOURCE, *compile_source(SOURCE))
+    path = tmp_path / (cache.key(SOURCE) + ".yapc")
+    path.write_bytes(b"YAPC garbage")
+    assert cache.load(SOURCE) is None
+    assert not path.exists()
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    sources = [SOURCE + f"\nyap({i});" for i in range(3)]
+    cache = CompileCache(str(tmp_path))
+    for i, source in enumerate(sources):
+        cache.store(source, *compile_source(source))
+        path = tmp_path / (cache.key(source) + ".yapc")
+        os.utime(path, ns=(i * 10**9, i * 10**9))
+    sizes = [size for _, size, _ in cache.entries()]
+    # touching the oldest entry makes the middle one the eviction candidate
+    assert cache.load(sources[0]) is not None
+    cache.max_bytes = sum(sizes) - 1
+    cache.evict()
+    assert cache.load(sources[1]) is None
+    assert cache.load(sources[0]) is not None
+    assert cache.load(sources[2]) is not None
+
+def test_cache_stats_persist(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    cache.load(SOURCE)
+    cache.save_stats()
+    cache = CompileCache(str(tmp_path))
+    cache.store(SOURCE, *compile_source(SOURCE))
+    cache.load(SOURCE)
+    assert cache.stats() == {"hits": 1, "misses": 1}
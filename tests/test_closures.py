@@ -0,0 +1,34 @@
+import pytest
+import sys
+import os
+import io
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(__file__))
+from parser import parse
+from closures import compile_program, run
+import test_evaluator
+
+EVALUATOR_TESTS = [test for name, test in vars(test_evaluator).items() if name.startswith("test_")]
+
+@pytest.mark.parametrize("test", EVALUATOR_TESTS, ids=lambda test: test.__name__)
+def test_same_output_as_evaluator(test, monkeypatch):
+    # rerun the tree-walking evaluator's suite with `e` swapped for this engine
+    monkeypatch.setattr(test_evaluator, "e", run)
+    test()
+
+def test_program_can_run_twice():
+    program = compile_program(parse("""
+    int total = 0;
+    for (int i = 1; i <= 4; i = i + 1) { total = total + i; }
+    yap(total);
+    """))
+    f = io.StringIO()
+    with redirect_stdout(f):
+        program()
+        program()
+    assert f.getvalue() == "10\n10\n"
+
+def test_return_outside_function():
+    with pytest.raises(Exception, match="outside of function scope"):
+        run(parse("yeet 1"))
@@ -2,9 +2,13 @@ import pytest
 import sys
 import os
 import io
+import copy
+import heapq
+import pickle
 from contextlib import redirect_stdout
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from evaluator import e
+from arrays import TypedArray, PackedArray, Matrix, check_array, packed, new_range, elementwise, array_sum, fill_array, sort_array, lower_bound
 from parser import parse
 
 def test_variables():
@@ -335,3 +339,462 @@ def test_queue():
 
     assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
     print("Queue test passed!")
+
+def test_binop_evaluates_operands_once():
+    source_code = """
+    def loud(int n) -> int {
+        yap(n);
+        yeet n
+    }
+    int a = loud(1) * 10 + loud(2);
+    yap(a);
+    """
+    expected_output = "1\n2\n12\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_and_or_short_circuit():
+    # the right side would index out of range; a deciding left side skips it
+    source_code = """
+    int[] a = [1, 2];
+    int i = 5;
+    if ((i < 2) and (a[i] == 1)) { yap("and: right"); } else { yap("and: left"); }
+    if ((i > 2) or (a[i] == 1)) { yap("or: left"); }
+    yap((i > 2) and (a[1] == 2), " ", (i < 2) or (a[0] == 1));
+    """
+    expected_output = "and: left\nor: left\nnocap nocap\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_deeply_nested_arithmetic():
+    expr = "1"
+    for i in range(200):
+        expr = f"({expr} {'+*'[i % 2]} 1)"
+    source_code = f"int x = {expr}; yap(x);"
+    expected_output = "101\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_return_evaluated_once():
+    source_code = """
+    def loud(int n) -> int {
+        yap(n);
+        yeet n
+    }
+    def twice(int n) -> int {
+        yeet loud(n) * 2
+    }
+    yap(twice(3));
+    """
+    expected_output = "3\n6\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_function_scopes():
+    source_code = """
+    int count = 1;
+    def outer(int n) -> int {
+        int base = 10;
+        def inner(int m) -> int {
+            yeet base + m
+        }
+        count = count + n;
+        yap(count);
+        yeet inner(n)
+    }
+    yap(outer(5));
+    yap(count);
+    """
+    # nested functions see the enclosing call's variables; assigning to a
+    # global inside a function only changes the function's own copy
+    expected_output = "6\n15\n1\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_deque():
+    source_code = """
+    deque<int> d;
+    d.pushBack(2);
+    d.pushBack(3);
+    d.pushFront(1);
+    yap(d.front(), " ", d.back());
+    yap(d.popBack());
+    yap(d.popFront());
+    yap(d.front(), " ", d.back());
+    """
+    expected_output = "1 3\n3\n1\n2 2\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_deque_errors():
+    with pytest.raises(Exception, match="Deque underflow"):
+        e(parse("deque<int> d; d.popFront();"))
+    with pytest.raises(Exception, match="Cannot push"):
+        e(parse('deque<int> d; d.pushFront("x");'))
+
+def test_heap():
+    source_code = """
+    heap<int> h;
+    h.heapPush(5);
+    h.heapPush(1);
+    h.heapPush(3);
+    yap(h.heapTop(), " ", h.len());
+    yap(h.heapPop(), h.heapPop(), h.heapPop());
+    heap<int[], max> m;
+    m.heapPush([2, 7]);
+    m.heapPush([9, 1]);
+    m.heapPush([2, 8]);
+    int[] best = m.heapPop();
+    int[] next = m.heapTop();
+    yap(best[0], " ", best[1], " ", next[1]);
+    """
+    expected_output = "1 3\n135\n9 1 8\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_heap_errors():
+    with pytest.raises(Exception, match="Heap underflow"):
+        e(parse("heap<int> h; h.heapPop();"))
+    with pytest.raises(Exception, match="Heap is empty"):
+        e(parse("heap<float, max> h; h.heapTop();"))
+    with pytest.raises(Exception, match="Cannot push"):
+        e(parse('heap<int> h; h.heapPush("x");'))
+
+def test_arrays_remember_element_type():
+    a = TypedArray([1, 2])
+    check_array(a, "int[]", "a")
+    assert a.element_type == "int"
+    empty = TypedArray()
+    check_array(empty, "int[]", "a")
+    check_array(empty, "float[]", "b")
+    # still checked as int[], the type its first variable relies on
+    assert empty.element_type == "int"
+
+def test_array_element_checks():
+    with pytest.raises(Exception, match="must be of type int"):
+        e(parse('int[] a = [1, "x"];'))
+    with pytest.raises(Exception, match="Cannot store str in array of int"):
+        e(parse('int[] a = [1]; a.append("x");'))
+    with pytest.raises(Exception, match="Cannot store float in array of int"):
+        e(parse('int[] a = [1]; a[0] = 2.5;'))
+    with pytest.raises(Exception, match="Cannot store int in array of string"):
+        e(parse('string[][] grid = [["a"]]; string[] row = grid[0]; grid[0][0] = 1;'))
+
+def test_packed_arrays():
+    source_code = """
+    int[] a = [5, 6, 7];
+    a.append(8);
+    a.delete(0);
+    a[0] = ~1;
+    float[] f = [0.5];
+    f.append(1.5);
+    int[] big = [1];
+    big.append(2 ^ 70);
+    int[][] grid = [];
+    int[] row = [0, 0];
+    grid.append(row);
+    grid[0][1] = 3;
+    yap(a, " ", a.len(), " ", a[2], " ", f, " ", big, " ", row);
+    """
+    expected_output = "[-1, 7, 8] 3 8 [0.5, 1.5] [1, 1180591620717411303424] [0, 3]\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_packed_storage():
+    values = packed(TypedArray([1, 2, 3]), "int[]")
+    assert isinstance(values, PackedArray) and values.items.typecode == "q"
+    assert values == [1, 2, 3] and [1, 2, 3] == values
+    values.append(2 ** 70)
+    assert type(values.items) is list
+    assert values == [1, 2, 3, 2 ** 70]
+    # strings, and numbers that are really bools, stay in a list
+    assert not isinstance(packed(TypedArray(["a"]), "string[]"), PackedArray)
+    assert not isinstance(packed(TypedArray([True]), "int[]"), PackedArray)
+
+def test_packed_arrays_copy_and_pickle():
+    values = packed(TypedArray([1, 2, 3]), "int[]")
+    assert not isinstance(values, list)
+    for copied in (copy.copy(values), copy.deepcopy(values), pickle.loads(pickle.dumps(values))):
+        assert isinstance(copied, PackedArray) and copied == [1, 2, 3]
+        assert copied.element_type == "int" and copied.items.typecode == "q"
+        copied.append(4)
+        assert values == [1, 2, 3]
+    nested = copy.deepcopy([values, values])
+    assert nested == [[1, 2, 3], [1, 2, 3]] and nested[0] is nested[1] and nested[0] is not values
+    with pytest.raises(TypeError):
+        heapq.heapify(values)  # wants a real list, and says so
+
+def test_matrix_copies():
+    m = Matrix(2, 2, 0)
+    m.set(1, 1, 5)
+    for copied in (copy.copy(m), copy.deepcopy(m), pickle.loads(pickle.dumps(m))):
+        assert copied == [[0, 0], [0, 5]] and copied.element_type == "int[]"
+        copied.set(0, 0, 9)
+        assert m.get(0, 0) == 0
+    row = copy.copy(m[1])
+    row[0] = 7
+    assert row == [7, 5] and m[1] == [0, 5]
+
+def test_packed_arrays_are_arrays():
+    source_code = """
+    def total(int[] xs) -> int { yeet xs.sum() }
+    def same(int[] xs) -> int[] { yeet xs }
+    int[] a = [1, 2, 3];
+    int[][] grid = [a, a];
+    int[] b = same(a);
+    yap(total(a), " ", grid, " ", a == [1, 2, 3], " ", b);
+    """
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(parse(source_code))
+    assert f.getvalue() == "6 [[1, 2, 3], [1, 2, 3]] nocap [1, 2, 3]\n"
+
+def test_matrix():
+    source_code = """
+    int n = 3;
+    int[][] m = matrix(n, 4, 0);
+    for (int i = 0; i < n; i = i + 1) {
+        for (int j = 0; j < 4; j = j + 1) {
+            m[i][j] = i * j;
+        }
+    }
+    yap(m, " ", m.len(), " ", m[2].len(), " ", m[2][3]);
+    int[] row = m[1];
+    row[0] = 7;
+    m[0] = [9, 9, 9, 9];
+    yap(m[1], " ", m[0][3]);
+    float[][] f = matrix(2, 2, 0.5);
+    f[1][1] = 2.5;
+    yap(f);
+    """
+    expected_output = "[[0, 0, 0, 0], [0, 1, 2, 3], [0, 2, 4, 6]] 3 4 6\n[7, 1, 2, 3] 9\n[[0.5, 0.5], [0.5, 2.5]]\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_matrix_errors():
+    with pytest.raises(Exception, match="list index out of range"):
+        e(parse("int[][] m = matrix(2, 2, 0); yap(m[0][2]);"))
+    with pytest.raises(Exception, match="Cannot store float in array of int"):
+        e(parse("int[][] m = matrix(2, 2, 0); m[1][1] = 0.5;"))
+    with pytest.raises(Exception, match="Cannot add or remove rows"):
+        e(parse("int[][] m = matrix(2, 2, 0); m.append([1, 2]);"))
+
+
+def test_array_builtins():
+    source_code = """
+    int[] xs = range(5);
+    int[] ys = xs + xs;
+    int[] zs = xs * ys;
+    yap(xs, " ", xs.sum(), " ", xs.min(), " ", xs.max(), " ", ys, " ", zs.sum());
+    xs.fill(7);
+    float[] fs = [1.5, 2.5];
+    float[] squares = fs * fs;
+    yap(xs, " ", fs.sum(), " ", squares.max());
+    int[][] g = matrix(2, 2, 0);
+    g[1].fill(3);
+    yap(g, " ", g[1].sum());
+    """
+    expected_output = "[0, 1, 2, 3, 4] 10 0 4 [0, 2, 4, 6, 8] 60\n[7, 7, 7, 7, 7] 4.0 6.25\n[[0, 0], [3, 3]] 6\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_array_builtin_storage():
+    assert isinstance(new_range(3), PackedArray)
+    big = packed([2 ** 62], "int[]")
+    doubled = elementwise("+", big, big)  # too big for the buffer
+    assert doubled == [2 ** 63] and doubled.element_type == "int"
+    assert array_sum(packed([], "float[]")) == 0.0
+    rows = TypedArray([[1], [2]])
+    fill_array(rows, [5])
+    rows[0].append(6)
+    assert rows == [[5, 6], [5]]
+
+def test_array_builtin_errors():
+    with pytest.raises(Exception, match="lengths 2 and 3"):
+        e(parse("int[] a = range(2); int[] b = range(3); int[] c = a + b;"))
+    with pytest.raises(Exception, match="max\\(\\) of an empty array"):
+        e(parse("int[] a = []; yap(a.max());"))
+    with pytest.raises(Exception, match="arrays of numbers"):
+        e(parse('string[] a = ["x"]; yap(a.sum());'))
+    with pytest.raises(Exception, match="Cannot store float in array of int"):
+        e(parse("int[] a = range(2); a.fill(0.5);"))
+
+def test_sort_reverse_and_search():
+    source_code = """
+    int[] xs = [5, 1, 4, 1, 3];
+    xs.sort();
+    yap(xs, " ", xs.lower_bound(1), " ", xs.upper_bound(1), " ", xs.lower_bound(9));
+    xs.sort_desc();
+    string[] words = ["b", "c", "a"];
+    words.reverse();
+    yap(xs, " ", words);
+    int[][] pairs = [];
+    int[] a = [2, 0];
+    int[] b = [1, 9];
+    pairs.append(a);
+    pairs.append(b);
+    pairs.sort();
+    int[][] m = matrix(2, 2, 0);
+    m[0][0] = 3;
+    m[0].reverse();
+    m.sort();
+    yap(pairs, " ", m);
+    """
+    expected_output = "[1, 1, 3, 4, 5] 0 2 5\n[5, 4, 3, 1, 1] ['a', 'c', 'b']\n[[1, 9], [2, 0]] [[0, 0], [0, 3]]\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_sort_keeps_packed_storage():
+    xs = packed([3, 1, 2], "int[]")
+    sort_array(xs, descending=True)
+    assert isinstance(xs, PackedArray) and type(xs.items).__name__ == "array"
+    assert xs == [3, 2, 1]
+    assert lower_bound(packed([1.0, 2.5], "float[]"), 2.0) == 1
+
+
+def test_sets():
+    source_code = """
+    set<int> seen;
+    for (int i = 0; i < 10; i = i + 1) {
+        seen.add(i % 4);
+    }
+    yap(seen.size(), " ", seen.contains(3), " ", seen.contains(4));
+    seen.remove(3);
+    set<string> words;
+    words.add("yap");
+    yap(seen.len(), " ", seen.contains(3), " ", words.contains("yap"));
+    """
+    expected_output = "4 nocap cap\n3 cap nocap\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_hashmap_operations():
+    source_code = """
+    hashmap<string, int> count;
+    string[] words = ["a", "b", "a", "c", "a"];
+    for (int i = 0; i < words.len(); i = i + 1) {
+        count[words[i]] = count.get(words[i], 0) + 1;
+    }
+    string[] keys = count.keys();
+    int[] values = count.values();
+    yap(keys, " ", values, " ", count.size());
+    yap(count.contains("b"), " ", count.contains("z"), " ", count.get("z", ~1), " ", words.contains("c"));
+    """
+    expected_output = "['a', 'b', 'c'] [3, 1, 1] 3\nnocap cap ~1 nocap\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_container_names_are_not_reserved():
+    # set, deque, heap, matrix and range are only types or builtins as set<int> s or range(n)
+    source_code = """
+    int set = 3;
+    int heap = set + 1;
+    int[] deque = [set, heap];
+    int matrix = 2;
+    yap(set, " ", heap, " ", deque, " ", matrix);
+    set<int> seen;
+    seen.add(heap);
+    heap<int> h;
+    h.heapPush(matrix);
+    int[] r = range(matrix);
+    int[][] m = matrix(matrix, 2, 0);
+    yap(seen.contains(4), " ", h.heapPop(), " ", r, " ", m);
+    """
+    expected_output = "3 4 [3, 4] 2\nnocap 2 [0, 1] [[0, 0], [0, 0]]\n"
+
+    ast = parse(source_code)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        e(ast)
+    actual_output = f.getvalue()
+
+    assert actual_output == expected_output, f"Expected '{expected_output}', but got '{actual_output}'"
+
+def test_set_errors():
+    with pytest.raises(Exception, match="Cannot add str to set of int"):
+        e(parse('set<int> s; s.add("x");'))
+    with pytest.raises(Exception, match="Element 2 not found in set"):
+        e(parse("set<int> s; s.add(1); s.remove(2);"))
+    with pytest.raises(Exception, match="can only be used on sets, hashmaps or arrays"):
+        e(parse("int x = 3; yap(x.contains(3));"))
+    with pytest.raises(Exception, match="get\\(\\) can only be used on hashmaps"):
+        e(parse("int[] a = [1]; yap(a.get(0, 1));"))
+
@@ -5,7 +5,7 @@ import os
 # Add the project root directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from lexer import lex, NumberToken, ParenthesisToken, KeywordToken, OperatorToken, BooleanToken, StringToken, VariableToken, TypeToken, SymbolToken
+from lexer import lex, lex_compact, token_code, NumberToken, ParenthesisToken, KeywordToken, OperatorToken, BooleanToken, StringToken, VariableToken, TypeToken, SymbolToken
 
 def test_lex_keywords():
     tokens = list(lex("if else while yeet")) 
@@ -69,3 +69,47 @@ def test_lex_invalid_character():
     """Test lexing an invalid character like '@' should raise SyntaxError"""
     with pytest.raises(ValueError, match="Unexpected character: @"):
         list(lex("@"))
+
+def test_lex_line_numbers():
+    """Line numbers count newlines in whitespace and after comments, not inside strings"""
+    tokens = list(lex('int x = 1;\n# comment\n"a\nb" y\n\n  z'))
+    assert [(t.val, t.line) for t in tokens] == [
+        ("int", 1), ("x", 1), ("=", 1), ("1", 1), (";", 1),
+        ("a\nb", 3), ("y", 3), ("z", 5)
+    ]
+
+def test_lex_number_followed_by_dot():
+    """Only one decimal point belongs to a number; the rest lex as symbols"""
+    tokens = list(lex("1.2.3 4."))
+    assert tokens == [NumberToken("1.2"), SymbolToken("."), NumberToken("3"), NumberToken("4.")]
+
+def test_lex_compact_matches_lex():
+    """The compact buffer holds the same tokens and line numbers as lex()"""
+    source = 'int[] a = [1, 2.5];\nif (a.len() >= 2) {\n  yap("hi", a[0]);\n}'
+    tokens = lex_compact(source)
+    expected = list(lex(source))
+    assert len(tokens) == len(expected)
+    assert list(tokens) == expected
+    assert [t.line for t in tokens] == [t.line for t in expected]
+    assert tokens[5] == ParenthesisToken("[")
+
+def test_lex_compact_codes():
+    """Equal tokens share one integer code; values are interned once"""
+    tokens = lex_compact("x = x + 1; y = x;")
+    assert tokens.code(0) == tokens.code(2) == tokens.code(8)
+    assert tokens.code(1) == tokens.code_of(OperatorToken("="))
+    assert tokens.code(0) != tokens.code_of(VariableToken("y"))
+    assert tokens.code_of(VariableToken("z")) == -1
+    assert tokens.strings.count("x") == 1
+
+def test_token_codes_are_fixed():
+    """Reserved words and punctuation have the same code in every buffer"""
+    first, second = lex_compact("if (x) { yap(x); }"), lex_compact("y; if")
+    assert first.code(0) == second.code(2) == token_code(KeywordToken("if"))
+    assert first.code(1) == token_code(ParenthesisToken("("))
+    assert first.code(9) == second.code(1) == token_code(SymbolToken(";"))
+
+def test_tokens_are_slotted():
+    token = VariableToken("x", 3)
+    assert not hasattr(token, "__dict__")
+    assert token == VariableToken("x") and token != StringToken("x")
@@ -286,3 +286,75 @@
 #         print("Case 2 (missing ')' in function arguments) passed")
     
 #     print("Errors in function call test passed!")
+
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from lexer import lex, lex_compact, VariableToken, OperatorToken
+from parser import *
+
+def test_token_cursor_lookahead_and_reset():
+    cursor = TokenCursor(list(lex("x = y;")))
+    assert cursor.peek() == VariableToken("x")
+    assert cursor.peek(None, 2) == VariableToken("y")
+    start = cursor.mark()
+    assert next(cursor) == VariableToken("x")
+    assert next(cursor) == OperatorToken("=")
+    cursor.reset(start)
+    assert cursor.peek() == VariableToken("x")
+    assert cursor.peek(None, 10) is None
+
+def test_token_cursor_compares_codes():
+    cursor = TokenCursor(lex_compact("x = (y);"))
+    assert cursor.code() == cursor.buffer.code_of(VariableToken("x"))
+    assert cursor.code(2) == LPAREN and cursor.code(5) == SEMICOLON and cursor.code(6) == -1
+    # Tokens are only built when asked for, and then once
+    assert cursor.tokens == [None] * 6
+    y = cursor.peek(None, 3)
+    assert y == VariableToken("y") and cursor.tokens[3] is y and cursor.peek(None, 3) is y
+    assert cursor.tokens.count(None) == 5
+
+def test_call_and_expression_backtracking():
+    source_code = """
+    int x = f(1, 2) + x;
+    y = g(3);
+    z = y;
+    """
+    assert parse(source_code) == Sequence([
+        Declaration('int', 'x', BinOp('+', FunctionCall('f', [Number('1'), Number('2')]), Variable('x'))),
+        Assignment('y', FunctionCall('g', [Number('3')])),
+        Assignment('z', Variable('y')),
+    ])
+
+def test_parse_token_buffer():
+    source_code = "int[] a = [1, 2]; yap(a[0]);"
+    assert parse(lex_compact(source_code)) == parse(source_code)
+
+def test_expression_precedence():
+    # + is looser than -, * looser than /, % tighter than both, ^ groups right
+    assert parse("yap(a - b + c * d / e % f ^ g ^ h);").statements[0] == Print([
+        BinOp('+', BinOp('-', Variable('a'), Variable('b')),
+              BinOp('*', Variable('c'),
+                    BinOp('/', Variable('d'),
+                          BinOp('%', Variable('e'),
+                                BinOp('^', Variable('f'), BinOp('^', Variable('g'), Variable('h')))))))
+    ])
+    assert parse("yap(a < b and c == d);").statements[0] == Print([
+        BinOp('==', BinOp('and', BinOp('<', Variable('a'), Variable('b')), Variable('c')), Variable('d'))
+    ])
+
+def test_prefix_operators():
+    assert parse("yap(~x ^ 2, not (a), ~~y + 1);").statements[0] == Print([
+        BinOp('^', BinOp('*', Number('-1'), Variable('x')), Number('2')),
+        BinOp('not', None, Parenthesis(Variable('a'))),
+        BinOp('+', BinOp('~~', None, Variable('y')), Number('1')),
+    ])
+
+def test_deeply_nested_expression():
+    depth = 5000
+    expr = parse("yap(" + "(" * depth + "1" + ")" * depth + ");").statements[0].values[0]
+    for _ in range(depth):
+        assert isinstance(expr, Parenthesis)
+        expr = expr.expr
+    assert expr == Number('1')
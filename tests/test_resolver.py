@@ -0,0 +1,67 @@
+import pytest
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import *
+from typechecker import TypeChecker
+
+SOURCE = """
+int g = 1;
+int total = 0;
+def f(int a) -> int {
+    int b = a + g;
+    total = total + b;
+    def inner(int c) -> int {
+        yeet b + c
+    }
+    yeet inner(total)
+}
+yap(f(2));
+"""
+
+def test_globals_get_slots():
+    tree = parse(SOURCE)
+    g, total, f = tree.statements[:3]
+    assert (g.depth, g.slot) == (0, 0)
+    assert (total.depth, total.slot) == (0, 1)
+    assert (f.depth, f.slot) == (0, 2)
+    call = tree.statements[3].values[0]
+    assert (call.depth, call.slot) == (0, 2)
+
+def test_function_locals():
+    tree = parse(SOURCE)
+    f = tree.statements[2]
+    declare_b, assign_total, inner, _ = f.body.statements
+    # a, b, total, inner
+    assert f.frame_size == 4
+    assert (declare_b.depth, declare_b.slot) == (1, 1)
+    a, g = declare_b.value.left, declare_b.value.right
+    assert (a.depth, a.slot) == (1, 0)
+    assert (g.depth, g.slot) == (0, 0)
+    # assigning a global inside a function works on a local copy of it
+    assert (assign_total.depth, assign_total.slot) == (1, 2)
+    assert f.copies == [(2, 0, 1, "total")]
+
+def test_nested_function_sees_enclosing_frame():
+    tree = parse(SOURCE)
+    inner = tree.statements[2].body.statements[2]
+    assert (inner.depth, inner.slot) == (1, 3)
+    assert inner.frame_size == 1
+    b, c = inner.body.statements[0].value.left, inner.body.statements[0].value.right
+    assert (b.depth, b.slot) == (1, 1)
+    assert (c.depth, c.slot) == (2, 0)
+
+def test_unbound_names_stay_global():
+    tree = parse("yap(missing);")
+    variable = tree.statements[0].values[0]
+    assert (variable.depth, variable.slot) == (0, None)
+    with pytest.raises(Exception, match="not declared"):
+        TypeChecker().visit(tree)
+
+def test_bindings_are_not_printed_or_compared():
+    tree = parse("int x = 1;")
+    assert repr(tree) == "Sequence([Declaration(type='int', name='x', value=Number(val='1'))])"
+    assert tree == Sequence([Declaration("int", "x", Number("1"))])
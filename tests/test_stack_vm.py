@@ -0,0 +1,166 @@
+import io
+import sys
+import os
+
+import pytest
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from bytecode import AssemblyGenerator
+from stack_vm import StackVM
+from yapio import output, reader
+from errors import CodegenError
+
+
+def run_vm(source):
+    instructions, function_table, constants = AssemblyGenerator().generate(parse(source))
+    stream = io.StringIO()
+    output.redirect(stream)
+    try:
+        StackVM(instructions, function_table, constants).run()
+    finally:
+        output.redirect(None)
+    return instructions, stream.getvalue()
+
+
+def opcodes(instructions):
+    return [instr[0][1] for instr in instructions if len(instr) == 2]
+
+
+def test_matrix_opcodes():
+    instructions, printed = run_vm("""
+    int[][] m = matrix(2, 3, 0);
+    for (int i = 0; i < 2; i = i + 1) {
+        for (int j = 0; j < 3; j = j + 1) {
+            m[i][j] = i + j;
+        }
+    }
+    yap(m[1][2], m);
+    """)
+    assert printed == "3 [[0, 1, 2], [1, 2, 3]]\n"
+    assert {"NEWMATRIX", "LOAD_INDEX2", "STORE_INDEX2"} <= set(opcodes(instructions))
+
+def test_nested_lists_use_the_same_opcodes():
+    _, printed = run_vm("""
+    int[][] m = [];
+    int[] a = [1, 2];
+    int[] b = [3, 4];
+    m.append(a);
+    m.append(b);
+    m[1][0] = 5;
+    yap(m[1][0], m[0][1]);
+    """)
+    assert printed == "5 2\n"
+
+def test_array_builtin_opcodes():
+    instructions, printed = run_vm("""
+    int[] xs = range(4);
+    int[] ys = xs * xs;
+    ys.fill(2);
+    int[] zs = xs + ys;
+    yap(zs, xs.sum(), zs.min(), zs.max());
+    """)
+    assert printed == "[2, 3, 4, 5] 6 2 5\n"
+    assert {"RANGE", "FILL", "REDUCE"} <= set(opcodes(instructions))
+
+def test_sort_and_search_opcodes():
+    instructions, printed = run_vm("""
+    int[] xs = [4, 2, 9, 2];
+    xs.sort();
+    int lo = xs.lower_bound(2);
+    int hi = xs.upper_bound(2);
+    xs.reverse();
+    yap(xs, lo, hi);
+    xs.sort_desc();
+    yap(xs);
+    """)
+    assert printed == "[9, 4, 2, 2] 0 2\n[9, 4, 2, 2]\n"
+    assert {"SORT", "REVERSE", "BISECT"} <= set(opcodes(instructions))
+
+def test_set_and_hashmap_opcodes():
+    instructions, printed = run_vm("""
+    set<int> seen;
+    seen.add(4);
+    seen.add(7);
+    seen.remove(4);
+    hashmap<int, int> squares;
+    squares[3] = 9;
+    int[] keys = squares.keys();
+    yap(seen.contains(7), seen.contains(4), squares.contains(3), squares.get(5, 0), keys);
+    if (seen.contains(4)) {
+        yap(4);
+    }
+    """)
+    assert printed == "nocap cap nocap 0 [3]\n"
+    assert {"NEWSET", "SET_ADD", "SET_REMOVE", "CONTAINS", "MAP_GET", "MAP_VIEW"} <= set(opcodes(instructions))
+
+def test_jumps_are_linked_to_addresses():
+    instructions, printed = run_vm("""
+    def fact(int n) -> int {
+        if (n < 2) {
+            yeet 1
+        }
+        yeet n * fact(n - 1)
+    }
+    int total = 0;
+    for (int i = 0; i < 5; i = i + 1) {
+        if (i == 3) { continue; }
+        total = total + fact(i);
+    }
+    yap(total);
+    """)
+    assert printed == "28\n"
+    assert all(len(instr) == 2 for instr in instructions)  # no label entries left
+    assert [instr[0][0] for instr in instructions] == list(range(len(instructions)))
+    for (_, name, _), args in instructions:
+        if name in ("JMP", "JZ", "JNZ"):
+            assert isinstance(args[0], int) and 0 <= args[0] < len(instructions)
+        if name == "CALL":
+            address, param_count, frame_size = args
+            assert instructions[address - 1][0][1] == "JMP" and param_count == 1
+
+def test_constants_are_pooled_once():
+    instructions, function_table, constants = AssemblyGenerator().generate(parse("""
+    string code = "007";
+    int x = 1 + 1;
+    float y = 1.0;
+    yap(code, x, y, 1, "007");
+    """))
+    assert constants == ["007", 1, 1.0]
+    assert "PUSH" not in opcodes(instructions)
+    assert [args[0] for (_, name, _), args in instructions if name == "PUSH_CONST"] == [0, 1, 1, 2, 1, 0]
+    _, printed = run_vm('string code = "007"; yap(code);')
+    assert printed == "007\n"  # a digit string stays a string
+
+def test_booleans_are_native():
+    instructions, function_table, constants = AssemblyGenerator().generate(parse("""
+    bool big = 7 >= 5;
+    bool done = cap;
+    bool ok = spill();
+    if (big and ok) {
+        yap(big, done, 3 < 2, 2 <= 2);
+    }
+    """))
+    assert any(c is False for c in constants) and "cap" not in constants
+    reader.redirect(io.StringIO("cap\n"))
+    stream = io.StringIO()
+    output.redirect(stream)
+    try:
+        StackVM(instructions, function_table, constants).run()  # a read cap is falsy
+        reader.redirect(io.StringIO("nocap\n"))
+        vm = StackVM(instructions, function_table, constants)
+        vm.run()
+    finally:
+        output.redirect(None)
+        reader.redirect(None)
+    assert stream.getvalue() == "nocap cap cap nocap\n"
+    assert vm.env_stack[0][:3] == [True, False, True]
+
+
+def test_unsupported_programs_raise_codegen_error():
+    with pytest.raises(CodegenError, match="Unsupported operator: '&'"):
+        AssemblyGenerator().generate(parse("int x = 1; yap(x & 3);"))
+    with pytest.raises(CodegenError, match="outer variable 'n'"):
+        AssemblyGenerator().generate(parse("def f(int n) -> int { def g() -> int { yeet n } yeet g() } yap(f(2));"))
@@ -0,0 +1,86 @@
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from parser import parse
+from bytecode import AssemblyGenerator
+from stack_vm import StackVM
+from yapio import output, reader
+import yapb
+
+# Output of each sample program, as printed by the if/elif core the threaded
+# one replaced (benchmarks/chain_vm.py)
+PROGRAMS = {
+    "cp_problems/q7_22110165.yap": "537\n535\n",
+    "cp_problems/q19_22110165.yap": "501\n5\n",
+    "project-euler-tests/problem1.yap": "2318\n",
+    "project-euler-tests/problem3.yap": "6857\n",
+}
+
+def run(vm):
+    stream = io.StringIO()
+    output.redirect(stream)
+    reader.redirect(io.StringIO("3\n1 2 3\n"))
+    try:
+        vm.run()
+    finally:
+        output.redirect(None)
+    return stream.getvalue()
+
+@pytest.mark.parametrize("path", PROGRAMS)
+def test_sample_programs(path):
+    with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+        program = AssemblyGenerator().generate(parse(f.read()))
+    assert run(StackVM(*program)) == PROGRAMS[path]
+
+def test_threaded_call_frames():
+    program = AssemblyGenerator().generate(parse("""
+    def fib(int n) -> int {
+        if (n < 2) { yeet n }
+        yeet fib(n - 1) + fib(n - 2)
+    }
+    int[] xs = [];
+    for (int i = 0; i < 8; i = i + 1) { xs.append(fib(i)); }
+    yap(xs, xs.len());
+    """))
+    vm = StackVM(*program)
+    assert run(vm) == "[0, 1, 1, 2, 3, 5, 8, 13] 8\n"
+    assert vm.stack == [] and len(vm.env_stack) == 1 and vm.call_stack == []
+
+def test_only_code_that_runs_is_threaded(tmp_path):
+    generator = AssemblyGenerator()
+    generator.generate(parse("""
+    def unused(int n) -> int { yeet n * 2 }
+    int x = 4;
+    if (x > 10) { yap("big"); } else { yap("small"); }
+    """))
+    path = str(tmp_path / "prog.yapb")
+    generator.write(path)
+    vm = StackVM.load(path)
+    assert isinstance(vm.code, memoryview)  # read in place, not copied out
+    assert all(handler is None for handler in vm.program)
+    assert run(vm) == "small\n"
+    code = vm.code
+    starts = []
+    pc = 0
+    while pc < len(code):
+        starts.append(pc)
+        pc += 1 + yapb.WIDTHS[code[pc]]
+    threaded = [pc for pc in starts if vm.program[pc] is not None]
+    assert 0 < len(threaded) < len(starts)
+    address = yapb.load(path)[1]["unused"]["address"]
+    assert vm.program[address] is None
+    assert all(vm.program[pc] is None for pc in range(len(code)) if pc not in starts)
+
+def test_errors_inside_instructions_propagate():
+    vm = StackVM(*AssemblyGenerator().generate(parse("int x = 0; yap(1 // x);")))
+    with pytest.raises(ZeroDivisionError):
+        run(vm)
+    # a TypeError from an instruction is not taken for a missing handler
+    vm = StackVM(*AssemblyGenerator().generate(parse('int x = 1; yap(x + "a");')))
+    with pytest.raises(TypeError, match="unsupported operand"):
+        run(vm)
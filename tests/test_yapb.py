@@ -0,0 +1,93 @@
+import io
+import os
+import sys
+
+import pytest
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from bytecode import AssemblyGenerator, Opcode
+from stack_vm import StackVM
+from yapio import output
+import yapb
+
+SOURCE = """
+def sq(int n) -> int { yeet n * n }
+int[] xs = [3, 1, 2];
+xs.sort();
+int total = 0;
+for (int i = 0; i < 3; i = i + 1) {
+    if (xs[i] > 1) { total = total + sq(xs[i]); }
+}
+yap(total, xs.max(), "done", nocap);
+"""
+
+
+def write_program(generator, path):
+    generator.generate(parse(SOURCE))
+    generator.write(str(path))
+    return str(path)
+
+
+def run(vm):
+    stream = io.StringIO()
+    output.redirect(stream)
+    try:
+        vm.run()
+    finally:
+        output.redirect(None)
+    return stream.getvalue()
+
+
+def test_loaded_program_runs_like_the_generated_one(tmp_path):
+    generator = AssemblyGenerator()
+    path = write_program(generator, tmp_path / "prog.yapb")
+    expected = run(StackVM(generator.instructions, generator.function_table, generator.constants))
+    assert expected == "13 3 done nocap\n"
+    assert run(StackVM.load(path)) == expected
+
+
+def test_code_section_is_mapped_not_copied(tmp_path):
+    path = write_program(AssemblyGenerator(), tmp_path / "prog.yapb")
+    code, function_table, constants = yapb.load(path)
+    assert isinstance(code, memoryview) and code.format == "i"
+    assert code.tolist() == yapb.assemble(*AssemblyGenerator().generate(parse(SOURCE)))[0].tolist()
+    assert "sq" in function_table and "done" in constants
+
+
+def test_operands_are_words():
+    generator = AssemblyGenerator()
+    code, function_table, constants = yapb.assemble(*generator.generate(parse(SOURCE)))
+    starts = []  # word offset of each instruction
+    pc = 0
+    while pc < len(code):
+        starts.append(pc)
+        pc += 1 + yapb.WIDTHS[code[pc]]
+    assert pc == len(code)
+    assert len(starts) == len(generator.instructions)
+    for start, ((_, _, opcode), args) in zip(starts, generator.instructions):
+        assert code[start] == opcode
+        if opcode in (Opcode.JMP.value, Opcode.JZ.value, Opcode.JNZ.value, Opcode.CALL.value):
+            assert code[start + 1] in starts or code[start + 1] == len(code)
+        if opcode == Opcode.REDUCE.value:
+            assert constants[code[start + 1]] == "max"
+    assert function_table["sq"]["address"] in starts
+
+
+def test_rejects_removed_push():
+    # literals are PUSH_CONST only; the old PUSH opcode (0x01) is gone
+    with pytest.raises(ValueError, match="takes 0 operand"):
+        yapb.assemble([((0, "PUSH", 0x01), ("3",))], {}, [])
+
+
+def test_rejects_other_files():
+    data = yapb.dumps(*yapb.assemble(*AssemblyGenerator().generate(parse("yap(1);"))))
+    with pytest.raises(ValueError, match="not a .yapb file"):
+        yapb.loads(b"YAPC" + data[4:])
+    with pytest.raises(ValueError, match="not supported"):
+        yapb.loads(data[:4] + b"\x63\x00" + data[6:])
+    with pytest.raises(ValueError, match="truncated"):
+        yapb.loads(data[:-4])
+    assert yapb.loads(data)[0].tolist() == list(yapb.assemble(*AssemblyGenerator().generate(parse("yap(1);")))[0])
@@ -0,0 +1,137 @@
+import io
+import pytest
+import sys
+import os
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import parse
+from evaluator import e
+from stack_vm import StackVM
+from bytecode import AssemblyGenerator
+import closures
+from yapio import Output, Reader, output, reader
+
+
+def test_buffers_until_limit():
+    stream = io.StringIO()
+    out = Output(stream, limit=10)
+    out.write("12345\n")
+    assert stream.getvalue() == ""
+    out.write("6789\n")
+    assert stream.getvalue() == "12345\n6789\n"
+    out.write("x\n")
+    out.flush()
+    assert stream.getvalue() == "12345\n6789\nx\n"
+
+def test_binary_stream():
+    stream = io.BytesIO()
+    out = Output(stream)
+    out.write("héllo\n")
+    out.flush()
+    assert stream.getvalue() == "héllo\n".encode("utf-8")
+
+def test_redirect_to_file(tmp_path):
+    path = str(tmp_path / "out.txt")
+    out = Output()
+    out.redirect(path)
+    out.write("to the file\n")
+    out.close()
+    with open(path, encoding="utf-8") as file:
+        assert file.read() == "to the file\n"
+
+def test_engines_flush_when_done():
+    source = 'for (int i = 0; i < 3; i = i + 1) { yap(i); }'
+    for run in (e, closures.run):
+        stream = io.BytesIO()
+        output.redirect(stream)
+        try:
+            run(parse(source))
+        finally:
+            output.redirect(None)
+        assert stream.getvalue() == b"0\n1\n2\n"
+
+def test_vm_output():
+    instructions, function_table, constants = AssemblyGenerator().generate(parse('yap(1); yap("a");'))
+    stream = io.StringIO()
+    output.redirect(stream)
+    try:
+        StackVM(instructions, function_table, constants).run()
+    finally:
+        output.redirect(None)
+    assert stream.getvalue() == "1\na\n"
+
+class Prompted(io.StringIO):
+    """Input that records what had been printed whenever it is read"""
+    def __init__(self, text, printed):
+        super().__init__(text)
+        self.printed = printed
+        self.seen = []
+
+    def read(self, size=-1):
+        self.seen.append(self.printed.getvalue())
+        return super().read(size)
+
+def test_output_is_flushed_before_input():
+    stream = io.StringIO()
+    source = Prompted("5\n", stream)
+    output.redirect(stream)
+    reader.redirect(source)
+    try:
+        e(parse('yap("number?"); int n = spill(); yap(n + 1);'))
+    finally:
+        output.redirect(None)
+        reader.redirect(None)
+    assert source.seen[0] == "number?\n"
+    assert stream.getvalue() == "number?\n6\n"
+
+def test_words_and_lines():
+    source = Reader(io.BytesIO("3 4\n  5\nhello world\n\nx".encode("utf-8")))
+    assert [source.word(), source.word()] == ["3", "4"]
+    assert source.line() == "  5"
+    assert source.line() == "hello world"
+    assert source.word() == "x"
+    with pytest.raises(EOFError):
+        source.line()
+
+def test_word_then_line():
+    source = Reader(io.StringIO("7\nnext line\n1 2 3\n"))
+    assert source.word() == "7"
+    assert source.line() == "next line"
+    assert source.word() == "1"
+    assert source.line() == " 2 3"
+
+def test_long_line_across_blocks():
+    numbers = list(range(50000))
+    source = Reader(io.BytesIO((" ".join(map(str, numbers)) + "\n").encode()))
+    assert [int(word) for word in source.line().split()] == numbers
+
+def run_with_input(run, source, text):
+    stream = io.StringIO()
+    output.redirect(stream)
+    reader.redirect(io.StringIO(text))
+    try:
+        run(parse(source))
+    finally:
+        output.redirect(None)
+        reader.redirect(None)
+    return stream.getvalue()
+
+def test_typed_spill():
+    source = """
+    int n = spill();
+    int[] xs = spill();
+    float f = spill();
+    string s = spill();
+    bool b = spill();
+    yap(n + xs[0] + xs[2], " ", xs.len(), " ", f, " ", s, " ", b);
+    """
+    for run in (e, closures.run):
+        assert run_with_input(run, source, "2 10 20 30\n1.5\nhi there\nnocap\n") == "42 3 1.5 hi there nocap\n"
+
+def test_typed_spill_errors():
+    with pytest.raises(TypeError, match="expected int input"):
+        run_with_input(e, "int n = spill();", "abc\n")
+    with pytest.raises(EOFError):
+        run_with_input(e, "int n = spill();", "")
@@ -7,28 +7,44 @@ bitwise_operators = ["&", "|", "~~"]
 
 class TypeChecker:
     def __init__(self):
-        self.scopes = [{}]  # Stack of symbol tables (each scope is a dict)
+        # Stack of symbol tables, one per function nesting level; each holds
+        # the type of every slot resolver.py assigned in that scope
+        self.scopes = [[]]
         self.functions = {}
 
-    def enter_scope(self):
-        self.scopes.append({})  
+    def enter_scope(self, size=0):
+        self.scopes.append([None] * size)
 
     def exit_scope(self):
         self.scopes.pop()  
 
-    def declare_variable(self, name, var_type):
-        # if name in self.scopes[-1]:  # Shadowing check
-        #     raise NameError(f"Variable '{name}' is already declared in this scope.")
-        self.scopes[-1][name] = var_type
-
-    def lookup_variable(self, name):
-        for scope in reversed(self.scopes):  # Start from innermost scope
-            if name in scope:
-                return scope[name]
-        if name in self.scopes[0]:  # Check global scope
-            return self.scopes[0]
+    def declare_variable(self, node, var_type):
+        scope = self.scopes[node.depth]
+        if node.slot >= len(scope):  # globals are not sized up front
+            scope.extend([None] * (node.slot + 1 - len(scope)))
+        scope[node.slot] = var_type
+
+    def lookup_variable(self, node, name):
+        if node.slot is not None:
+            scope = self.scopes[node.depth]
+            if node.slot < len(scope) and scope[node.slot] is not None:
+                return scope[node.slot]
         raise NameError(f"Variable {name} not declared")
 
+    def element_type(self, node, name, kind):
+        """Element type of the `kind` collection (deque, heap) `node` names"""
+        container_type = self.lookup_variable(node, name)
+        if not container_type.startswith(kind + "<"):
+            raise TypeError(f"'{name}' is not a {kind} (type {container_type})")
+        return container_type[len(kind) + 1:-1]
+
+    def hashmap_types(self, map_type):
+        """Key and value type of a hashmap<K, V> type"""
+        if not map_type.startswith("hashmap<"):
+            raise TypeError(f"Expected a hashmap, got {map_type}")
+        key_type, value_type = [x.strip() for x in map_type[8:-1].split(",")]
+        return key_type, value_type
+
     def visit(self, node):
         method_name = type(node).__name__
         
@@ -40,24 +56,24 @@ class TypeChecker:
                 return 'bool'
 
             case 'Variable':
-                return self.lookup_variable(node.val)
+                return self.lookup_variable(node, node.val)
             
             case 'String':
                 return 'string'
             
             case 'Input':
-                return "undefined"
+                return node.type or "undefined"
 
             case 'Declaration':
                 value_type = self.visit(node.value)
                 if value_type != node.type and value_type != "undefined":
                     raise TypeError(f'Type mismatch: expected {node.type}, got {value_type}')
-                self.declare_variable(node.name, node.type)
+                self.declare_variable(node, node.type)
                 return node.type
 
             case 'Assignment':
                 value_type = self.visit(node.value)
-                var_type = self.lookup_variable(node.name)
+                var_type = self.lookup_variable(node, node.name)
                 if value_type != var_type and value_type != "undefined":
                     raise TypeError(f'Type mismatch: expected {var_type}, got {value_type}')
                 return value_type
@@ -67,6 +83,12 @@ class TypeChecker:
                 right_type = self.visit(node.right)
                 
                 
+                if node.op in ("+", "*") and left_type in ("int[]", "float[]"):
+                    # elementwise on two arrays of the same numbers
+                    if right_type != left_type:
+                        raise TypeError(f'Invalid operand types {left_type}, {right_type} for {node.op}')
+                    return left_type
+
                 if node.op in arithmetic_operators:
                     if left_type not in ('int', 'float') or right_type not in ('int', 'float'):
                         raise TypeError(f'Invalid operand types {left_type}, {right_type} for {node.op}')
@@ -101,11 +123,15 @@ class TypeChecker:
                 
             case 'Function':
                 self.functions[node.name] = (node.params, node.return_type)
-                self.declare_variable(node.name, 'fn')
-
-                self.enter_scope()  # Enter function scope
-                for param_type, param_name in node.params:
-                    self.declare_variable(param_name, param_type)
+                self.declare_variable(node, 'fn')
+
+                self.enter_scope(node.frame_size)  # Enter function scope
+                scope = self.scopes[-1]
+                for slot, (param_type, param_name) in enumerate(node.params):
+                    scope[slot] = param_type
+                for slot, depth, outer, _ in node.copies:
+                    if outer < len(self.scopes[depth]):
+                        scope[slot] = self.scopes[depth][outer]
                 return_type = self.visit(node.body)
                 if return_type is None:
                     return_type = "void"
@@ -132,7 +158,7 @@ class TypeChecker:
                 # Else, check if it's a variable holding a function
                 else:
                     try:
-                        var_type = self.lookup_variable(node.name)
+                        var_type = self.lookup_variable(node, node.name)
                         if var_type != 'fn':
                             raise TypeError(f"'{node.name}' is not callable (type {var_type})")
                         
@@ -210,6 +236,15 @@ class TypeChecker:
                         raise TypeError(f"Array elements must be of the same type, but found {first_type} and {elem_type}")
 
                 return f"{first_type}[]"
+
+            case "NewMatrix":
+                for size in (node.rows, node.cols):
+                    if self.visit(size) != "int":
+                        raise TypeError("matrix() size must be int")
+                fill_type = self.visit(node.fill)
+                if fill_type not in ("int", "float", "bool", "string"):
+                    raise TypeError(f"Cannot make a matrix of {fill_type}")
+                return f"{fill_type}[][]"
             
             case "ArrayAccess":
                 array_type = self.visit(node.array)
@@ -336,13 +371,48 @@ class TypeChecker:
                 if "[]" in collection_type or collection_type == "string":
                     return "int"
 
-                elif collection_type.startswith("hashmap<"):
+                elif collection_type.startswith(("hashmap<", "deque<", "heap<", "set<")):
                     return "int"
 
                 else:
                     raise TypeError(f"Cannot get length of non-array/hashmap type {collection_type}")
 
 
+            case "ArrayReduce":
+                array_type = self.visit(node.array)
+                if array_type not in ("int[]", "float[]"):
+                    raise TypeError(f"{node.op}() needs an int[] or float[], got {array_type}")
+                return array_type[:-2]
+
+            case "ArrayFill":
+                array_type = self.visit(node.array)
+                if not array_type.endswith("[]"):
+                    raise TypeError(f"fill() can only be used on arrays, got {array_type}")
+                value_type = self.visit(node.value)
+                if value_type != array_type[:-2] and value_type != "undefined":
+                    raise TypeError(f"Cannot fill array of {array_type[:-2]} with {value_type}")
+                return array_type
+
+            case "ArrayReorder":
+                array_type = self.visit(node.array)
+                if not array_type.endswith("[]") or array_type.startswith("fn"):
+                    raise TypeError(f"{node.op}() can only be used on arrays, got {array_type}")
+                return array_type
+
+            case "ArraySearch":
+                array_type = self.visit(node.array)
+                if not array_type.endswith("[]") or array_type.startswith("fn"):
+                    raise TypeError(f"{node.op}() can only be used on arrays, got {array_type}")
+                value_type = self.visit(node.value)
+                if value_type != array_type[:-2] and value_type != "undefined":
+                    raise TypeError(f"Cannot search array of {array_type[:-2]} for {value_type}")
+                return "int"
+
+            case "NewRange":
+                if self.visit(node.count) != "int":
+                    raise TypeError("range() size must be int")
+                return "int[]"
+
             case "Parenthesis":
                 return self.visit(node.expr)
             
@@ -352,9 +422,77 @@ class TypeChecker:
 
                 if index_type not in ('int', 'string', 'float', 'bool'):
                     raise TypeError(f"Invalid key type {index_type} for hashmap; only int, string, float, bool are allowed")
-                self.declare_variable(node.name, f"hashmap<{index_type}, {value_type}>")
+                self.declare_variable(node, f"hashmap<{index_type}, {value_type}>")
 
                 return f"hashmap<{index_type}, {value_type}>"
             
+            case "DequeDeclaration":
+                self.declare_variable(node, f"deque<{node.element_type}>")
+                return f"deque<{node.element_type}>"
+
+            case "DequePush":
+                element_type = self.element_type(node, node.deque_name, "deque")
+                value_type = self.visit(node.value)
+                if value_type != element_type and value_type != "undefined":
+                    raise TypeError(f"Cannot push {value_type} to deque of {element_type}")
+
+            case "DequePop" | "DequePeek":
+                return self.element_type(node, node.deque_name, "deque")
+
+            case "HeapDeclaration":
+                if node.element_type not in ('int', 'float', 'string', 'int[]', 'float[]', 'string[]'):
+                    raise TypeError(f"Invalid element type {node.element_type} for heap; elements must be ordered")
+                self.declare_variable(node, f"heap<{node.element_type}>")
+                return f"heap<{node.element_type}>"
+
+            case "HeapPush":
+                element_type = self.element_type(node, node.heap_name, "heap")
+                value_type = self.visit(node.value)
+                if value_type != element_type and value_type != "undefined":
+                    raise TypeError(f"Cannot push {value_type} to heap of {element_type}")
+
+            case "HeapPop" | "HeapTop":
+                return self.element_type(node, node.heap_name, "heap")
+
+            case "SetDeclaration":
+                if node.element_type not in ('int', 'float', 'bool', 'string'):
+                    raise TypeError(f"Invalid element type {node.element_type} for set; only int, string, float, bool are allowed")
+                self.declare_variable(node, f"set<{node.element_type}>")
+                return f"set<{node.element_type}>"
+
+            case "SetAdd" | "SetRemove":
+                element_type = self.element_type(node, node.set_name, "set")
+                value_type = self.visit(node.value)
+                if value_type != element_type and value_type != "undefined":
+                    raise TypeError(f"Set of {element_type} cannot hold {value_type}")
+
+            case "Contains":
+                collection_type = self.visit(node.collection)
+                if collection_type.startswith("set<"):
+                    element_type = collection_type[4:-1]
+                elif collection_type.startswith("hashmap<"):
+                    element_type = self.hashmap_types(collection_type)[0]
+                elif collection_type.endswith("[]"):
+                    element_type = collection_type[:-2]
+                else:
+                    raise TypeError(f"contains() can only be used on sets, hashmaps or arrays, got {collection_type}")
+                value_type = self.visit(node.value)
+                if value_type != element_type and value_type != "undefined":
+                    raise TypeError(f"contains() on {collection_type} needs a {element_type}, got {value_type}")
+                return "bool"
+
+            case "MapGet":
+                key_type, value_type = self.hashmap_types(self.visit(node.map))
+                if self.visit(node.key) != key_type:
+                    raise TypeError(f"Hashmap key must be {key_type}")
+                default_type = self.visit(node.default)
+                if default_type != value_type:
+                    raise TypeError(f"get() default must be {value_type}, got {default_type}")
+                return value_type
+
+            case "MapView":
+                key_type, value_type = self.hashmap_types(self.visit(node.map))
+                return f"{key_type if node.op == 'keys' else value_type}[]"
+
             case _:
                 pass
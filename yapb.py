@@ -0,0 +1,150 @@
+# Description: Binary bytecode files (.yapb)
+#
+# A .yapb file holds one linked program, ready for StackVM:
+#
+#   header     MAGIC, format version, then the byte sizes of the constant pool
+#              and function table sections and the number of code words
+#   constants  the constant pool (marshal)
+#   functions  the function table (marshal), padded to a multiple of 4 bytes
+#   code       little-endian int32 words: each instruction is its opcode
+#              followed by its operands
+#
+# Every operand is a word.  Jump and call targets are word offsets into the
+# code section, and operands that are not ints (INPUT's type, REDUCE's op,
+# ...) are moved into the constant pool and referred to by index.  The code
+# section is used in place: `load` maps the file and hands the VM a memoryview
+# over it.  The VM reads instructions from there and only makes its
+# per-instruction handler closures for code that actually runs, a basic block
+# at a time, on first reaching it (see StackVM.execute).
+
+from array import array
+import marshal
+import mmap
+import struct
+import sys
+
+MAGIC = b"YAPB"
+VERSION = 2
+SUFFIX = ".yapb"
+HEADER = struct.Struct("<4sHxxIII")
+
+# Operand kinds: a plain int, an instruction index (a word offset once
+# assembled), or a value kept in the constant pool
+INT, ADDRESS, CONST = "int", "address", "const"
+
+# Operands of each opcode; opcodes that are not listed take none
+OPERANDS = {
+    0x03: (INT,),                    # STORE
+    0x0E: (ADDRESS,),                # JMP
+    0x0F: (ADDRESS,),                # JZ
+    0x10: (ADDRESS,),                # JNZ
+    0x11: (ADDRESS, INT, INT),       # CALL: address, parameter count, frame size
+    0x14: (CONST,),                  # NEWARRAY
+    0x19: (CONST,),                  # INPUT: type name or None
+    0x1B: (INT,),                    # LOAD
+    0x1C: (INT,),                    # CREATE_LIST
+    0x1D: (INT,),                    # LOAD_INDEX
+    0x1E: (INT,),                    # STORE_INDEX
+    0x1F: (INT,),                    # APPEND_INDEX
+    0x20: (INT,),                    # DELETE_INDEX
+    0x23: (INT,),                    # LEN
+    0x24: (INT,),                    # LOAD_GLOBAL
+    0x26: (INT,),                    # LOAD_INDEX2
+    0x27: (INT,),                    # STORE_INDEX2
+    0x28: (CONST,),                  # REDUCE
+    0x2B: (INT,),                    # SORT: 1 for descending
+    0x2D: (CONST,),                  # BISECT
+    0x30: (INT,),                    # SET_ADD
+    0x31: (INT,),                    # SET_REMOVE
+    0x33: (CONST,),                  # MAP_VIEW
+    0x34: (INT,),                    # PUSH_CONST
+}
+
+# Operand count of every opcode, indexed by opcode
+WIDTHS = [len(OPERANDS.get(op, ())) for op in range(256)]
+
+
+def assemble(instructions, function_table, constants):
+    """Code words for linked `instructions`, as (code, function_table,
+    constants).  The function table's addresses become word offsets, and
+    operands that are not ints are added to a copy of `constants`."""
+    offsets = []
+    size = 0
+    for (_, _, opcode), _ in instructions:
+        offsets.append(size)
+        size += 1 + WIDTHS[opcode]
+    offsets.append(size)  # a jump past the last instruction ends the program
+
+    pool = list(constants)
+    index = {(type(value), value): i for i, value in enumerate(pool)}
+    code = array("i")
+    for (_, name, opcode), args in instructions:
+        kinds = OPERANDS.get(opcode, ())
+        if len(args) != len(kinds):
+            raise ValueError(f"{name} takes {len(kinds)} operand(s), got {len(args)}")
+        code.append(opcode)
+        for kind, arg in zip(kinds, args):
+            if kind == ADDRESS:
+                arg = offsets[arg]
+            elif kind == CONST:
+                key = (type(arg), arg)
+                if key not in index:
+                    index[key] = len(pool)
+                    pool.append(arg)
+                arg = index[key]
+            code.append(int(arg))
+
+    functions = {name: dict(info, address=offsets[info['address']])
+                 for name, info in function_table.items()}
+    return code, functions, pool
+
+
+def dumps(code, function_table, constants):
+    """Bytes of a .yapb file for assembled `code`"""
+    pool = marshal.dumps(constants)
+    functions = marshal.dumps(function_table)
+    padding = -(HEADER.size + len(pool) + len(functions)) % 4
+    if sys.byteorder != "little":
+        code = array("i", code)
+        code.byteswap()
+    return b"".join([HEADER.pack(MAGIC, VERSION, len(pool), len(functions) + padding, len(code)),
+                     pool, functions, b"\0" * padding, code.tobytes()])
+
+
+def write(path, instructions, function_table, constants):
+    """Assemble linked `instructions` and save them as a .yapb file"""
+    with open(path, "wb") as f:
+        f.write(dumps(*assemble(instructions, function_table, constants)))
+
+
+def loads(data):
+    """(code, function_table, constants) of a .yapb image.  `code` is an int
+    memoryview over `data` itself when the byte order allows."""
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise ValueError("not a .yapb file")
+    magic, version, pool_size, functions_size, words = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("not a .yapb file")
+    if version != VERSION:
+        raise ValueError(f".yapb format version {version} is not supported (expected {VERSION})")
+    start = HEADER.size
+    constants = marshal.loads(view[start:start + pool_size])
+    start += pool_size
+    function_table = marshal.loads(view[start:start + functions_size])
+    start += functions_size
+    if len(view) != start + 4 * words:
+        raise ValueError("truncated .yapb file")
+    code = view[start:].cast("i")
+    if sys.byteorder != "little":
+        code = array("i", code)
+        code.byteswap()
+    return code, function_table, constants
+
+
+def load(path):
+    """(code, function_table, constants) of a .yapb file, with the code
+    section read straight out of a memory map of the file"""
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(data)
@@ -0,0 +1,183 @@
+# Description: Buffered program input and output
+#
+# Everything a YAP program prints with yap() goes through `output`, shared by
+# the tree evaluator, the closure engine and the stack VM.  Lines are
+# collected in memory and written out in one call once `limit` characters are
+# pending, when a program finishes, before spill() reads input (so prompts
+# show up first) and at interpreter exit.
+#
+# By default the text goes to whatever `sys.stdout` is at the time it is
+# written, so `contextlib.redirect_stdout` keeps working.  `redirect` sends it
+# to a file path or an open stream instead; binary streams such as
+# `io.BytesIO` receive UTF-8 bytes.
+#
+# spill() reads through `reader`, which pulls stdin in blocks of up to
+# `BLOCK` bytes and hands out whole lines or single whitespace-separated
+# words from that buffer.  Reading a line after some words of a line gives
+# the rest of that line; once all its words are read, the next line.
+
+import atexit
+import codecs
+import io
+import re
+import sys
+
+DEFAULT_LIMIT = 1 << 16
+BLOCK = 1 << 16
+
+WORD = re.compile(r"\S+")
+
+
+class Output:
+    """In-memory buffer in front of a text or binary stream"""
+
+    def __init__(self, target=None, limit=DEFAULT_LIMIT):
+        self.parts = []
+        self.size = 0
+        self.stream = None
+        self.binary = False
+        self.owned = False
+        self.redirect(target, limit)
+
+    def redirect(self, target=None, limit=DEFAULT_LIMIT):
+        """Send output to `target`: None for sys.stdout, a path to open, or a
+        stream.  Pending output goes to the old target first.
+        """
+        self.flush()
+        if self.owned:
+            self.stream.close()
+        self.owned = isinstance(target, str)
+        self.stream = open(target, "w", encoding="utf-8") if self.owned else target
+        self.binary = isinstance(self.stream, (io.RawIOBase, io.BufferedIOBase))
+        self.limit = limit
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.limit:
+            self.drain()
+
+    def drain(self):
+        """Hand pending text to the stream, without flushing the stream"""
+        if not self.parts:
+            return
+        text = "".join(self.parts)
+        self.parts.clear()
+        self.size = 0
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(text.encode("utf-8") if self.binary else text)
+
+    def flush(self):
+        self.drain()
+        stream = self.stream if self.stream is not None else sys.stdout
+        if stream is not None and not getattr(stream, "closed", False):
+            stream.flush()
+
+    def close(self):
+        """Flush, and close the stream if `redirect` opened it"""
+        self.redirect(None, self.limit)
+
+
+output = Output()
+atexit.register(output.close)
+
+
+class Reader:
+    """Block-buffered line and word reader over a text or binary stream"""
+
+    def __init__(self, source=None):
+        self.redirect(source)
+
+    def redirect(self, source=None):
+        """Read from `source`, or from sys.stdin when None, dropping
+        anything buffered from the old source
+        """
+        self.source = source
+        self.data = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.current = ""   # line the words below come from
+        self.words = []     # its words not read yet, last one first
+        self.split = 0      # how many words it had
+
+    def fill(self, size=BLOCK):
+        """Append up to `size` more characters from the source to the buffer"""
+        output.flush()  # the user should see any prompt before we wait
+        stream = self.source if self.source is not None else sys.stdin
+        raw = getattr(stream, "buffer", stream)
+        read = getattr(raw, "read1", raw.read)
+        chunk = read(size)
+        if isinstance(chunk, bytes):
+            chunk = self.decoder.decode(chunk, final=not chunk)
+        self.data = self.data[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+
+    def word(self):
+        """Next whitespace-separated word"""
+        words = self.words
+        while not words:
+            self.current = self.next_line()
+            words = self.words = self.current.split()[::-1]
+            self.split = len(words)
+        return words.pop()
+
+    def line(self):
+        """Rest of the current line, without its line ending"""
+        if not self.words:
+            return self.next_line()
+        # some of the current line's words have been read already
+        matches = WORD.finditer(self.current)
+        for _ in range(self.split - len(self.words)):
+            end = next(matches).end()
+        self.words = []
+        return self.current[end:]
+
+    def next_line(self):
+        start = self.pos
+        while True:
+            end = self.data.find("\n", start)
+            if end >= 0:
+                break
+            if self.eof:
+                if self.pos >= len(self.data):
+                    raise EOFError("No more input for spill()")
+                end = len(self.data)
+                break
+            start = len(self.data) - self.pos
+            # grow the reads, so a long line costs a linear amount of copying
+            self.fill(max(BLOCK, len(self.data)))
+        line = self.data[self.pos:end]
+        self.pos = end + 1
+        return line[:-1] if line.endswith("\r") else line
+
+
+def read_bool(word):
+    if word == "nocap":
+        return True
+    if word == "cap":
+        return False
+    raise ValueError(word)
+
+CONVERSIONS = {"int": int, "float": float, "bool": read_bool, "string": str}
+
+
+def read_value(value_type):
+    """spill() for a variable declared `value_type`: a whole line for a string,
+    a line of words for an array, and one word otherwise
+    """
+    convert = CONVERSIONS.get(value_type.removesuffix("[]"))
+    if convert is None:
+        raise TypeError(f"spill() cannot read a {value_type}")
+    try:
+        if value_type == "string":
+            return reader.line()
+        if value_type.endswith("[]"):
+            return [convert(word) for word in reader.line().split()]
+        return convert(reader.word())
+    except ValueError:
+        raise TypeError(f"spill() expected {value_type} input") from None
+
+
+reader = Reader()